@@ -0,0 +1,71 @@
+"""Benchmarks for src.analytics: legacy summary loop vs the python and numpy engines.
+
+    python -m benchmarks.bench_analytics --rows 1000000 --keywords 50 --repeat 3
+"""
+import argparse
+import json
+
+from src.analytics import analyze_keywords, build_keyword_summary, np
+
+from .bench_extractors import best_of
+from .synthetic import make_report_rows
+
+
+def legacy_keyword_summary(rows):
+    """The pre-engine build_keyword_summary, kept as the baseline."""
+    grouped = {}
+    for row in rows:
+        keyword = str(row.get("keyword", "")).strip() or "(unknown)"
+        grouped.setdefault(keyword, []).append(row)
+
+    summary = []
+    for keyword, items in grouped.items():
+        likes = [int(i.get("likes", 0) or 0) for i in items]
+        comments = [int(i.get("comments", 0) or 0) for i in items]
+        collects = [int(i.get("collects", 0) or 0) for i in items]
+        shares = [int(i.get("shares", 0) or 0) for i in items]
+        posts = len(items)
+        summary.append(
+            {
+                "keyword": keyword,
+                "posts": posts,
+                "avg_likes": round(sum(likes) / posts, 2) if posts else 0.0,
+                "avg_comments": round(sum(comments) / posts, 2) if posts else 0.0,
+                "avg_collects": round(sum(collects) / posts, 2) if posts else 0.0,
+                "engagement": sum(likes) + sum(comments) + sum(collects) + sum(shares),
+            }
+        )
+    summary.sort(key=lambda x: (x["posts"], x["engagement"]), reverse=True)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="analytics benchmarks")
+    parser.add_argument("--rows", type=int, default=1000000, help="合成明细行数")
+    parser.add_argument("--keywords", type=int, default=50, help="关键词个数")
+    parser.add_argument("--top-n", type=int, default=5, help="每个关键词的 Top 笔记数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    rows = make_report_rows(args.rows, keywords=args.keywords, seed=1)
+    expected = legacy_keyword_summary(rows)
+    engines = ["python"] + (["numpy"] if np is not None else [])
+    for engine in engines:
+        if build_keyword_summary(rows, engine=engine) != expected:
+            raise SystemExit("engine %s does not match the legacy keyword summary" % engine)
+
+    results = [
+        {
+            "name": "legacy_keyword_summary",
+            "rows": args.rows,
+            "seconds": round(best_of(args.repeat, lambda: legacy_keyword_summary(rows)), 6),
+        }
+    ]
+    for engine in engines:
+        seconds = best_of(args.repeat, lambda: analyze_keywords(rows, top_n=args.top_n, engine=engine))
+        results.append({"name": "analyze_keywords[%s]" % engine, "rows": args.rows, "seconds": round(seconds, 6)})
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Micro-benchmarks for src.extractors.
+
+    python -m benchmarks.bench_extractors --rows 20000 --noise-lines 2000 --repeat 5
+"""
+import argparse
+import json
+import time
+
+from src.extractors import extract_json_payload, normalize_search_results
+
+from .synthetic import make_noisy_mcporter_output, make_search_payload
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_normalize(rows, repeat):
+    payload = make_search_payload(rows, seed=1)
+    seconds = best_of(repeat, lambda: normalize_search_results(payload, keyword="bench"))
+    return {"name": "normalize_search_results", "rows": rows, "seconds": round(seconds, 6), "rows_per_second": int(rows / seconds)}
+
+
+def bench_extract_json(rows, noise_lines, repeat):
+    output = make_noisy_mcporter_output(rows, noise_lines=noise_lines, seed=2)
+    seconds = best_of(repeat, lambda: extract_json_payload(output))
+    return {
+        "name": "extract_json_payload",
+        "rows": rows,
+        "noise_lines": noise_lines,
+        "megabytes": round(len(output.encode("utf-8")) / 1e6, 2),
+        "seconds": round(seconds, 6),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="extractors micro-benchmarks")
+    parser.add_argument("--rows", type=int, default=20000, help="合成搜索结果条数")
+    parser.add_argument("--noise-lines", type=int, default=2000, help="JSON 前的日志噪声行数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    results = [
+        bench_normalize(args.rows, args.repeat),
+        bench_extract_json(args.rows, args.noise_lines, args.repeat),
+    ]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Offline replay of the crawl pipeline through a fake bridge.
+
+Search payloads come from a stored day (data/raw/<date>/*.search.json) or are generated; details
+are synthetic. Each step (normalization, filtering, dedup, detail merge, analytics, save_outputs)
+is timed on its own, then run_pipeline runs end to end with the payloads served by ReplayBridge
+through the real bridge code path. Results are JSON; pass a previous run's file as --baseline to
+see the ratio per step.
+
+    python -m benchmarks.bench_replay --keywords 20 --rows-per-keyword 500 --output bench.json
+    python -m benchmarks.bench_replay --raw-dir data/raw/2026-03-01 --baseline bench.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+from src.analytics import analyze_keywords
+from src.extractors import merge_detail_into_row, normalize_search_results
+from src.pipeline import (
+    iter_dedup_rows,
+    iter_recent_rows,
+    prefilter_rows,
+    run_pipeline,
+    save_outputs,
+    top_rows_by_publish_time,
+)
+
+from .bench_extractors import best_of
+from .synthetic import make_detail_payload, make_search_payload
+
+RAW_SUFFIX = ".search.json"
+
+
+class ReplayBridge:
+    """Stands in for an MCP session: search_feeds serves the keyword's stored payload and
+    get_feed_detail a synthetic detail derived from the feed id."""
+
+    def __init__(self, payloads, seed=0):
+        self.payloads = payloads
+        self.seed = seed
+        self.calls = {}
+
+    def call_tool(self, name, arguments, timeout=120):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if name == "search_feeds":
+            return self.payloads.get(arguments["keyword"], {"feeds": []})
+        if name == "get_feed_detail":
+            return make_detail_payload(self.seed, zlib.crc32(str(arguments["feed_id"]).encode("utf-8")))
+        raise ValueError("unknown tool: %s" % name)
+
+    def close(self):
+        pass
+
+
+def load_raw_payloads(raw_dir):
+    """{keyword: payload} from a data/raw/<date> directory (keyword = file name stem)."""
+    payloads = {}
+    for path in sorted(Path(raw_dir).glob("*" + RAW_SUFFIX)):
+        payloads[path.name[: -len(RAW_SUFFIX)]] = json.loads(path.read_text(encoding="utf-8"))
+    return payloads
+
+
+def synthetic_payloads(keywords, rows_per_keyword, seed=0):
+    now = int(time.time())
+    return {
+        "关键词%03d" % i: make_search_payload(rows_per_keyword, seed=seed + i, now=now, start=i * rows_per_keyword)
+        for i in range(keywords)
+    }
+
+
+def bench_steps(payloads, within_hours, repeat):
+    rows = [row for keyword, payload in payloads.items() for row in normalize_search_results(payload, keyword)]
+    details = [make_detail_payload(0, index) for index in range(len(rows))]
+    merged = [merge_detail_into_row(row, detail) for row, detail in zip(rows, details)]
+    min_publish_ts = int(time.time()) - int(within_hours * 3600) if within_hours > 0 else 0
+
+    def normalize():
+        for keyword, payload in payloads.items():
+            normalize_search_results(payload, keyword)
+
+    def save():
+        with tempfile.TemporaryDirectory() as tmp:
+            result = {
+                "crawl_date": datetime.now().strftime("%Y-%m-%d"),
+                "crawl_ts": datetime.now().isoformat(timespec="seconds"),
+                "rows": merged,
+                "raw_payloads": payloads,
+                "errors": [],
+            }
+            save_outputs(result, tmp)
+
+    steps = [
+        ("normalize_search_results", normalize),
+        ("prefilter_rows", lambda: prefilter_rows(rows, set(), min_publish_ts=min_publish_ts)),
+        ("merge_detail_into_row", lambda: [merge_detail_into_row(r, d) for r, d in zip(rows, details)]),
+        ("recent_and_dedup", lambda: list(iter_dedup_rows(iter_recent_rows(merged, within_hours=within_hours)))),
+        ("top_rows_by_publish_time", lambda: top_rows_by_publish_time(merged, 0)),
+        ("analyze_keywords", lambda: analyze_keywords(merged)),
+        ("save_outputs", save),
+    ]
+    return [
+        {"name": name, "rows": len(rows), "seconds": round(best_of(repeat, fn), 6)} for name, fn in steps
+    ], len(rows)
+
+
+def bench_pipeline(payloads, within_hours, fetch_detail, detail_workers, repeat):
+    """Best end-to-end run_pipeline wall time, with that run's stage timings and call counts."""
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            keywords_file = Path(tmp) / "keywords.txt"
+            keywords_file.write_text("\n".join(payloads), encoding="utf-8")
+            bridge = ReplayBridge(payloads)
+            started = time.perf_counter()
+            out = run_pipeline(
+                keywords_file,
+                Path(tmp) / "data",
+                max_per_keyword=0,
+                max_total_rows=0,
+                fetch_detail=fetch_detail,
+                within_hours=within_hours,
+                random_sleep_min_seconds=0,
+                random_sleep_max_seconds=0,
+                use_detail_cache=False,
+                detail_workers=detail_workers,
+                session=bridge,
+            )
+            seconds = time.perf_counter() - started
+            if best is None or seconds < best[0]:
+                stats = json.loads(Path(out["runlog_file"]).read_text(encoding="utf-8"))
+                best = (seconds, out["total_rows"], stats.get("stage_timings", {}), dict(bridge.calls))
+    seconds, rows, stage_timings, calls = best
+    result = {"name": "run_pipeline", "rows": rows, "seconds": round(seconds, 6), "bridge_calls": calls}
+    return result, stage_timings
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=str(Path(__file__).resolve().parent.parent),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Add baseline_seconds and ratio to each step that ran on the same number of rows."""
+    previous = {item["name"]: item for item in baseline.get("results", [])}
+    for item in results:
+        before = previous.get(item["name"])
+        if before and before.get("seconds") and before.get("rows") == item["rows"]:
+            item["baseline_seconds"] = before["seconds"]
+            item["ratio"] = round(item["seconds"] / before["seconds"], 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="offline replay benchmark")
+    parser.add_argument("--raw-dir", default="", help="回放 data/raw/<日期> 下保存的搜索结果（不填则用合成数据）")
+    parser.add_argument("--keywords", type=int, default=20, help="合成数据的关键词个数")
+    parser.add_argument("--rows-per-keyword", type=int, default=200, help="合成数据每个关键词的搜索结果条数")
+    parser.add_argument("--within-hours", type=float, default=0, help="时间窗口（小时，0 表示不过滤；回放历史数据时保持 0）")
+    parser.add_argument("--no-detail", action="store_true", help="端到端运行时不抓详情")
+    parser.add_argument("--detail-workers", type=int, default=1, help="端到端运行的详情并发数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最快一次）")
+    parser.add_argument("--output", default="", help="结果另存为 JSON 文件")
+    parser.add_argument("--baseline", default="", help="与之前保存的结果对比（输出 ratio = 本次 / 基线）")
+    args = parser.parse_args()
+
+    if args.raw_dir:
+        payloads = load_raw_payloads(args.raw_dir)
+        if not payloads:
+            raise SystemExit("%s 下没有 *%s" % (args.raw_dir, RAW_SUFFIX))
+        source = "raw:%s" % args.raw_dir
+    else:
+        payloads = synthetic_payloads(args.keywords, args.rows_per_keyword, seed=1)
+        source = "synthetic"
+
+    results, search_rows = bench_steps(payloads, args.within_hours, args.repeat)
+    pipeline_result, stage_timings = bench_pipeline(
+        payloads, args.within_hours, not args.no_detail, args.detail_workers, args.repeat
+    )
+    results.append(pipeline_result)
+    if args.baseline:
+        compare(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+
+    report = {
+        "meta": {
+            "source": source,
+            "keywords": len(payloads),
+            "search_rows": search_rows,
+            "fetch_detail": not args.no_detail,
+            "detail_workers": args.detail_workers,
+            "repeat": args.repeat,
+            "commit": git_commit(),
+            "python": platform.python_version(),
+        },
+        "results": results,
+        "pipeline_stage_timings": stage_timings,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Synthetic search/detail payloads shaped like xiaohongshu-mcp output, for benchmarks."""
+import json
+import random
+import time
+
+_COUNT_VALUES = (0, 3, 12, 250, "1.2w", "3千", "8k", "", "  ", None, "abc", 7.9)
+
+
+def make_feed(rng, index, now=None):
+    now = int(now or time.time())
+    note_id = "note_%06d" % index
+    interact = {
+        rng.choice(("liked_count", "likedCount", "like_count")): rng.choice(_COUNT_VALUES),
+        rng.choice(("comment_count", "commentCount")): rng.choice(_COUNT_VALUES),
+        rng.choice(("collected_count", "collectedCount", "collect_count")): rng.choice(_COUNT_VALUES),
+        rng.choice(("share_count", "shareCount", "sharedCount")): rng.choice(_COUNT_VALUES),
+    }
+    card = {
+        rng.choice(("title", "displayTitle", "note_title")): "标题 %s" % index,
+        rng.choice(("desc", "description", "content")): rng.choice(("正文内容 " * 5, "", "  ")),
+        rng.choice(("user", "author")): {rng.choice(("nickname", "nickName", "name")): "作者%s" % (index % 97)},
+        rng.choice(("interactInfo", "interact_info", "interaction")): interact,
+        rng.choice(("time", "publish_time", "publishTime")): rng.choice(
+            (str((now - rng.randint(0, 72 * 3600)) * 1000), now - rng.randint(0, 72 * 3600), "2026-02-27T10:00:00+08:00", "")
+        ),
+    }
+    if rng.random() < 0.5:
+        card[rng.choice(("noteId", "note_id"))] = note_id
+    if rng.random() < 0.2:
+        card["url"] = "https://www.xiaohongshu.com/explore/%s?src=bench" % note_id
+
+    feed_key = rng.choice(("id", "feed_id", "feedId"))
+    if rng.random() < 0.6:
+        feed = {feed_key: "feed_%06d" % index, "xsecToken": "tok_%s" % index, "noteCard": card}
+    else:
+        card[feed_key] = "feed_%06d" % index
+        card["xsec_token"] = "tok_%s" % index
+        feed = card
+    return feed
+
+
+def make_search_payload(count, seed=0, duplicate_ratio=0.05, now=None, start=0):
+    """`count` feeds with note indexes from `start` (give keywords disjoint ranges to avoid overlap)."""
+    rng = random.Random(seed)
+    feeds = []
+    for index in range(start, start + count):
+        if feeds and rng.random() < duplicate_ratio:
+            feeds.append(feeds[rng.randrange(len(feeds))])
+            continue
+        feeds.append(make_feed(rng, index, now=now))
+    return {"result": {"data": {"items": feeds, "has_more": True, "cursor": "abc"}}, "meta": [{"ok": True}]}
+
+
+def make_detail_payload(seed=0, index=0):
+    rng = random.Random(seed * 1_000_003 + index)
+    note = {
+        "noteId": "note_%06d" % index,
+        "title": "详情标题 %s" % index,
+        "desc": "详情正文 " * rng.randint(1, 40),
+        "user": {"nickname": "作者%s" % (index % 97)},
+        "interactInfo": {"likedCount": str(rng.randint(0, 9999)), "commentCount": rng.randint(0, 500)},
+        "tagList": [{"name": "标签%s" % i} for i in range(rng.randint(0, 5))],
+        "time": int(time.time() * 1000) - rng.randint(0, 48 * 3600 * 1000),
+    }
+    return {"data": {"note": note}}
+
+
+def make_noisy_mcporter_output(count, noise_lines=2000, seed=0):
+    """Search payload printed after log lines that contain stray brackets, like mcporter stdout."""
+    noise = "\n".join(
+        "[mcporter] step %s {server: xiaohongshu} loading [cache=%s]" % (i, i % 7) for i in range(noise_lines)
+    )
+    payload = json.dumps(make_search_payload(count, seed=seed), ensure_ascii=False, indent=2)
+    return noise + "\n" + payload + "\n"
+
+
+def make_report_rows(count, keywords=50, seed=0):
+    """Flat normalized rows (as in all_rows.csv) for analytics benchmarks."""
+    rng = random.Random(seed)
+    names = ["关键词%03d" % i for i in range(keywords)]
+    return [
+        {
+            "keyword": rng.choice(names),
+            "note_id": "note_%07d" % index,
+            "title": "标题 %s" % index,
+            "note_url": "https://www.xiaohongshu.com/explore/note_%07d" % index,
+            "likes": int(rng.paretovariate(1.2)) - 1,
+            "comments": rng.randint(0, 40),
+            "collects": rng.randint(0, 120),
+            "shares": rng.randint(0, 10),
+        }
+        for index in range(count)
+    ]
@@ -10,6 +10,15 @@ WITHIN_HOURS="${WITHIN_HOURS:-24}"
 WINDOW_RANDOM_DELAY="${WINDOW_RANDOM_DELAY:-3600}"
 ANTI_MIN_SLEEP="${ANTI_MIN_SLEEP:-0.8}"
 ANTI_MAX_SLEEP="${ANTI_MAX_SLEEP:-2.8}"
+# e.g. /var/lib/node_exporter/textfile_collector/xhs.prom
+METRICS_FILE="${METRICS_FILE:-}"
+METRICS_PORT="${METRICS_PORT:-0}"
+SHARDS="${SHARDS:-1}"
+
+EXTRA_ARGS=()
+if [[ -n "$METRICS_FILE" ]]; then
+  EXTRA_ARGS+=(--metrics-file "$METRICS_FILE")
+fi
 
 ./run.sh \
   --keywords-file "$KEYWORDS_FILE" \
@@ -17,4 +26,7 @@ ANTI_MAX_SLEEP="${ANTI_MAX_SLEEP:-2.8}"
   --within-hours "$WITHIN_HOURS" \
   --window-random-delay "$WINDOW_RANDOM_DELAY" \
   --anti-min-sleep "$ANTI_MIN_SLEEP" \
-  --anti-max-sleep "$ANTI_MAX_SLEEP"
+  --anti-max-sleep "$ANTI_MAX_SLEEP" \
+  --metrics-port "$METRICS_PORT" \
+  --shards "$SHARDS" \
+  ${EXTRA_ARGS[@]+"${EXTRA_ARGS[@]}"}
@@ -1,17 +1,248 @@
+import asyncio
+import json
+import random
+import shlex
 import shutil
-import subprocess
 import sys
+import threading
 import time
+from collections import deque
+from datetime import datetime
 from pathlib import Path
 
 from .extractors import extract_json_payload
+from .io_utils import write_text
+from .mcp_session import McpSessionError, McpSessionPool, McpSessionTimeout, McpToolError
+from .profiling import count, stage, timed
 
 
 class BridgeError(RuntimeError):
+    """`kind` is what failed, see failure_kind(); None leaves it to the message."""
+
+    kind = None
+
+    def __init__(self, *args, kind=None):
+        super().__init__(*args)
+        if kind is not None:
+            self.kind = kind
+
+
+class CircuitOpenError(BridgeError):
     pass
 
 
+class CallTimeoutError(BridgeError):
+    kind = "timeout"
+
+    def __init__(self, timeout):
+        super().__init__(timeout)
+        self.timeout = timeout
+
+    def __str__(self):
+        return "command timeout after %ss" % self.timeout
+
+
+# Failure kinds: the bridge is unhealthy (timeout, auth, transport) or one item could not be
+# served (item: deleted or private note) while the bridge works. Only the former trip breakers.
+FAILURE_KINDS = ("timeout", "auth", "transport", "item")
+_AUTH_MARKERS = ("not logged in", "not login", "login required", "unauthorized", "未登录", "登录失效", "请先登录")
+_ITEM_MARKERS = ("not found", "deleted", "private", "no longer available", "不存在", "已删除", "私密", "无法查看")
+
+
+def failure_kind(exc):
+    kind = getattr(exc, "kind", None)
+    if kind in FAILURE_KINDS:
+        return kind
+    text = str(exc).lower()
+    if any(marker in text for marker in _AUTH_MARKERS):
+        return "auth"
+    if any(marker in text for marker in _ITEM_MARKERS):
+        return "item"
+    return "transport"
+
+
+def as_bridge_error(exc):
+    """The BridgeError, with its failure kind, that a transport exception stands for."""
+    if isinstance(exc, BridgeError):
+        return exc
+    if isinstance(exc, McpSessionTimeout):
+        return CallTimeoutError(exc.timeout)
+    if isinstance(exc, McpToolError):
+        return BridgeError(str(exc), kind="auth" if failure_kind(exc) == "auth" else "item")
+    return BridgeError(str(exc))
+
+
+# Retry sleeps are retry_delay_seconds * attempt, scaled by a random factor in [1 - j, 1 + j].
+RETRY_JITTER = 0.25
+
+
+class CircuitBreaker:
+    """Fail fast once one kind of call has failed `threshold` times in a row for the same
+    failure_kind(). Item failures mean the bridge answered: like a success, they end the streak.
+
+    An open breaker rejects calls with CircuitOpenError for the rest of the run, or, with
+    cooldown_seconds, lets one trial call through after the cooldown (half-open) and closes on
+    its success; other callers stay rejected while the trial is in flight. threshold <= 0
+    disables the breaker. State changes are kept in `events`.
+    """
+
+    def __init__(self, name, threshold=5, cooldown_seconds=None, clock=time.monotonic):
+        self.name = name
+        self.threshold = int(threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.failure_kind = None
+        self.rejected = 0
+        self.events = []
+        self._clock = clock
+        self._opened_at = None
+        self._last_error = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            if self.state == "half_open":
+                return self._trial_in_flight
+            return self.state == "open" and not self._cooldown_elapsed()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "closed" or (self.state == "half_open" and not self._trial_in_flight):
+                return
+            if self.state == "open" and self._cooldown_elapsed():
+                self._transition("half_open")
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(
+                "%s 已熔断（连续失败 %s 次），本次跳过: %s" % (self.name, self.failures, self._last_error)
+            )
+
+    def record_success(self):
+        with self._lock:
+            self._record_answer()
+
+    def record_failure(self, exc):
+        kind = failure_kind(exc)
+        with self._lock:
+            if kind == "item":
+                self._record_answer()
+                return
+            if kind != self.failure_kind:
+                self.failures = 0
+                self.failure_kind = kind
+            self.failures += 1
+            self._last_error = str(exc)
+            self._trial_in_flight = False
+            if self.threshold <= 0:
+                return
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+                self._opened_at = self._clock()
+                self._transition("open")
+
+    def release(self):
+        """Give up an unresolved call (cancelled, or failed outside the bridge) so a half-open
+        breaker can admit another trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, "rejected_calls": self.rejected}
+
+    def _record_answer(self):
+        self.failures = 0
+        self.failure_kind = None
+        self._trial_in_flight = False
+        if self.state != "closed":
+            self._transition("closed")
+
+    def _cooldown_elapsed(self):
+        return self.cooldown_seconds is not None and self._clock() - self._opened_at >= self.cooldown_seconds
+
+    def _transition(self, state):
+        self.state = state
+        self.events.append(
+            {
+                "stage": "breaker",
+                "breaker": self.name,
+                "state": state,
+                "consecutive_failures": self.failures,
+                "failure_kind": self.failure_kind or "",
+                "error": self._last_error or "",
+                "ts": datetime.now().isoformat(timespec="seconds"),
+            }
+        )
+
+
+class LatencyTracker:
+    """Recent call latencies; timeout() shrinks a configured timeout to p95 x factor.
+
+    Successful calls are observed at their duration and timed-out calls at the timeout they hit,
+    so repeated timeouts push the value back up. It never exceeds the configured timeout and
+    never drops below min_timeout; until min_samples calls are observed the configured timeout
+    is used as-is.
+    """
+
+    def __init__(self, factor=3.0, window=100, min_samples=5, min_timeout=15.0):
+        self.factor = float(factor)
+        self.min_samples = min_samples
+        self.min_timeout = min_timeout
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def mean(self):
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return None
+        return sum(samples) / len(samples)
+
+    def p95(self):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+    def timeout(self, configured):
+        if self.factor <= 0 or len(self._samples) < self.min_samples:
+            return configured
+        return min(configured, max(self.min_timeout, round(self.p95() * self.factor, 1)))
+
+    def stats(self, configured):
+        p95 = self.p95()
+        return {
+            "samples": len(self._samples),
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "timeout_seconds": self.timeout(configured),
+        }
+
+
+_EXECUTABLE_CACHE = {}
+
+
 def _resolve_executable(name):
+    cached = _EXECUTABLE_CACHE.get(name)
+    if cached and Path(cached).is_file():
+        return cached
+
+    found = _find_executable(name)
+    if found:
+        _EXECUTABLE_CACHE[name] = found
+    else:
+        _EXECUTABLE_CACHE.pop(name, None)
+    return found
+
+
+def _find_executable(name):
     local_bin = Path(sys.executable).parent / name
     if local_bin.exists() and local_bin.is_file():
         return str(local_bin)
@@ -28,69 +259,313 @@ def _resolve_executable(name):
 
 
 def run_cmd(cmd, timeout=60):
+    return asyncio.run(run_cmd_async(cmd, timeout=timeout))
+
+
+@timed("run_cmd")
+async def run_cmd_async(cmd, timeout=60):
+    """Run cmd without blocking the loop; on timeout or cancellation the child is killed and reaped."""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
     try:
-        proc = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-        )
-    except subprocess.TimeoutExpired:
-        raise BridgeError("command timeout after %ss" % timeout)
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        await _kill(proc)
+        raise CallTimeoutError(timeout)
+    except BaseException:
+        await asyncio.shield(_kill(proc))
+        raise
 
+    stdout = stdout.decode("utf-8", errors="replace").strip()
+    stderr = stderr.decode("utf-8", errors="replace").strip()
     if proc.returncode != 0:
-        raise BridgeError(proc.stderr.strip() or proc.stdout.strip() or "command failed")
-    return proc.stdout.strip()
+        raise BridgeError(stderr or stdout or "command failed")
+    return stdout
+
+
+async def _kill(proc):
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+    await proc.wait()
+
 
+def check_agent_reach_ready(cache_file=None, ttl_seconds=0):
+    """Run `agent-reach doctor`, unless a passing check younger than ttl_seconds is cached.
 
-def check_agent_reach_ready():
+    Returns True when the cached result was used.
+    """
     agent_reach_bin = _resolve_executable("agent-reach")
     if not agent_reach_bin:
         raise BridgeError("agent-reach 未安装，请先安装 Agent-Reach")
 
+    cache_path = Path(cache_file) if cache_file and ttl_seconds > 0 else None
+    if cache_path is not None and _ready_cache_is_fresh(cache_path, agent_reach_bin, ttl_seconds):
+        return True
+
     try:
         run_cmd([agent_reach_bin, "doctor"], timeout=30)
     except BridgeError as exc:
+        if cache_path is not None and cache_path.exists():
+            cache_path.unlink()
         raise BridgeError("agent-reach doctor 执行失败: %s" % exc)
 
+    if cache_path is not None:
+        write_text(cache_path, json.dumps({"checked_at": time.time(), "agent_reach_bin": agent_reach_bin}))
+    return False
+
+
+def _ready_cache_is_fresh(cache_path, agent_reach_bin, ttl_seconds):
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        checked_at = float(cached.get("checked_at", 0))
+    except (OSError, ValueError, TypeError, AttributeError):
+        return False
+
+    if cached.get("agent_reach_bin") != agent_reach_bin:
+        return False
+    age = time.time() - checked_at
+    return 0 <= age < ttl_seconds
+
+
+def call_mcporter(expr, timeout=120, retries=2, retry_delay_seconds=1.0, latency=None):
+    return asyncio.run(
+        call_mcporter_async(
+            expr,
+            timeout=timeout,
+            retries=retries,
+            retry_delay_seconds=retry_delay_seconds,
+            latency=latency,
+        )
+    )
+
+
+@timed("call_mcporter")
+async def call_mcporter_async(expr, timeout=120, retries=2, retry_delay_seconds=1.0, latency=None):
+    mcporter_bin = _resolve_executable("mcporter")
+    if not mcporter_bin:
+        raise BridgeError("mcporter 未安装，请先执行 agent-reach install")
+
+    async def attempt():
+        return await mcporter_once(expr, timeout)
 
-def call_mcporter(expr, timeout=120, retries=2, retry_delay_seconds=1.0):
+    return await _call_with_retries(attempt, "mcporter", retries, retry_delay_seconds, latency=latency)
+
+
+async def mcporter_once(expr, timeout):
+    """One `mcporter call` attempt: the parsed JSON payload, or {"raw_output": ...} if none."""
     mcporter_bin = _resolve_executable("mcporter")
     if not mcporter_bin:
         raise BridgeError("mcporter 未安装，请先执行 agent-reach install")
+    try:
+        output = await run_cmd_async([mcporter_bin, "call", expr], timeout=timeout)
+    except FileNotFoundError:
+        raise BridgeError("mcporter 未安装，请先执行 agent-reach install")
+    try:
+        return extract_json_payload(output)
+    except Exception:
+        return {"raw_output": output}
+
+
+def tool_expr(tool, arguments):
+    args_expr = ", ".join("%s: %s" % (key, _quote(value)) for key, value in arguments.items())
+    return "xiaohongshu.%s(%s)" % (tool, args_expr)
+
+
+def open_session(command, size=1, startup_timeout=30):
+    if isinstance(command, str):
+        command = shlex.split(command)
+    if not command:
+        raise BridgeError("MCP 会话命令为空")
+    return McpSessionPool(command, size=size, startup_timeout=startup_timeout)
 
+
+def call_tool(
+    tool,
+    arguments,
+    timeout=120,
+    retries=2,
+    retry_delay_seconds=1.0,
+    session=None,
+    breaker=None,
+    latency=None,
+):
+    return asyncio.run(
+        call_tool_async(
+            tool,
+            arguments,
+            timeout=timeout,
+            retries=retries,
+            retry_delay_seconds=retry_delay_seconds,
+            session=session,
+            breaker=breaker,
+            latency=latency,
+        )
+    )
+
+
+async def call_tool_async(
+    tool,
+    arguments,
+    timeout=120,
+    retries=2,
+    retry_delay_seconds=1.0,
+    session=None,
+    breaker=None,
+    latency=None,
+):
+    if breaker is not None:
+        breaker.before_call()
+    if latency is not None:
+        timeout = latency.timeout(timeout)
+
+    try:
+        result = await _dispatch_tool(tool, arguments, timeout, retries, retry_delay_seconds, session, latency)
+    except BridgeError as exc:
+        if breaker is not None:
+            breaker.record_failure(exc)
+        raise
+    except BaseException:
+        if breaker is not None:
+            breaker.release()
+        raise
+    if breaker is not None:
+        breaker.record_success()
+    return result
+
+
+async def _dispatch_tool(tool, arguments, timeout, retries, retry_delay_seconds, session, latency):
+    if session is None:
+        return await call_mcporter_async(
+            tool_expr(tool, arguments),
+            timeout=timeout,
+            retries=retries,
+            retry_delay_seconds=retry_delay_seconds,
+            latency=latency,
+        )
+
+    async def attempt():
+        try:
+            # McpSession calls block on their own reader queue; keep them off the event loop.
+            return await asyncio.to_thread(session.call_tool, tool, arguments, timeout=timeout)
+        except McpSessionError as exc:
+            raise as_bridge_error(exc)
+
+    return await _call_with_retries(attempt, "MCP", retries, retry_delay_seconds, latency=latency)
+
+
+async def _call_with_retries(attempt_fn, label, retries, retry_delay_seconds, latency=None):
     attempts = max(1, int(retries) + 1)
     last_error = None
 
     for attempt in range(1, attempts + 1):
+        started = time.monotonic()
         try:
-            output = run_cmd([mcporter_bin, "call", expr], timeout=timeout)
-            try:
-                return extract_json_payload(output)
-            except Exception:
-                return {"raw_output": output}
-        except FileNotFoundError:
-            raise BridgeError("mcporter 未安装，请先执行 agent-reach install")
+            result = await attempt_fn()
+            if latency is not None:
+                latency.observe(time.monotonic() - started)
+            return result
         except BridgeError as exc:
+            if latency is not None and isinstance(exc, CallTimeoutError):
+                # a timeout is a sample too, or a too-short adaptive timeout could never grow back
+                latency.observe(exc.timeout)
             last_error = exc
             if attempt >= attempts:
                 break
+            count("bridge_retries", label)
 
             sleep_seconds = max(0.0, float(retry_delay_seconds)) * attempt
             if sleep_seconds > 0:
-                time.sleep(sleep_seconds)
+                with stage("retry_sleep"):
+                    await asyncio.sleep(sleep_seconds * random.uniform(1 - RETRY_JITTER, 1 + RETRY_JITTER))
+
+    raise BridgeError("%s 调用失败（已重试 %s 次）: %s" % (label, attempts, last_error), kind=failure_kind(last_error))
+
+
+def search_feeds(keyword, timeout=180, retries=2, retry_delay_seconds=1.0, session=None, breaker=None, latency=None):
+    return asyncio.run(
+        search_feeds_async(
+            keyword,
+            timeout=timeout,
+            retries=retries,
+            retry_delay_seconds=retry_delay_seconds,
+            session=session,
+            breaker=breaker,
+            latency=latency,
+        )
+    )
 
-    raise BridgeError("mcporter 调用失败（已重试 %s 次）: %s" % (attempts, last_error))
 
+async def search_feeds_async(
+    keyword,
+    timeout=180,
+    retries=2,
+    retry_delay_seconds=1.0,
+    session=None,
+    breaker=None,
+    latency=None,
+):
+    return await call_tool_async(
+        "search_feeds",
+        {"keyword": keyword},
+        timeout=timeout,
+        retries=retries,
+        retry_delay_seconds=retry_delay_seconds,
+        session=session,
+        breaker=breaker,
+        latency=latency,
+    )
 
-def search_feeds(keyword, timeout=180, retries=2, retry_delay_seconds=1.0):
-    expr = "xiaohongshu.search_feeds(keyword: %s)" % _quote(keyword)
-    return call_mcporter(expr, timeout=timeout, retries=retries, retry_delay_seconds=retry_delay_seconds)
+
+def get_feed_detail(
+    feed_id,
+    xsec_token,
+    timeout=120,
+    retries=1,
+    retry_delay_seconds=0.8,
+    session=None,
+    breaker=None,
+    latency=None,
+):
+    return asyncio.run(
+        get_feed_detail_async(
+            feed_id,
+            xsec_token,
+            timeout=timeout,
+            retries=retries,
+            retry_delay_seconds=retry_delay_seconds,
+            session=session,
+            breaker=breaker,
+            latency=latency,
+        )
+    )
 
 
-def get_feed_detail(feed_id, xsec_token, timeout=120, retries=1, retry_delay_seconds=0.8):
-    expr = "xiaohongshu.get_feed_detail(feed_id: %s, xsec_token: %s)" % (_quote(feed_id), _quote(xsec_token))
-    return call_mcporter(expr, timeout=timeout, retries=retries, retry_delay_seconds=retry_delay_seconds)
+async def get_feed_detail_async(
+    feed_id,
+    xsec_token,
+    timeout=120,
+    retries=1,
+    retry_delay_seconds=0.8,
+    session=None,
+    breaker=None,
+    latency=None,
+):
+    return await call_tool_async(
+        "get_feed_detail",
+        {"feed_id": feed_id, "xsec_token": xsec_token},
+        timeout=timeout,
+        retries=retries,
+        retry_delay_seconds=retry_delay_seconds,
+        session=session,
+        breaker=breaker,
+        latency=latency,
+    )
 
 
 def _quote(value):
@@ -1,28 +1,214 @@
-def build_keyword_summary(rows):
-    grouped = {}
+import heapq
 
+try:
+    import numpy as np
+except ImportError:  # optional dependency; the pure-Python engine gives identical results
+    np = None
+
+from .profiling import timed
+
+COUNT_FIELDS = ("likes", "comments", "collects", "shares")
+SUMMARY_FIELDS = ("keyword", "posts", "avg_likes", "avg_comments", "avg_collects", "engagement")
+TOP_NOTE_FIELDS = ("note_id", "title", "note_url")
+PERCENTILES = (("median", 0.5), ("p90", 0.9), ("p99", 0.99))
+
+
+def build_keyword_summary(rows, engine=None):
+    metrics, _ = analyze_keywords(rows, top_n=0, engine=engine)
+    return summary_from_metrics(metrics)
+
+
+def summary_from_metrics(metrics):
+    return [{field: item[field] for field in SUMMARY_FIELDS} for item in metrics]
+
+
+@timed("analyze_keywords")
+def analyze_keywords(rows, top_n=5, engine=None):
+    """Per-keyword metrics and each keyword's top_n notes by engagement.
+
+    engine is "numpy", "python" or None (numpy when installed). Both engines return the same
+    values: sums are exact integers and percentiles use the same linear interpolation.
+    Metrics are sorted like keyword_summary.csv (posts, then engagement, descending).
+    """
+    if engine is None:
+        engine = "numpy" if np is not None else "python"
+    if engine == "numpy" and np is None:
+        raise RuntimeError("numpy 未安装，无法使用 numpy 分析引擎")
+    if engine not in ("numpy", "python"):
+        raise ValueError("unknown analytics engine: %s" % engine)
+
+    rows = rows if isinstance(rows, list) else list(rows)
+    keywords, codes, counts = _columns(rows)
+    if engine == "numpy":
+        groups = _numpy_groups(len(keywords), codes, counts, top_n)
+    else:
+        groups = _python_groups(len(keywords), codes, counts, top_n)
+
+    total_engagement = sum(group["engagement"] for group in groups)
+    metrics = []
+    top_notes = {}
+    for keyword, group in zip(keywords, groups):
+        posts = group["posts"]
+        item = {"keyword": keyword, "posts": posts}
+        for field, total in zip(COUNT_FIELDS, group["sums"]):
+            item["avg_" + field] = round(total / posts, 2) if posts else 0.0
+        item["engagement"] = group["engagement"]
+        for field, total in zip(COUNT_FIELDS, group["sums"]):
+            item["sum_" + field] = total
+        item["avg_engagement"] = round(group["engagement"] / posts, 2) if posts else 0.0
+        for (name, _), value in zip(PERCENTILES, group["engagement_percentiles"]):
+            item[name + "_engagement"] = round(value, 2)
+        item["median_likes"] = round(group["median_likes"], 2)
+        item["engagement_share"] = round(group["engagement"] / total_engagement, 4) if total_engagement else 0.0
+        metrics.append(item)
+        top_notes[keyword] = group["top"]
+
+    metrics.sort(key=lambda x: (x["posts"], x["engagement"]), reverse=True)
+
+    top_rows = []
+    for item in metrics:
+        for rank, index in enumerate(top_notes[item["keyword"]], start=1):
+            note = {"keyword": item["keyword"], "rank": rank}
+            note.update((field, rows[index].get(field, "")) for field in TOP_NOTE_FIELDS)
+            note["engagement"] = sum(column[index] for column in counts)
+            for field, column in zip(COUNT_FIELDS, counts):
+                note[field] = column[index]
+            top_rows.append(note)
+    return metrics, top_rows
+
+
+def _columns(rows):
+    keywords = {}
+    by_value = {}
+    codes = []
     for row in rows:
-        keyword = str(row.get("keyword", "")).strip() or "(unknown)"
-        grouped.setdefault(keyword, []).append(row)
-
-    summary = []
-    for keyword, items in grouped.items():
-        likes = [int(i.get("likes", 0) or 0) for i in items]
-        comments = [int(i.get("comments", 0) or 0) for i in items]
-        collects = [int(i.get("collects", 0) or 0) for i in items]
-        shares = [int(i.get("shares", 0) or 0) for i in items]
-
-        posts = len(items)
-        summary.append(
+        value = row.get("keyword", "")
+        code = by_value.get(value) if isinstance(value, str) else None
+        if code is None:
+            keyword = str(value).strip() or "(unknown)"
+            code = keywords.setdefault(keyword, len(keywords))
+            if isinstance(value, str):
+                by_value[value] = code
+        codes.append(code)
+
+    counts = []
+    for field in COUNT_FIELDS:
+        column = [row.get(field, 0) for row in rows]
+        if not all(type(value) is int for value in column):
+            column = [value if type(value) is int else int(value or 0) for value in column]
+        counts.append(column)
+    return list(keywords), codes, counts
+
+
+def _interpolate(low_value, high_value, fraction):
+    return low_value + (high_value - low_value) * fraction
+
+
+def _percentile_positions(n, q):
+    position = (n - 1) * q
+    low = int(position)
+    return low, min(low + 1, n - 1), position - low
+
+
+def _python_groups(group_count, codes, counts, top_n):
+    members = [[] for _ in range(group_count)]
+    for index, code in enumerate(codes):
+        members[code].append(index)
+
+    likes = counts[0]
+    engagement = [a + b + c + d for a, b, c, d in zip(*counts)]
+    groups = []
+    for indices in members:
+        ranked = sorted(map(engagement.__getitem__, indices))
+        groups.append(
             {
-                "keyword": keyword,
-                "posts": posts,
-                "avg_likes": round(sum(likes) / posts, 2) if posts else 0.0,
-                "avg_comments": round(sum(comments) / posts, 2) if posts else 0.0,
-                "avg_collects": round(sum(collects) / posts, 2) if posts else 0.0,
-                "engagement": sum(likes) + sum(comments) + sum(collects) + sum(shares),
+                "posts": len(indices),
+                "sums": [sum(map(column.__getitem__, indices)) for column in counts],
+                "engagement": sum(ranked),
+                "engagement_percentiles": [_sorted_percentile(ranked, q) for _, q in PERCENTILES],
+                "median_likes": _sorted_percentile(sorted(map(likes.__getitem__, indices)), 0.5),
+                # nlargest keeps row order among equal engagement, as the numpy engine does
+                "top": heapq.nlargest(top_n, indices, key=engagement.__getitem__) if top_n > 0 else [],
             }
         )
+    return groups
+
+
+def _sorted_percentile(values, q):
+    if not values:
+        return 0.0
+    low, high, fraction = _percentile_positions(len(values), q)
+    return _interpolate(float(values[low]), float(values[high]), fraction)
+
+
+def _numpy_groups(group_count, codes, counts, top_n):
+    if not codes:
+        return []
+    codes = np.asarray(codes, dtype=np.int64)
+    matrix = np.array(counts, dtype=np.int64)
+    engagement = matrix.sum(axis=0)
+
+    posts = np.bincount(codes, minlength=group_count)
+    starts = np.concatenate(([0], np.cumsum(posts)[:-1]))
+    group_of_sorted = np.repeat(np.arange(group_count), posts)
+
+    # Every row in (keyword, -engagement, row) order: groups are contiguous, best notes first.
+    order = _group_argsort(codes, -engagement, group_count)
+    sums = np.add.reduceat(matrix[:, order], starts, axis=1)
+
+    sorted_engagement = _group_sorted_values(codes, engagement, group_count, group_of_sorted)
+    sorted_likes = _group_sorted_values(codes, matrix[0], group_count, group_of_sorted)
+    engagement_percentiles = [_numpy_percentile(sorted_engagement, starts, posts, q) for _, q in PERCENTILES]
+    median_likes = _numpy_percentile(sorted_likes, starts, posts, 0.5)
+
+    top = [[] for _ in range(group_count)]
+    if top_n > 0:
+        keep = order[np.arange(len(codes)) - starts[group_of_sorted] < top_n]
+        for code, index in zip(codes[keep].tolist(), keep.tolist()):
+            top[code].append(index)
+
+    group_engagement = sums.sum(axis=0)
+    return [
+        {
+            "posts": int(posts[g]),
+            "sums": [int(x) for x in sums[:, g]],
+            "engagement": int(group_engagement[g]),
+            "engagement_percentiles": [float(values[g]) for values in engagement_percentiles],
+            "median_likes": float(median_likes[g]),
+            "top": top[g],
+        }
+        for g in range(group_count)
+    ]
+
+
+def _composite_span(values, group_count):
+    """Offset and span that pack (code, value) into one int64 key, or None if it would overflow."""
+    low = int(values.min())
+    span = int(values.max()) - low + 1
+    return (low, span) if span * group_count < 2**62 else None
+
+
+def _group_argsort(codes, values, group_count):
+    """Row indices ordered by (code, value), ties kept in row order."""
+    packed = _composite_span(values, group_count)
+    if packed is None:
+        return np.lexsort((values, codes))
+    low, span = packed
+    return np.argsort(codes * span + (values - low), kind="stable")
+
+
+def _group_sorted_values(codes, values, group_count, group_of_sorted):
+    """values sorted within each code, laid out group after group, as float64."""
+    packed = _composite_span(values, group_count)
+    if packed is None:
+        return values[np.lexsort((values, codes))].astype(np.float64)
+    low, span = packed
+    return (np.sort(codes * span + (values - low)) - group_of_sorted * span + low).astype(np.float64)
+
 
-    summary.sort(key=lambda x: (x["posts"], x["engagement"]), reverse=True)
-    return summary
+def _numpy_percentile(sorted_values, starts, posts, q):
+    position = (posts - 1) * q
+    low = position.astype(np.int64)
+    high = np.minimum(low + 1, posts - 1)
+    fraction = position - low
+    return _interpolate(sorted_values[starts + low], sorted_values[starts + high], fraction)
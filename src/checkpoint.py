@@ -0,0 +1,109 @@
+"""Append-only journal of the searches and details a run has finished.
+
+checkpoint.jsonl holds one JSON object per completed bridge call:
+    {"type": "search", "keyword": ..., "payload": ...}
+    {"type": "detail", "key": ..., "detail": ...}
+Each line is fsynced as soon as its call returns, so a crash, Ctrl-C or --fail-fast loses at most
+the calls in flight. A resumed run serves journaled results instead of calling the bridge again
+and only crawls what is still pending; failed calls are never journaled, so they are retried.
+Only entries loaded at resume are replayed: calls made in this run go to the bridge as usual.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+from .detail_cache import cache_key
+from .io_utils import ensure_dir
+
+CHECKPOINT_FILE = "checkpoint.jsonl"
+
+
+def checkpoint_path(data_root, crawl_date, shard=None):
+    """The day's journal; with --shards each worker keeps its own (checkpoint.shard<N>.jsonl)."""
+    name = CHECKPOINT_FILE if shard is None else CHECKPOINT_FILE.replace(".jsonl", ".shard%d.jsonl" % shard)
+    return Path(data_root) / "runlog" / crawl_date / name
+
+
+class CheckpointJournal:
+    def __init__(self, path, resume=False):
+        self.path = Path(path)
+        self.searches = {}
+        self.details = {}
+        self.stats = {"resumed": bool(resume), "replayed_searches": 0, "replayed_details": 0}
+        self._lock = threading.Lock()
+
+        ensure_dir(self.path.parent)
+        if resume:
+            self._load()
+        self._file = self.path.open("a" if resume else "w", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def search_payload(self, keyword):
+        with self._lock:
+            payload = self.searches.get(keyword)
+            if payload is not None:
+                self.stats["replayed_searches"] += 1
+            return payload
+
+    def detail(self, row):
+        key = cache_key(row)
+        with self._lock:
+            detail = self.details.get(key) if key else None
+            if detail is not None:
+                self.stats["replayed_details"] += 1
+            return detail
+
+    def record_search(self, keyword, payload):
+        with self._lock:
+            self._append({"type": "search", "keyword": keyword, "payload": payload})
+
+    def record_detail(self, row, detail):
+        key = cache_key(row)
+        if not key:
+            return
+        with self._lock:
+            self._append({"type": "detail", "key": key, "detail": detail})
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def discard(self):
+        """Drop the journal once the run's outputs are saved."""
+        self.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _append(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _load(self):
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].split(b"\n"):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("type") == "search":
+                self.searches[entry["keyword"]] = entry["payload"]
+            elif entry.get("type") == "detail":
+                self.details[entry["key"]] = entry["detail"]
+        if end != len(data):
+            # a torn last line (crash mid-append) is cut so new entries start on a fresh line
+            with self.path.open("rb+") as f:
+                f.truncate(end)
@@ -0,0 +1,167 @@
+"""Optional Parquet copy of the normalized rows, partitioned by crawl date and keyword.
+
+Layout: <root>/crawl_date=YYYY-MM-DD/keyword=<name>/part-0.parquet, one file per keyword per
+day. Every file also carries `crawl_date` and `keyword` columns, and rows are sorted by
+`publish_ts`, so row-group statistics let readers skip files and row groups for
+`keyword` / `publish_ts` predicates without opening the data pages.
+"""
+
+from pathlib import Path
+
+from .io_utils import atomic_open
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pads
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None
+    pads = None
+    pq = None
+
+PARQUET_FILE = "part-0.parquet"
+DEFAULT_COMPRESSION = "zstd"
+DEFAULT_ROW_GROUP_SIZE = 65536
+
+_STRING_FIELDS = (
+    "crawl_date",
+    "keyword",
+    "crawl_ts",
+    "feed_id",
+    "note_id",
+    "xsec_token",
+    "title",
+    "author",
+    "publish_time",
+)
+_INT_FIELDS = ("publish_ts", "likes", "comments", "collects", "shares")
+_TAIL_STRING_FIELDS = ("desc", "detail_content", "detail_tags")
+_BOOL_FIELDS = ("detail_opened",)
+_TRAILING_FIELDS = ("note_url", "detail_error")
+
+
+def available():
+    return pa is not None
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("列式存储需要 pyarrow，请先执行: pip install pyarrow")
+
+
+def note_schema(extra_fields=()):
+    require_pyarrow()
+    fields = [pa.field(name, pa.string()) for name in _STRING_FIELDS]
+    fields += [pa.field(name, pa.int64()) for name in _INT_FIELDS]
+    fields += [pa.field(name, pa.string()) for name in _TAIL_STRING_FIELDS]
+    fields += [pa.field(name, pa.bool_()) for name in _BOOL_FIELDS]
+    fields += [pa.field(name, pa.string()) for name in _TRAILING_FIELDS]
+    fields += [pa.field(name, pa.string()) for name in extra_fields]
+    return pa.schema(fields)
+
+
+def partition_path(root, crawl_date, partition_name):
+    return Path(root) / ("crawl_date=" + crawl_date) / ("keyword=" + partition_name) / PARQUET_FILE
+
+
+def rows_to_table(rows, crawl_date):
+    """Typed Arrow table for normalized rows; counts may arrive as strings (CSV reload)."""
+    require_pyarrow()
+    rows = sorted(rows, key=lambda r: _as_int(r.get("publish_ts")) or 0)
+    known = set(_STRING_FIELDS + _INT_FIELDS + _TAIL_STRING_FIELDS + _BOOL_FIELDS + _TRAILING_FIELDS)
+    extra_fields = []
+    for row in rows:
+        for key in row:
+            if key not in known:
+                known.add(key)
+                extra_fields.append(key)
+
+    schema = note_schema(extra_fields)
+    columns = []
+    for field in schema:
+        name = field.name
+        if name == "crawl_date":
+            values = [crawl_date] * len(rows)
+        elif name in _INT_FIELDS:
+            values = [_as_int(row.get(name)) for row in rows]
+        elif name in _BOOL_FIELDS:
+            values = [_as_bool(row.get(name)) for row in rows]
+        else:
+            values = [_as_str(row.get(name)) for row in rows]
+        columns.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def write_notes(path, rows, crawl_date, batch=None, compression=DEFAULT_COMPRESSION, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    table = rows_to_table(rows, crawl_date)
+    with atomic_open(path, "wb", batch=batch) as f:
+        pq.write_table(table, f, compression=compression, row_group_size=row_group_size)
+
+
+def read_notes_table(root, keywords=None, min_publish_ts=None, max_publish_ts=None, dates=None, columns=None):
+    """Load rows across days as one Arrow table.
+
+    `dates` prunes partition directories; `keywords` and the publish_ts bounds are pushed
+    down to the Parquet scan, which skips row groups whose statistics cannot match.
+    """
+    require_pyarrow()
+    files = _partition_files(root, dates)
+    if not files:
+        return note_schema().empty_table() if columns is None else note_schema().empty_table().select(columns)
+
+    dataset = pads.dataset([str(p) for p in files], format="parquet", schema=note_schema())
+    expr = None
+    if keywords is not None:
+        expr = _and(expr, pads.field("keyword").isin([str(k) for k in keywords]))
+    if min_publish_ts is not None:
+        expr = _and(expr, pads.field("publish_ts") >= int(min_publish_ts))
+    if max_publish_ts is not None:
+        expr = _and(expr, pads.field("publish_ts") <= int(max_publish_ts))
+    return dataset.to_table(columns=columns, filter=expr)
+
+
+def read_notes(root, **kwargs):
+    return read_notes_table(root, **kwargs).to_pylist()
+
+
+def _partition_files(root, dates):
+    root = Path(root)
+    if not root.exists():
+        return []
+    if dates is None:
+        date_dirs = sorted(root.glob("crawl_date=*"))
+    else:
+        date_dirs = [root / ("crawl_date=" + d) for d in sorted(set(dates))]
+    files = []
+    for date_dir in date_dirs:
+        files.extend(sorted(date_dir.glob("keyword=*/" + PARQUET_FILE)))
+    return files
+
+
+def _and(expr, other):
+    return other if expr is None else expr & other
+
+
+def _as_int(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value
+    try:
+        return int(float(str(value).strip()))
+    except ValueError:
+        return None
+
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("true", "1", "yes")
+
+
+def _as_str(value):
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
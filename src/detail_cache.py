@@ -0,0 +1,139 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .io_utils import ensure_dir
+
+
+class DetailCache:
+    """Persistent get_feed_detail results keyed by note_id (feed_id when note_id is missing).
+
+    An entry younger than ttl_seconds is served as-is. An older entry keeps its content but
+    drops its interaction counts, so the counts from the current search row win. Entries
+    fetched more than max_age_seconds ago are treated as misses, and prune() keeps at most
+    max_entries of the most recently fetched notes.
+    """
+
+    def __init__(self, path, ttl_seconds=21600, max_age_seconds=30 * 86400, max_entries=50000, clock=time.time):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_age_seconds = max_age_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "stores": 0, "evicted": 0}
+
+        ensure_dir(self.path.parent)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS detail_cache (
+                cache_key TEXT PRIMARY KEY,
+                detail TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                counts_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_detail_cache_fetched_at ON detail_cache (fetched_at)")
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get(self, row):
+        key = cache_key(row)
+        if not key:
+            return None
+
+        now = self._clock()
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT detail, fetched_at, counts_at FROM detail_cache WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+            if found is None or now - found[1] > self.max_age_seconds:
+                self.stats["misses"] += 1
+                return None
+
+            detail = json.loads(found[0])
+            if now - found[2] <= self.ttl_seconds:
+                self.stats["hits"] += 1
+                return detail
+
+            self.stats["stale_hits"] += 1
+            detail = without_interaction_counts(detail)
+            # the stored counts are dropped too, so the hits until the next ttl cannot bring them back
+            self._conn.execute(
+                "UPDATE detail_cache SET detail = ?, counts_at = ? WHERE cache_key = ?",
+                (json.dumps(detail, ensure_ascii=False), now, key),
+            )
+            self._conn.commit()
+        return detail
+
+    def put(self, row, detail):
+        key = cache_key(row)
+        if not key or not isinstance(detail, dict) or detail.get("_opened") is False:
+            return
+
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO detail_cache (cache_key, detail, fetched_at, counts_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(detail, ensure_ascii=False), now, now),
+            )
+            self._conn.commit()
+            self.stats["stores"] += 1
+
+    def prune(self):
+        with self._lock:
+            cutoff = self._clock() - self.max_age_seconds
+            evicted = self._conn.execute("DELETE FROM detail_cache WHERE fetched_at < ?", (cutoff,)).rowcount
+            if self.max_entries > 0:
+                evicted += self._conn.execute(
+                    """
+                    DELETE FROM detail_cache WHERE cache_key NOT IN (
+                        SELECT cache_key FROM detail_cache ORDER BY fetched_at DESC LIMIT ?
+                    )
+                    """,
+                    (self.max_entries,),
+                ).rowcount
+            self._conn.commit()
+            self.stats["evicted"] += evicted
+        return evicted
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def cache_key(row):
+    return str(row.get("note_id") or row.get("feed_id") or "").strip()
+
+
+def without_interaction_counts(detail):
+    if not isinstance(detail, dict):
+        return detail
+
+    out = dict(detail)
+    if isinstance(out.get("data"), dict) and isinstance(out["data"].get("note"), dict):
+        out["data"] = dict(out["data"])
+        out["data"]["note"] = _strip_counts(out["data"]["note"])
+    elif isinstance(out.get("note"), dict):
+        out["note"] = _strip_counts(out["note"])
+    else:
+        out = _strip_counts(out)
+    return out
+
+
+def _strip_counts(note):
+    return {
+        key: value
+        for key, value in note.items()
+        if key not in ("interactInfo", "interact_info", "likes", "comments", "collects", "shares")
+    }
@@ -1,30 +1,119 @@
 import json
-from datetime import datetime
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
 
+from .profiling import timed
 
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+_DECODER = json.JSONDecoder()
+# mcporter prints log lines first and the tool result after them, starting on its own line.
+# A framed start is a bracket at the beginning of a line followed by something JSON can
+# continue with, so log prefixes such as "[mcporter] ..." or "[info]" are not candidates.
+_FRAMED_START = r"""^[ \t]*(?:\{(?=\s*["}])|\[(?=\s*[\]\[{"\-0-9tfn]))"""
+_FRAMED_START_STR = re.compile(_FRAMED_START, re.MULTILINE)
+_FRAMED_START_BYTES = re.compile(_FRAMED_START.encode("ascii"), re.MULTILINE)
+_ANY_START = re.compile(r"[\[{]")
+
+
+@timed("extract_json_payload")
 def extract_json_payload(raw_text):
     text = (raw_text or "").strip()
     if not text:
         raise ValueError("empty output")
 
     try:
-        return json.loads(text)
+        return _loads(text)
     except Exception:
         pass
 
-    decoder = json.JSONDecoder()
-    for idx, ch in enumerate(text):
-        if ch not in "[{":
+    if orjson is not None:
+        # orjson only parses whole documents, so give it the remainder after the first
+        # framed start once; the memoryview avoids copying the tail.
+        data = text.encode("utf-8")
+        match = _FRAMED_START_BYTES.search(data)
+        if match is not None:
+            try:
+                return orjson.loads(memoryview(data)[match.end() - 1:])
+            except Exception:
+                pass
+
+    for match in _FRAMED_START_STR.finditer(text):
+        try:
+            return _DECODER.raw_decode(text, match.end() - 1)[0]
+        except ValueError:
             continue
+
+    for match in _ANY_START.finditer(text):
         try:
-            obj, _ = decoder.raw_decode(text[idx:])
-            return obj
-        except Exception:
+            return _DECODER.raw_decode(text, match.start())[0]
+        except ValueError:
             continue
 
     raise ValueError("no JSON payload found in output")
 
 
+def _loads(text):
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except Exception:
+            pass
+    return json.loads(text)
+
+
+def parse_publish_time_to_epoch_seconds(value):
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return _epoch_seconds(int(value))
+    return _parse_publish_text(str(value))
+
+
+@lru_cache(maxsize=65536)
+def _parse_publish_text(text):
+    text = text.strip()
+    if not text:
+        return 0
+    if text.isdigit():
+        return _epoch_seconds(int(text))
+
+    iso_text = text.replace("Z", "+00:00")
+    try:
+        dt = datetime.fromisoformat(iso_text)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return int(dt.timestamp())
+    except Exception:
+        return 0
+
+
+def _epoch_seconds(raw):
+    if raw > 1_000_000_000_000:
+        return raw // 1000
+    if raw > 1_000_000_000:
+        return raw
+    return 0
+
+
+def row_publish_ts(row):
+    """Typed publish_ts of a row, parsed from publish_time (and stored) if it is not an int yet."""
+    value = row.get("publish_ts")
+    if value.__class__ is int:
+        return value
+
+    if value is None or value == "":
+        value = parse_publish_time_to_epoch_seconds(row.get("publish_time"))
+    else:
+        value = parse_publish_time_to_epoch_seconds(value)
+    row["publish_ts"] = value
+    return value
+
+
 def _first(*values):
     for value in values:
         if value is None:
@@ -61,201 +150,196 @@ def _to_int(value):
         return 0
 
 
-def _collect_feed_candidates(payload):
-    candidates = []
-
-    def walk(node):
-        if isinstance(node, list):
-            for item in node:
-                walk(item)
-            return
-
-        if not isinstance(node, dict):
-            return
-
-        note_card = node.get("noteCard") if isinstance(node.get("noteCard"), dict) else {}
-        possible_id = _first(
-            node.get("note_id"),
-            node.get("noteId"),
-            node.get("id"),
-            node.get("feed_id"),
-            note_card.get("note_id"),
-            note_card.get("noteId"),
-            note_card.get("id"),
-            note_card.get("feed_id"),
-        )
-        if possible_id:
-            candidates.append(node)
+# Field aliases for search results, resolved in order. Sources are indexed as
+# 0 = feed item, 1 = noteCard (or the item itself), 2 = interaction dict, 3 = user dict.
+_ITEM, _CARD, _INTERACT, _USER = 0, 1, 2, 3
+
+_CANDIDATE_ID_KEYS = ("note_id", "noteId", "id", "feed_id")
+_FEED_ID_ALIASES = (
+    (_ITEM, "id"),
+    (_ITEM, "feed_id"),
+    (_ITEM, "feedId"),
+    (_CARD, "id"),
+    (_CARD, "feed_id"),
+    (_CARD, "feedId"),
+    (_CARD, "noteId"),
+    (_CARD, "note_id"),
+)
+_NOTE_ID_ALIASES = ((_CARD, "noteId"), (_CARD, "note_id"), (_ITEM, "noteId"), (_ITEM, "note_id"))
+_INTERACT_ALIASES = (
+    (_CARD, "interactInfo"),
+    (_CARD, "interact_info"),
+    (_CARD, "interaction"),
+    (_ITEM, "interactInfo"),
+    (_ITEM, "interact_info"),
+)
+_USER_ALIASES = ((_CARD, "user"), (_CARD, "author"), (_ITEM, "user"), (_ITEM, "author"))
+_TEXT_FIELDS = (
+    ("title", ((_CARD, "title"), (_CARD, "displayTitle"), (_CARD, "note_title"), (_CARD, "name"), (_ITEM, "title"))),
+    ("author", ((_USER, "nickname"), (_USER, "nickName"), (_USER, "name"), (_USER, "username"))),
+    ("publish_time", ((_CARD, "time"), (_CARD, "publish_time"), (_CARD, "publishTime"), (_ITEM, "time"))),
+)
+_COUNT_FIELDS = (
+    (
+        "likes",
+        (
+            (_INTERACT, "liked_count"),
+            (_INTERACT, "like_count"),
+            (_INTERACT, "likedCount"),
+            (_INTERACT, "likeCount"),
+            (_CARD, "liked_count"),
+            (_CARD, "like_count"),
+            (_CARD, "likedCount"),
+            (_CARD, "likeCount"),
+            (_CARD, "likes"),
+        ),
+    ),
+    (
+        "comments",
+        (
+            (_INTERACT, "comment_count"),
+            (_INTERACT, "commentCount"),
+            (_CARD, "comment_count"),
+            (_CARD, "commentCount"),
+            (_CARD, "comments"),
+        ),
+    ),
+    (
+        "collects",
+        (
+            (_INTERACT, "collected_count"),
+            (_INTERACT, "collect_count"),
+            (_INTERACT, "collectedCount"),
+            (_INTERACT, "collectCount"),
+            (_CARD, "collected_count"),
+            (_CARD, "collect_count"),
+            (_CARD, "collectedCount"),
+            (_CARD, "collectCount"),
+            (_CARD, "collects"),
+        ),
+    ),
+    (
+        "shares",
+        (
+            (_INTERACT, "share_count"),
+            (_INTERACT, "shared_count"),
+            (_INTERACT, "shareCount"),
+            (_INTERACT, "sharedCount"),
+            (_CARD, "share_count"),
+            (_CARD, "shared_count"),
+            (_CARD, "shareCount"),
+            (_CARD, "sharedCount"),
+            (_CARD, "shares"),
+        ),
+    ),
+)
+_DESC_ALIASES = (
+    (_CARD, "desc"),
+    (_CARD, "description"),
+    (_CARD, "content"),
+    (_CARD, "note_content"),
+    (_ITEM, "desc"),
+)
+_XSEC_TOKEN_ALIASES = ((_ITEM, "xsecToken"), (_ITEM, "xsec_token"), (_CARD, "xsecToken"), (_CARD, "xsec_token"))
+_NOTE_URL_ALIASES = ((_CARD, "note_url"), (_CARD, "url"), (_ITEM, "note_url"), (_ITEM, "url"))
+_EMPTY = {}
+
+
+def _pick(sources, aliases, default=""):
+    # Same rule as _first: skip None and blank strings.
+    for index, key in aliases:
+        value = sources[index].get(key)
+        if value is None:
+            continue
+        if isinstance(value, str) and not value.strip():
+            continue
+        return value
+    return default
+
+
+def _pick_truthy(sources, aliases):
+    for index, key in aliases:
+        value = sources[index].get(key)
+        if value:
+            return value
+    return _EMPTY
 
-        for value in node.values():
-            walk(value)
 
-    walk(payload)
-    return candidates
+def _is_feed_candidate(node):
+    # the first non-blank id alias decides, and only if it is truthy (an id of 0 or [] is not one)
+    for source in (node, node.get("noteCard")):
+        if not isinstance(source, dict):
+            continue
+        for key in _CANDIDATE_ID_KEYS:
+            value = source.get(key)
+            if value is None or (isinstance(value, str) and not value.strip()):
+                continue
+            return bool(value)
+    return False
+
+
+def _iter_feed_candidates(payload):
+    # Pre-order walk with an explicit stack of iterators, yielding dicts that carry an
+    # id-like key. Scalars are skipped by the inner for-loop without touching the stack.
+    stack = [iter((payload,))]
+    while stack:
+        for node in stack[-1]:
+            if isinstance(node, dict):
+                if _is_feed_candidate(node):
+                    yield node
+                stack.append(iter(node.values()))
+                break
+            if isinstance(node, list):
+                stack.append(iter(node))
+                break
+        else:
+            stack.pop()
 
 
+@timed("normalize_search_results")
 def normalize_search_results(payload, keyword):
     rows = []
     seen = set()
+    crawl_ts = datetime.now().isoformat(timespec="seconds")
+    sources = [None, None, None, None]
 
-    for item in _collect_feed_candidates(payload):
-        card = item.get("noteCard") if isinstance(item.get("noteCard"), dict) else item
-
-        feed_id = _first(
-            item.get("id"),
-            item.get("feed_id"),
-            item.get("feedId"),
-            card.get("id"),
-            card.get("feed_id"),
-            card.get("feedId"),
-            card.get("noteId"),
-            card.get("note_id"),
-        )
-        note_id = _first(
-            card.get("noteId"),
-            card.get("note_id"),
-            item.get("noteId"),
-            item.get("note_id"),
-            feed_id,
-        )
+    for item in _iter_feed_candidates(payload):
+        note_card = item.get("noteCard")
+        card = note_card if isinstance(note_card, dict) else item
+        sources[_ITEM] = item
+        sources[_CARD] = card
 
-        note_id = str(note_id)
+        feed_id = _pick(sources, _FEED_ID_ALIASES)
+        note_id = str(_pick(sources, _NOTE_ID_ALIASES, feed_id))
         if not note_id:
             continue
         if note_id in seen:
             continue
         seen.add(note_id)
 
-        interact = (
-            card.get("interactInfo")
-            or card.get("interact_info")
-            or card.get("interaction")
-            or item.get("interactInfo")
-            or item.get("interact_info")
-            or {}
-        )
-        user = (
-            card.get("user")
-            or card.get("author")
-            or item.get("user")
-            or item.get("author")
-            or {}
-        )
-
-        title = _first(
-            card.get("title"),
-            card.get("displayTitle"),
-            card.get("note_title"),
-            card.get("name"),
-            item.get("title"),
-            "",
-        )
-        desc = _first(
-            card.get("desc"),
-            card.get("description"),
-            card.get("content"),
-            card.get("note_content"),
-            item.get("desc"),
-            "",
-        )
-        xsec_token = _first(
-            item.get("xsecToken"),
-            item.get("xsec_token"),
-            card.get("xsecToken"),
-            card.get("xsec_token"),
-            "",
-        )
+        interact = _pick_truthy(sources, _INTERACT_ALIASES)
+        user = _pick_truthy(sources, _USER_ALIASES)
+        sources[_INTERACT] = interact if isinstance(interact, dict) else _EMPTY
+        sources[_USER] = user if isinstance(user, dict) else _EMPTY
 
         row = {
             "keyword": keyword,
-            "crawl_ts": datetime.now().isoformat(timespec="seconds"),
+            "crawl_ts": crawl_ts,
             "feed_id": str(feed_id),
             "note_id": note_id,
-            "xsec_token": str(xsec_token),
-            "title": str(title),
-            "author": str(
-                _first(
-                    user.get("nickname"),
-                    user.get("nickName"),
-                    user.get("name"),
-                    user.get("username"),
-                    "",
-                )
-            ),
-            "publish_time": str(
-                _first(
-                    card.get("time"),
-                    card.get("publish_time"),
-                    card.get("publishTime"),
-                    item.get("time"),
-                    "",
-                )
-            ),
-            "likes": _to_int(
-                _first(
-                    interact.get("liked_count"),
-                    interact.get("like_count"),
-                    interact.get("likedCount"),
-                    interact.get("likeCount"),
-                    card.get("liked_count"),
-                    card.get("like_count"),
-                    card.get("likedCount"),
-                    card.get("likeCount"),
-                    card.get("likes"),
-                    0,
-                )
-            ),
-            "comments": _to_int(
-                _first(
-                    interact.get("comment_count"),
-                    interact.get("commentCount"),
-                    card.get("comment_count"),
-                    card.get("commentCount"),
-                    card.get("comments"),
-                    0,
-                )
-            ),
-            "collects": _to_int(
-                _first(
-                    interact.get("collected_count"),
-                    interact.get("collect_count"),
-                    interact.get("collectedCount"),
-                    interact.get("collectCount"),
-                    card.get("collected_count"),
-                    card.get("collect_count"),
-                    card.get("collectedCount"),
-                    card.get("collectCount"),
-                    card.get("collects"),
-                    0,
-                )
-            ),
-            "shares": _to_int(
-                _first(
-                    interact.get("share_count"),
-                    interact.get("shared_count"),
-                    interact.get("shareCount"),
-                    interact.get("sharedCount"),
-                    card.get("share_count"),
-                    card.get("shared_count"),
-                    card.get("shareCount"),
-                    card.get("sharedCount"),
-                    card.get("shares"),
-                    0,
-                )
-            ),
-            "desc": str(desc),
-            "detail_content": "",
-            "detail_tags": "",
-            "detail_opened": False,
+            "xsec_token": str(_pick(sources, _XSEC_TOKEN_ALIASES)),
         }
-
-        note_url = _first(
-            card.get("note_url"),
-            card.get("url"),
-            item.get("note_url"),
-            item.get("url"),
-            "",
-        )
+        for field, aliases in _TEXT_FIELDS:
+            row[field] = str(_pick(sources, aliases))
+        row["publish_ts"] = parse_publish_time_to_epoch_seconds(row["publish_time"])
+        for field, aliases in _COUNT_FIELDS:
+            row[field] = _to_int(_pick(sources, aliases, 0))
+        row["desc"] = str(_pick(sources, _DESC_ALIASES))
+        row["detail_content"] = ""
+        row["detail_tags"] = ""
+        row["detail_opened"] = False
+
+        note_url = _pick(sources, _NOTE_URL_ALIASES)
         if note_url:
             row["note_url"] = str(note_url)
         else:
@@ -266,6 +350,7 @@ def normalize_search_results(payload, keyword):
     return rows
 
 
+@timed("merge_detail_into_row")
 def merge_detail_into_row(row, detail):
     if not isinstance(detail, dict):
         return row
@@ -310,6 +395,7 @@ def merge_detail_into_row(row, detail):
     merged["title"] = str(title)
     merged["author"] = str(author)
     merged["publish_time"] = str(publish_time)
+    merged["publish_ts"] = parse_publish_time_to_epoch_seconds(merged["publish_time"])
 
     merged["likes"] = _to_int(
         _first(
@@ -1,24 +1,237 @@
 import csv
 import json
+import os
+import re
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+WRITE_BUFFER_BYTES = 1 << 20
+
+# mkstemp creates 0600 files and names them <prefix><8 random chars><suffix>.
+_TEMP_NAME = re.compile(r"^\.(?P<name>.+)\.[A-Za-z0-9_]{8}\.tmp$")
+_umask = None
+
 
 def ensure_dir(path):
     Path(path).mkdir(parents=True, exist_ok=True)
 
 
-def write_jsonl(path, rows):
+class AtomicWriteBatch:
+    """Publish a group of files together: each write goes to a temp file next to its target,
+    and commit() fsyncs the temps, renames them over the targets and fsyncs each directory
+    once. On error nothing is renamed, so readers only ever see complete files. With
+    sweep_stale, temps a crashed run left next to each target are removed first; only use it
+    while holding the lock that serializes writers of those targets.
+    """
+
+    def __init__(self, fsync=True, sweep_stale=False):
+        self.fsync = fsync
+        self.sweep_stale = sweep_stale
+        self._pending = []
+        self._after_commit = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def add(self, tmp_path, path):
+        with self._lock:
+            self._pending.append((tmp_path, path))
+
+    def pending_temps(self):
+        with self._lock:
+            return {str(tmp_path) for tmp_path, _ in self._pending}
+
+    def after_commit(self, fn, *args):
+        """Run fn(*args) once the files are published, e.g. an append to a log that the batch
+        cannot stage as a whole-file replace; dropped on abort."""
+        with self._lock:
+            self._after_commit.append((fn, args))
+
+    def commit(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            after_commit, self._after_commit = self._after_commit, []
+        if self.fsync:
+            for tmp_path, _ in pending:
+                _fsync_path(tmp_path)
+        for tmp_path, path in pending:
+            os.replace(tmp_path, path)
+        if self.fsync:
+            for directory in sorted({str(Path(path).parent) for _, path in pending}):
+                _fsync_dir(directory)
+        for fn, args in after_commit:
+            fn(*args)
+
+    def abort(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._after_commit = []
+        for tmp_path, _ in pending:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+
+
+@contextmanager
+def atomic_open(path, mode="w", batch=None, **kwargs):
+    """Open a temp file that replaces `path` on success (now, or on batch.commit())."""
     path = Path(path)
     ensure_dir(path.parent)
-    with path.open("w", encoding="utf-8") as f:
-        for row in rows:
-            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    if batch is not None and batch.sweep_stale:
+        remove_stale_temps(path, keep=batch.pending_temps())
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix="." + path.name + ".", suffix=".tmp")
+    try:
+        _chmod_like_target(fd, tmp_path, path)
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+            if batch is None:
+                f.flush()
+                os.fsync(f.fileno())
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    if batch is None:
+        os.replace(tmp_path, path)
+        _fsync_dir(path.parent)
+    else:
+        batch.add(tmp_path, path)
+
+
+def remove_stale_temps(path, keep=()):
+    """Delete atomic_open temps for `path` that were never published (the writer died)."""
+    path = Path(path)
+    removed = 0
+    try:
+        siblings = list(os.scandir(path.parent))
+    except FileNotFoundError:
+        return 0
+    for entry in siblings:
+        found = _TEMP_NAME.match(entry.name)
+        if found is None or found.group("name") != path.name or entry.path in keep:
+            continue
+        try:
+            os.unlink(entry.path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def _chmod_like_target(fd, tmp_path, path):
+    # keep a replaced file's mode; a new file gets the mode open() would have given it
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_process_umask()
+    if hasattr(os, "fchmod"):
+        os.fchmod(fd, mode)
+    else:
+        os.chmod(tmp_path, mode)
+
+
+def _process_umask():
+    global _umask
+    if _umask is None:
+        try:
+            with open("/proc/self/status", encoding="ascii") as f:
+                _umask = next(int(line.split()[1], 8) for line in f if line.startswith("Umask:"))
+        except (OSError, StopIteration, ValueError, IndexError):
+            # no procfs: the only portable read is set-and-restore, done once
+            _umask = os.umask(0o022)
+            os.umask(_umask)
+    return _umask
 
 
-def write_csv(path, rows, fieldnames=None):
+def write_text(path, text, batch=None):
+    with atomic_open(path, "w", batch=batch, encoding="utf-8") as f:
+        f.write(text)
+
+
+@contextmanager
+def file_lock(path, timeout=None, poll_seconds=0.2):
+    """Hold an exclusive advisory lock on `path` (created if missing).
+
+    Raises TimeoutError if it cannot be taken within `timeout` seconds (None waits forever).
+    """
     path = Path(path)
     ensure_dir(path.parent)
+    with path.open("a+") as f:
+        if fcntl is not None:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise TimeoutError("lock busy: %s" % path)
+                    time.sleep(poll_seconds)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(directory):
+    if os.name == "nt":
+        return
+    fd = os.open(str(directory), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_jsonl(path, rows, batch=None):
+    with atomic_open(path, "w", batch=batch, encoding="utf-8", buffering=WRITE_BUFFER_BYTES) as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
 
+def csv_fieldnames(rows):
+    """Union of row keys in order of first appearance."""
+    seen = []
+    seen_set = set()
+    for row in rows:
+        if seen_set.issuperset(row):
+            continue
+        for key in row:
+            if key in seen_set:
+                continue
+            seen_set.add(key)
+            seen.append(key)
+    return seen
+
+
+def write_csv(path, rows, fieldnames=None, batch=None):
     rows = list(rows)
     if not rows:
         if fieldnames is None:
@@ -26,17 +239,38 @@ def write_csv(path, rows, fieldnames=None):
             rows = [{"message": "no data"}]
 
     if fieldnames is None:
-        seen = []
-        seen_set = set()
-        for row in rows:
-            for key in row.keys():
-                if key in seen_set:
-                    continue
-                seen_set.add(key)
-                seen.append(key)
-        fieldnames = seen
-
-    with path.open("w", encoding="utf-8-sig", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+        fieldnames = csv_fieldnames(rows)
+
+    with atomic_open(path, "w", batch=batch, encoding="utf-8-sig", newline="", buffering=WRITE_BUFFER_BYTES) as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows([row.get(key, "") for key in fieldnames] for row in rows)
+
+
+def write_partition(rows, csv_paths=(), jsonl_paths=(), fieldnames=None, batch=None):
+    """Write one partition to every CSV and JSONL sink, deriving the CSV schema once."""
+    rows = list(rows)
+    if csv_paths and rows and fieldnames is None:
+        fieldnames = csv_fieldnames(rows)
+    for path in jsonl_paths:
+        write_jsonl(path, rows, batch=batch)
+    for path in csv_paths:
+        write_csv(path, rows, fieldnames=fieldnames, batch=batch)
+
+
+def write_partitions(partitions, workers=0, batch=None):
+    """Write dicts of write_partition keyword arguments, optionally on a thread pool.
+
+    Partitions that share an output path are written serially, in order, so the last one wins
+    exactly as with sequential writes.
+    """
+    partitions = list(partitions)
+    paths = [str(p) for part in partitions for p in (*part.get("csv_paths", ()), *part.get("jsonl_paths", ()))]
+    if workers <= 1 or len(partitions) <= 1 or len(paths) != len(set(paths)):
+        for part in partitions:
+            write_partition(batch=batch, **part)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(write_partition, batch=batch, **part) for part in partitions]:
+            future.result()
@@ -1,10 +1,14 @@
 import argparse
 import random
+import sys
 import time
+from datetime import date
 from pathlib import Path
 
 from .agent_reach_bridge import BridgeError
-from .pipeline import run_pipeline
+from .pipeline import STORAGE_BACKENDS, RunOptions, run_pipeline
+from .transports import ON_MISSING, ReplayTransport, parse_latency
+from .trends import DEFAULT_WINDOWS, format_table, keyword_series, keyword_trends, load_daily_aggregates, rebuild_daily_aggregates
 
 
 def parse_args():
@@ -26,6 +30,116 @@ def parse_args():
     parser.add_argument("--window-random-delay", type=int, default=0, help="启动后随机延迟秒数（用于9-10点窗口调度）")
     parser.add_argument("--no-dedup-existing-day", action="store_true", help="不与当天历史结果去重合并")
     parser.add_argument("--fail-fast", action="store_true", help="遇到错误立即中断")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="从当天的断点日志（runlog/<日期>/checkpoint.jsonl）续跑，已完成的搜索/详情不再重复请求",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="用 cProfile 记录本次运行（主线程），写入 runlog/<日期>/profile.pstats",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default="",
+        help="运行结束（含失败）时写出 OpenMetrics/Prometheus 指标文件，供 node_exporter textfile collector 采集",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=0,
+        help="运行期间在 127.0.0.1:端口/metrics 提供实时指标（0 表示不开启）",
+    )
+    parser.add_argument(
+        "--mcp-command",
+        default="",
+        help="常驻 stdio MCP 服务命令（设置后整次运行复用一个会话，不再逐次启动 mcporter）",
+    )
+    parser.add_argument(
+        "--ready-ttl",
+        type=int,
+        default=21600,
+        help="agent-reach doctor 检查结果缓存秒数（0 表示每次都检查）",
+    )
+    parser.add_argument("--detail-workers", type=int, default=1, help="并发抓取详情的线程数")
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="把关键词轮流分给 N 个工作进程并行抓取（各自一个会话，共用 --request-rpm 速率预算，结果与单进程相同）",
+    )
+    parser.add_argument(
+        "--request-rpm",
+        type=float,
+        default=None,
+        help="搜索与详情请求全局每分钟上限（默认按随机/固定延迟加实测单次调用耗时推算串行速率，0 表示不限）",
+    )
+    parser.add_argument(
+        "--search-prefetch",
+        type=int,
+        default=0,
+        help="搜索预取队列长度（>0 时搜索与详情流水线并行，共用 --request-rpm 限速）",
+    )
+    parser.add_argument("--no-detail-cache", action="store_true", help="不使用跨运行详情缓存")
+    parser.add_argument(
+        "--detail-cache-ttl",
+        type=int,
+        default=21600,
+        help="详情缓存互动数新鲜期秒数（过期后沿用缓存正文，互动数取本次搜索结果）",
+    )
+    parser.add_argument("--detail-cache-max-age-days", type=int, default=30, help="详情缓存条目最长保留天数")
+    parser.add_argument("--detail-cache-max-entries", type=int, default=50000, help="详情缓存最多条目数（0 表示不限）")
+    parser.add_argument("--write-workers", type=int, default=0, help="并行写出分区文件的线程数（0/1 表示串行）")
+    parser.add_argument("--lock-timeout", type=float, default=0, help="等待同日运行锁的秒数（0 表示一直等待）")
+    parser.add_argument(
+        "--storage",
+        choices=STORAGE_BACKENDS,
+        default="csv",
+        help="分区明细存储：csv（默认）/ parquet（data/columnar，需要 pyarrow）/ both",
+    )
+    parser.add_argument(
+        "--snapshot-retention-days",
+        type=int,
+        default=30,
+        help="互动快照 latest.json 只保留最近 N 天出现过的笔记（0 表示不清理）",
+    )
+    parser.add_argument("--no-note-store", action="store_true", help="不写入/读取 data/store/notes.sqlite 历史库")
+    parser.add_argument(
+        "--dedup-days",
+        type=int,
+        default=0,
+        help="跨天去重：跳过前 N 天已入库的笔记（0 表示只与当天结果去重，需要历史库）",
+    )
+    parser.add_argument(
+        "--breaker-threshold",
+        type=int,
+        default=5,
+        help="搜索/详情同类故障（超时/未登录/传输错误）连续 N 次后熔断，本次运行剩余调用直接跳过；单条笔记错误不计入（0 表示不熔断）",
+    )
+    parser.add_argument(
+        "--adaptive-timeout-factor",
+        type=float,
+        default=3.0,
+        help="自适应超时：按已观测调用耗时（超时按超时值计）p95 × 系数收紧超时（不超过设置值，0 表示关闭）",
+    )
+    parser.add_argument("--record", default="", help="把每次 MCP 调用与返回追加记录到该 JSONL 文件（供 --replay 回放）")
+    parser.add_argument("--replay", default="", help="不连网络，从 --record 录制的 JSONL 文件回放调用（压测用）")
+    parser.add_argument(
+        "--replay-latency",
+        default="recorded",
+        help="回放延迟分布：recorded | fixed:S | uniform:LOW,HIGH | normal:MEAN,STD | lognormal:MEDIAN,SIGMA | exp:MEAN",
+    )
+    parser.add_argument("--replay-error-rate", type=float, default=0.0, help="回放时每次调用注入错误的概率")
+    parser.add_argument("--replay-timeout-rate", type=float, default=0.0, help="回放时每次调用注入超时的概率")
+    parser.add_argument("--replay-time-scale", type=float, default=1.0, help="回放等待时间缩放系数（如 0.01 表示加速 100 倍）")
+    parser.add_argument(
+        "--replay-on-missing",
+        choices=ON_MISSING,
+        default="error",
+        help="调用参数不在录制中时：error 报错，nearest 用同一工具的某条录制代替（放大关键词规模时使用）",
+    )
+    parser.add_argument("--replay-seed", type=int, default=0, help="回放注入的随机种子")
     args = parser.parse_args()
 
     if args.max_per_keyword < 0:
@@ -52,11 +166,106 @@ def parse_args():
         parser.error("--detail-sleep 必须 >= 0")
     if args.window_random_delay < 0:
         parser.error("--window-random-delay 必须 >= 0")
+    if args.ready_ttl < 0:
+        parser.error("--ready-ttl 必须 >= 0")
+    if args.detail_workers <= 0:
+        parser.error("--detail-workers 必须 > 0")
+    if args.shards <= 0:
+        parser.error("--shards 必须 > 0")
+    if args.shards > 1 and args.record:
+        parser.error("--record 不能与 --shards 同时使用")
+    if args.request_rpm is not None and args.request_rpm < 0:
+        parser.error("--request-rpm 必须 >= 0")
+    if args.search_prefetch < 0:
+        parser.error("--search-prefetch 必须 >= 0")
+    if args.detail_cache_ttl < 0:
+        parser.error("--detail-cache-ttl 必须 >= 0")
+    if args.detail_cache_max_age_days <= 0:
+        parser.error("--detail-cache-max-age-days 必须 > 0")
+    if args.detail_cache_max_entries < 0:
+        parser.error("--detail-cache-max-entries 必须 >= 0")
+    if args.write_workers < 0:
+        parser.error("--write-workers 必须 >= 0")
+    if args.lock_timeout < 0:
+        parser.error("--lock-timeout 必须 >= 0")
+    if args.breaker_threshold < 0:
+        parser.error("--breaker-threshold 必须 >= 0")
+    if args.adaptive_timeout_factor < 0:
+        parser.error("--adaptive-timeout-factor 必须 >= 0")
+    if args.replay and (args.record or args.mcp_command):
+        parser.error("--replay 不能与 --record / --mcp-command 同时使用")
+    try:
+        parse_latency(args.replay_latency)
+    except ValueError:
+        parser.error("--replay-latency 格式错误: %s" % args.replay_latency)
+    for name in ("replay_error_rate", "replay_timeout_rate"):
+        if not 0 <= getattr(args, name) <= 1:
+            parser.error("--%s 必须在 0-1 之间" % name.replace("_", "-"))
+    if args.replay_time_scale < 0:
+        parser.error("--replay-time-scale 必须 >= 0")
+    if not 0 <= args.metrics_port <= 65535:
+        parser.error("--metrics-port 必须在 0-65535 之间")
+    if args.snapshot_retention_days < 0:
+        parser.error("--snapshot-retention-days 必须 >= 0")
+    if args.dedup_days < 0:
+        parser.error("--dedup-days 必须 >= 0")
+    if args.dedup_days > 0 and args.no_note_store:
+        parser.error("--dedup-days 需要历史库，不能与 --no-note-store 同时使用")
+
+    return args
+
 
+def parse_trends_args(argv):
+    parser = argparse.ArgumentParser(prog="main trends", description="按关键词输出日环比与滚动窗口趋势")
+    parser.add_argument("--data-root", default="./data", help="输出数据目录")
+    parser.add_argument("--date", default=None, help="统计截止日期 YYYY-MM-DD（默认最近一天）")
+    parser.add_argument("--keyword", default=None, help="只看一个关键词的逐日趋势")
+    parser.add_argument("--days", type=int, default=14, help="--keyword 模式下输出的天数")
+    parser.add_argument("--windows", default=",".join(str(x) for x in DEFAULT_WINDOWS), help="滚动窗口天数，逗号分隔")
+    parser.add_argument("--rebuild", action="store_true", help="先从历史 all_rows.csv 重建日聚合")
+    args = parser.parse_args(argv)
+
+    try:
+        args.windows = tuple(int(x) for x in args.windows.split(",") if x.strip())
+    except ValueError:
+        parser.error("--windows 必须是逗号分隔的整数")
+    if not args.windows or min(args.windows) <= 0:
+        parser.error("--windows 必须 > 0")
+    if args.days <= 0:
+        parser.error("--days 必须 > 0")
+    if args.date is not None:
+        try:
+            date.fromisoformat(args.date)
+        except ValueError:
+            parser.error("--date 格式错误（应为 YYYY-MM-DD）: %s" % args.date)
     return args
 
 
+def trends_main(argv):
+    args = parse_trends_args(argv)
+    project_root = Path(__file__).resolve().parent.parent
+    data_root = (project_root / args.data_root).resolve()
+
+    if args.rebuild:
+        aggregates = rebuild_daily_aggregates(data_root)
+        print("[INFO] 已重建日聚合，天数:", len(aggregates))
+    else:
+        aggregates = load_daily_aggregates(data_root)
+    if not aggregates:
+        print("[ERROR] 没有日聚合数据，请先运行抓取或使用 --rebuild")
+        raise SystemExit(1)
+
+    if args.keyword:
+        rows = keyword_series(aggregates, args.keyword, end_date=args.date, days=args.days, windows=args.windows)
+    else:
+        rows = keyword_trends(aggregates, end_date=args.date, windows=args.windows)
+    print(format_table(rows))
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "trends":
+        return trends_main(sys.argv[2:])
+
     args = parse_args()
     project_root = Path(__file__).resolve().parent.parent
 
@@ -68,26 +277,67 @@ def main():
 
     keywords_file = (project_root / args.keywords_file).resolve()
     data_root = (project_root / args.data_root).resolve()
+    record_file, replay_file, metrics_file = (
+        (project_root / path).resolve() if path else None for path in (args.record, args.replay, args.metrics_file)
+    )
+
+    replay = None
+    if replay_file:
+        try:
+            replay = ReplayTransport.load(
+                replay_file,
+                latency=args.replay_latency,
+                error_rate=args.replay_error_rate,
+                timeout_rate=args.replay_timeout_rate,
+                time_scale=args.replay_time_scale,
+                on_missing=args.replay_on_missing,
+                seed=args.replay_seed,
+            )
+        except (OSError, ValueError, KeyError) as exc:
+            print("[ERROR] 回放文件读取失败:", exc)
+            raise SystemExit(1)
 
+    options = RunOptions(
+        max_per_keyword=args.max_per_keyword,
+        max_total_rows=args.max_total,
+        fetch_detail=not args.no_detail,
+        within_hours=args.within_hours,
+        dedup_with_existing_day=not args.no_dedup_existing_day,
+        search_timeout=args.search_timeout,
+        detail_timeout=args.detail_timeout,
+        search_retries=args.search_retries,
+        detail_retries=args.detail_retries,
+        retry_delay_seconds=args.retry_delay,
+        random_sleep_min_seconds=args.anti_min_sleep,
+        random_sleep_max_seconds=args.anti_max_sleep,
+        detail_sleep_seconds=args.detail_sleep,
+        continue_on_error=not args.fail_fast,
+        mcp_command=args.mcp_command or None,
+        ready_ttl_seconds=args.ready_ttl,
+        detail_workers=args.detail_workers,
+        request_rpm=args.request_rpm,
+        search_prefetch=args.search_prefetch,
+        use_detail_cache=not args.no_detail_cache,
+        detail_cache_ttl_seconds=args.detail_cache_ttl,
+        detail_cache_max_age_days=args.detail_cache_max_age_days,
+        detail_cache_max_entries=args.detail_cache_max_entries,
+        write_workers=args.write_workers,
+        lock_timeout_seconds=args.lock_timeout or None,
+        storage=args.storage,
+        use_note_store=not args.no_note_store,
+        snapshot_retention_days=args.snapshot_retention_days,
+        dedup_days=args.dedup_days,
+        breaker_threshold=args.breaker_threshold,
+        adaptive_timeout_factor=args.adaptive_timeout_factor,
+        resume=args.resume,
+        profile=args.profile,
+        metrics_file=str(metrics_file) if metrics_file else None,
+        metrics_port=args.metrics_port,
+        record_file=str(record_file) if record_file else None,
+        shards=args.shards,
+    )
     try:
-        out = run_pipeline(
-            keywords_file=str(keywords_file),
-            data_root=str(data_root),
-            max_per_keyword=args.max_per_keyword,
-            max_total_rows=args.max_total,
-            fetch_detail=not args.no_detail,
-            within_hours=args.within_hours,
-            dedup_with_existing_day=not args.no_dedup_existing_day,
-            search_timeout=args.search_timeout,
-            detail_timeout=args.detail_timeout,
-            search_retries=args.search_retries,
-            detail_retries=args.detail_retries,
-            retry_delay_seconds=args.retry_delay,
-            random_sleep_min_seconds=args.anti_min_sleep,
-            random_sleep_max_seconds=args.anti_max_sleep,
-            detail_sleep_seconds=args.detail_sleep,
-            continue_on_error=not args.fail_fast,
-        )
+        out = run_pipeline(str(keywords_file), str(data_root), options, session=replay)
     except BridgeError as exc:
         print("[ERROR]", str(exc))
         raise SystemExit(1)
@@ -102,6 +352,12 @@ def main():
     print("[DONE] 运行日志:", out["runlog_file"])
     print("[DONE] 错误明细:", out["error_file"])
     print("[DONE] 失败关键词文件:", out["failed_keywords_file"])
+    if out.get("columnar_dir"):
+        print("[DONE] 列式存储目录:", out["columnar_dir"])
+    if replay is not None:
+        print("[DONE] 回放统计:", replay.stats)
+    if out.get("profile_file"):
+        print("[DONE] 性能分析文件:", out["profile_file"], "(python -m pstats 查看)")
 
 
 if __name__ == "__main__":
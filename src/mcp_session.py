@@ -0,0 +1,206 @@
+import json
+import queue
+import subprocess
+import threading
+
+from .extractors import extract_json_payload
+from .profiling import timed
+
+MCP_PROTOCOL_VERSION = "2024-11-05"
+CLIENT_INFO = {"name": "xhs-agent-reach-analytics", "version": "0.1"}
+
+
+class McpSessionError(RuntimeError):
+    pass
+
+
+class McpToolError(McpSessionError):
+    """The server answered the call with isError; the session itself is fine."""
+
+
+class McpSessionTimeout(McpSessionError):
+    def __init__(self, timeout):
+        super().__init__(timeout)
+        self.timeout = timeout
+
+    def __str__(self):
+        return "command timeout after %ss" % self.timeout
+
+
+class McpSession:
+    """One long-lived stdio MCP server process spoken to over JSON-RPC.
+
+    Calls on one session are serialized; use McpSessionPool for parallel callers.
+    A timed-out or broken session kills its process and restarts on the next call.
+    """
+
+    def __init__(self, command, startup_timeout=30):
+        self.command = list(command)
+        self.startup_timeout = startup_timeout
+        self._proc = None
+        self._messages = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @timed("mcp_session_call")
+    def call_tool(self, name, arguments, timeout=120):
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            result = self._request(
+                "tools/call",
+                {"name": name, "arguments": dict(arguments)},
+                timeout=timeout,
+            )
+
+        if not isinstance(result, dict):
+            return result
+        if isinstance(result.get("structuredContent"), dict) and not result.get("isError"):
+            return result["structuredContent"]
+
+        text = "\n".join(
+            str(item.get("text", ""))
+            for item in result.get("content") or []
+            if isinstance(item, dict) and item.get("type") == "text"
+        ).strip()
+        if result.get("isError"):
+            raise McpToolError(text or "tool call failed")
+        try:
+            return extract_json_payload(text)
+        except Exception:
+            return {"raw_output": text}
+
+    def close(self):
+        proc = self._proc
+        self._proc = None
+        if proc is None:
+            return
+        try:
+            if proc.stdin:
+                proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+    def _start(self):
+        self.close()
+        try:
+            proc = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding="utf-8",
+                bufsize=1,
+            )
+        except FileNotFoundError:
+            raise McpSessionError("MCP 命令不存在: %s" % self.command[0])
+
+        messages = queue.Queue()
+        reader = threading.Thread(target=_read_messages, args=(proc.stdout, messages), daemon=True)
+        reader.start()
+
+        self._proc = proc
+        self._messages = messages
+        self._request(
+            "initialize",
+            {
+                "protocolVersion": MCP_PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": CLIENT_INFO,
+            },
+            timeout=self.startup_timeout,
+        )
+        self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    def _request(self, method, params, timeout):
+        self._next_id += 1
+        request_id = self._next_id
+        self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+
+        try:
+            while True:
+                message = self._messages.get(timeout=timeout)
+                if message is None:
+                    self._kill()
+                    raise McpSessionError("MCP 会话已断开")
+                if message.get("id") != request_id:
+                    continue
+                if "error" in message:
+                    error = message["error"] or {}
+                    raise McpSessionError(str(error.get("message") or error))
+                return message.get("result")
+        except queue.Empty:
+            self._kill()
+            raise McpSessionTimeout(timeout)
+
+    def _send(self, message):
+        try:
+            self._proc.stdin.write(json.dumps(message, ensure_ascii=False) + "\n")
+            self._proc.stdin.flush()
+        except (OSError, ValueError):
+            self._kill()
+            raise McpSessionError("MCP 会话已断开")
+
+    def _kill(self):
+        proc = self._proc
+        self._proc = None
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+class McpSessionPool:
+    """A fixed number of McpSession processes shared by concurrent callers."""
+
+    def __init__(self, command, size=1, startup_timeout=30):
+        self.size = max(1, int(size))
+        self._sessions = [McpSession(command, startup_timeout=startup_timeout) for _ in range(self.size)]
+        self._idle = queue.Queue()
+        for session in self._sessions:
+            self._idle.put(session)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def call_tool(self, name, arguments, timeout=120):
+        session = self._idle.get()
+        try:
+            return session.call_tool(name, arguments, timeout=timeout)
+        finally:
+            self._idle.put(session)
+
+    def close(self):
+        for session in self._sessions:
+            session.close()
+
+
+def _read_messages(stream, messages):
+    try:
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(message, dict):
+                messages.put(message)
+    except (OSError, ValueError):
+        pass
+    messages.put(None)
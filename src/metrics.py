@@ -0,0 +1,154 @@
+"""OpenMetrics / Prometheus text exposition of one run's telemetry.
+
+RunMetrics renders the run's StageTimings (see profiling): stage durations as a histogram (bridge
+call latency, anti-bot and retry sleeps, parsing, writes) and its counters (rows, keywords,
+errors, retries), plus gauges describing the run itself. write_textfile() publishes it for
+node_exporter's textfile collector; MetricsServer serves it on a local port while a run is live.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .io_utils import write_text
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# StageTimings counter name -> (metric name, label name, help, label values always exported)
+COUNTERS = {
+    "rows": ("xhs_rows_collected", "", "Rows kept by this run before merging with the day's report", ("",)),
+    "keywords": ("xhs_keywords_searched", "result", "Keyword searches by result", ("ok", "failed")),
+    "errors": ("xhs_errors", "stage", "Errors recorded in errors.json by stage", ("search", "detail", "breaker")),
+    "bridge_retries": ("xhs_bridge_retries", "kind", "Bridge call retries", ("mcporter", "MCP")),
+}
+
+
+class RunMetrics:
+    def __init__(self, timings, clock=time.time):
+        self.timings = timings
+        self._clock = clock
+        self.started = clock()
+        self.finished = None
+        self.success = None
+        self.saved_rows = None
+
+    def finish(self, success, saved_rows=None):
+        if self.finished is None:
+            self.finished = self._clock()
+            self.success = bool(success)
+            self.saved_rows = saved_rows
+
+    def render(self, openmetrics=True):
+        lines = []
+        counters = self.timings.counters()
+        for name, (metric, label_name, help_text, defaults) in COUNTERS.items():
+            sample = metric + "_total"
+            family = metric if openmetrics else metric + "_total"
+            _header(lines, family, "counter", help_text)
+            labels = dict.fromkeys(defaults, 0)
+            labels.update((label, value) for (key, label), value in counters.items() if key == name)
+            for label, value in sorted(labels.items()):
+                lines.append("%s%s %s" % (sample, _labels({label_name: label} if label_name else {}), _num(value)))
+
+        _header(lines, "xhs_stage_duration_seconds", "histogram", "Wall time per instrumented stage")
+        for stage, values in sorted(self.timings.samples().items()):
+            index = 0
+            for bound in DURATION_BUCKETS:
+                while index < len(values) and values[index] <= bound:
+                    index += 1
+                lines.append(
+                    "xhs_stage_duration_seconds_bucket%s %s" % (_labels({"stage": stage, "le": _num(bound)}), index)
+                )
+            lines.append("xhs_stage_duration_seconds_bucket%s %s" % (_labels({"stage": stage, "le": "+Inf"}), len(values)))
+            lines.append("xhs_stage_duration_seconds_sum%s %s" % (_labels({"stage": stage}), _num(sum(values))))
+            lines.append("xhs_stage_duration_seconds_count%s %s" % (_labels({"stage": stage}), len(values)))
+
+        end = self.finished if self.finished is not None else self._clock()
+        gauges = [
+            ("xhs_run_start_timestamp_seconds", "Start of the run (unix time)", self.started),
+            ("xhs_run_duration_seconds", "Run wall time so far, or in total once finished", end - self.started),
+            ("xhs_run_in_progress", "1 while the run is live", 1 if self.finished is None else 0),
+        ]
+        if self.finished is not None:
+            gauges.append(("xhs_run_success", "1 if the run saved its outputs", 1 if self.success else 0))
+            gauges.append(("xhs_run_end_timestamp_seconds", "End of the run (unix time)", self.finished))
+        if self.saved_rows is not None:
+            gauges.append(("xhs_report_rows", "Rows in the day's report after this run", self.saved_rows))
+        for metric, help_text, value in gauges:
+            _header(lines, metric, "gauge", help_text)
+            lines.append("%s %s" % (metric, _num(value)))
+
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def write_textfile(path, run_metrics):
+    """Publish the metrics for node_exporter's textfile collector (Prometheus text format,
+    atomically renamed into place). An unfinished run is recorded as failed.
+    """
+    run_metrics.finish(success=False)
+    write_text(path, run_metrics.render(openmetrics=False))
+
+
+class MetricsServer:
+    """Serve a RunMetrics on http://host:port/metrics from a daemon thread."""
+
+    def __init__(self, run_metrics, port, host="127.0.0.1"):
+        metrics = run_metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+                body = metrics.render(openmetrics=openmetrics).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, int(port)), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=1.0)
+
+
+def _header(lines, family, kind, help_text):
+    lines.append("# HELP %s %s" % (family, help_text))
+    lines.append("# TYPE %s %s" % (family, kind))
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (key, _escape(value)) for key, value in labels.items())
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
@@ -0,0 +1,158 @@
+import json
+import sqlite3
+from pathlib import Path
+
+from .io_utils import ensure_dir
+
+# Stay well below SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds.
+_IN_CHUNK = 500
+
+
+class NoteStore:
+    """Every saved report row, one record per (crawl_date, note), in a WAL-mode SQLite file.
+
+    save_day() replaces a day's rows in one transaction, mirroring how the day's report files
+    are rewritten on every run. History queries (rows of a day, notes seen in a date range,
+    first-seen dates, publish_ts ranges) go through the indexes instead of rereading CSVs.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        ensure_dir(self.path.parent)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS notes (
+                crawl_date TEXT NOT NULL,
+                note_key TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                note_id TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                publish_ts INTEGER,
+                row TEXT NOT NULL,
+                PRIMARY KEY (crawl_date, note_key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_notes_note_id ON notes (note_id);
+            CREATE INDEX IF NOT EXISTS idx_notes_note_key ON notes (note_key, crawl_date);
+            CREATE INDEX IF NOT EXISTS idx_notes_keyword ON notes (keyword, publish_ts);
+            CREATE INDEX IF NOT EXISTS idx_notes_publish_ts ON notes (publish_ts);
+            CREATE INDEX IF NOT EXISTS idx_notes_crawl_date ON notes (crawl_date, position);
+            CREATE TABLE IF NOT EXISTS saved_days (
+                crawl_date TEXT PRIMARY KEY,
+                saved_ts TEXT NOT NULL,
+                row_count INTEGER NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def save_day(self, crawl_date, rows, saved_ts=""):
+        records = []
+        seen = set()
+        for row in rows:
+            key = note_key(row)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            records.append(
+                (
+                    crawl_date,
+                    key,
+                    len(records),
+                    str(row.get("note_id") or ""),
+                    str(row.get("keyword") or ""),
+                    _publish_ts(row),
+                    json.dumps(row, ensure_ascii=False),
+                )
+            )
+
+        with self._conn:
+            self._conn.execute("DELETE FROM notes WHERE crawl_date = ?", (crawl_date,))
+            self._conn.executemany(
+                "INSERT INTO notes (crawl_date, note_key, position, note_id, keyword, publish_ts, row) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO saved_days (crawl_date, saved_ts, row_count) VALUES (?, ?, ?)",
+                (crawl_date, saved_ts, len(records)),
+            )
+        return len(records)
+
+    def has_day(self, crawl_date):
+        found = self._conn.execute("SELECT 1 FROM saved_days WHERE crawl_date = ?", (crawl_date,)).fetchone()
+        return found is not None
+
+    def rows_for_date(self, crawl_date):
+        cursor = self._conn.execute("SELECT row FROM notes WHERE crawl_date = ? ORDER BY position", (crawl_date,))
+        return [json.loads(found[0]) for found in cursor]
+
+    def keys_seen_between(self, start_date, end_date):
+        """Note keys saved on crawl dates in [start_date, end_date)."""
+        cursor = self._conn.execute(
+            "SELECT DISTINCT note_key FROM notes WHERE crawl_date >= ? AND crawl_date < ?",
+            (start_date, end_date),
+        )
+        return {found[0] for found in cursor}
+
+    def first_seen(self, keys):
+        """Earliest crawl date of each known key; unknown keys are left out."""
+        keys = list(dict.fromkeys(k for k in keys if k))
+        out = {}
+        for start in range(0, len(keys), _IN_CHUNK):
+            chunk = keys[start : start + _IN_CHUNK]
+            cursor = self._conn.execute(
+                "SELECT note_key, MIN(crawl_date) FROM notes WHERE note_key IN (%s) GROUP BY note_key"
+                % ",".join("?" * len(chunk)),
+                chunk,
+            )
+            out.update(cursor.fetchall())
+        return out
+
+    def rows_published_between(self, min_publish_ts=None, max_publish_ts=None, keywords=None):
+        """Stored rows in a publish_ts range, newest crawl first (so a dedup pass keeps the latest)."""
+        clauses = []
+        params = []
+        if min_publish_ts is not None:
+            clauses.append("publish_ts >= ?")
+            params.append(int(min_publish_ts))
+        if max_publish_ts is not None:
+            clauses.append("publish_ts <= ?")
+            params.append(int(max_publish_ts))
+        if keywords is not None:
+            keywords = [str(k) for k in keywords]
+            if not keywords:
+                return []
+            clauses.append("keyword IN (%s)" % ",".join("?" * len(keywords)))
+            params.extend(keywords)
+
+        sql = "SELECT row FROM notes"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY crawl_date DESC, position"
+        return [json.loads(found[0]) for found in self._conn.execute(sql, params)]
+
+    def close(self):
+        self._conn.close()
+
+
+def note_key(row):
+    return str(row.get("note_id") or row.get("feed_id") or row.get("note_url") or row.get("title") or "").strip()
+
+
+def _publish_ts(row):
+    value = row.get("publish_ts")
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
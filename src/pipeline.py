@@ -1,14 +1,45 @@
 import csv
+import functools
+import heapq
+import itertools
 import json
+import multiprocessing
+import queue
 import random
+import threading
 import time
-from datetime import datetime, timezone
+from contextlib import ExitStack
+from dataclasses import dataclass, replace
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-from .agent_reach_bridge import BridgeError, check_agent_reach_ready, get_feed_detail, search_feeds
-from .analytics import build_keyword_summary
-from .extractors import merge_detail_into_row, normalize_search_results
-from .io_utils import ensure_dir, write_csv, write_jsonl
+from . import columnar_store, profiling
+from .agent_reach_bridge import (
+    BridgeError,
+    CircuitBreaker,
+    LatencyTracker,
+    check_agent_reach_ready,
+    get_feed_detail,
+    open_session,
+    search_feeds,
+)
+from .analytics import analyze_keywords, summary_from_metrics
+from .checkpoint import CheckpointJournal, checkpoint_path
+from .detail_cache import DetailCache
+from .extractors import (
+    merge_detail_into_row,
+    normalize_search_results,
+    parse_publish_time_to_epoch_seconds,
+    row_publish_ts,
+)
+from .io_utils import AtomicWriteBatch, ensure_dir, file_lock, write_partitions, write_text
+from .metrics import MetricsServer, RunMetrics, write_textfile
+from .note_store import NoteStore, note_key
+from .rate_limit import SharedTokenBucket, TokenBucket
+from .snapshots import RETENTION_DAYS as SNAPSHOT_RETENTION_DAYS, SnapshotLog, keyword_growth, note_growth
+from .transports import McporterTransport, RecordingTransport
+from .trends import update_daily_aggregates
 
 
 def read_keywords(path):
@@ -26,84 +57,79 @@ def read_keywords(path):
     return out
 
 
-def parse_publish_time_to_epoch_seconds(value):
-    if value is None:
-        return 0
-
-    if isinstance(value, (int, float)):
-        raw = int(value)
-    else:
-        text = str(value).strip()
-        if not text:
-            return 0
-        if text.isdigit():
-            raw = int(text)
-        else:
-            iso_text = text.replace("Z", "+00:00")
-            try:
-                dt = datetime.fromisoformat(iso_text)
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                return int(dt.timestamp())
-            except Exception:
-                return 0
-
-    if raw > 1_000_000_000_000:
-        return raw // 1000
-    if raw > 1_000_000_000:
-        return raw
-    return 0
-
-
-def filter_rows_recent_hours(rows, within_hours=24, now_epoch_seconds=None):
-    rows = list(rows)
+def iter_recent_rows(rows, within_hours=24, now_epoch_seconds=None):
+    """Yield rows published within the last `within_hours`."""
     if within_hours <= 0:
-        return rows
+        yield from rows
+        return
 
     now_ts = int(now_epoch_seconds or datetime.now(timezone.utc).timestamp())
     min_ts = now_ts - int(within_hours * 3600)
 
-    out = []
     for row in rows:
-        publish_ts = parse_publish_time_to_epoch_seconds(row.get("publish_time"))
+        publish_ts = row_publish_ts(row)
         if publish_ts <= 0:
             continue
         if publish_ts < min_ts:
             continue
-        new_row = dict(row)
-        new_row["publish_ts"] = str(publish_ts)
-        out.append(new_row)
+        yield row
 
-    return out
 
+def filter_rows_recent_hours(rows, within_hours=24, now_epoch_seconds=None):
+    return list(iter_recent_rows(rows, within_hours=within_hours, now_epoch_seconds=now_epoch_seconds))
 
-def dedup_rows(rows):
-    out = []
+
+dedup_key = note_key
+
+
+def iter_dedup_rows(rows):
     seen = set()
 
     for row in rows:
-        key = str(
-            row.get("note_id")
-            or row.get("feed_id")
-            or row.get("note_url")
-            or row.get("title")
-            or ""
-        ).strip()
+        key = dedup_key(row)
         if not key:
             continue
         if key in seen:
             continue
         seen.add(key)
-        out.append(row)
+        yield row
+
+
+def dedup_rows(rows):
+    return list(iter_dedup_rows(rows))
 
-    return out
+
+def prefilter_rows(rows, seen_keys, min_publish_ts=0):
+    """Split rows into (kept, dropped) before the detail stage: seen keys and stale publish times go."""
+    kept = []
+    dropped = []
+    batch_keys = set()
+
+    for row in rows:
+        key = dedup_key(row)
+        if key and (key in seen_keys or key in batch_keys):
+            dropped.append(row)
+            continue
+        publish_ts = row_publish_ts(row)
+        if min_publish_ts > 0 and 0 < publish_ts < min_publish_ts:
+            dropped.append(row)
+            continue
+        if key:
+            batch_keys.add(key)
+        kept.append(row)
+
+    return kept, dropped
 
 
 def sort_rows_by_publish_time_desc(rows):
-    def sort_key(row):
-        return parse_publish_time_to_epoch_seconds(row.get("publish_time"))
+    return sorted(rows, key=row_publish_ts, reverse=True)
 
-    return sorted(list(rows), key=sort_key, reverse=True)
+
+def top_rows_by_publish_time(rows, limit=0):
+    """Newest-first rows, at most `limit` of them (0 = all), via a heap when limited."""
+    if limit > 0:
+        return heapq.nlargest(limit, rows, key=row_publish_ts)
+    return sort_rows_by_publish_time_desc(rows)
 
 
 def load_existing_report_rows(data_root, crawl_date):
@@ -115,6 +141,14 @@ def load_existing_report_rows(data_root, crawl_date):
         return list(csv.DictReader(f))
 
 
+def load_existing_day_rows(data_root, crawl_date, note_store=None):
+    """A day's saved report rows, from the note store when it has that day, else all_rows.csv."""
+    if note_store is not None and note_store.has_day(crawl_date):
+        return note_store.rows_for_date(crawl_date)
+    return load_existing_report_rows(data_root, crawl_date)
+
+
+@profiling.timed("random_sleep")
 def random_sleep(min_seconds, max_seconds):
     if max_seconds < min_seconds:
         min_seconds, max_seconds = max_seconds, min_seconds
@@ -130,157 +164,722 @@ def random_sleep(min_seconds, max_seconds):
         time.sleep(delay)
 
 
-def collect_once(
-    keywords,
-    max_per_keyword=30,
-    max_total_rows=200,
-    fetch_detail=True,
-    within_hours=24,
-    search_timeout=180,
-    detail_timeout=120,
-    search_retries=2,
-    detail_retries=1,
-    retry_delay_seconds=1.0,
-    random_sleep_min_seconds=0.8,
-    random_sleep_max_seconds=2.8,
-    detail_sleep_seconds=0.0,
-    continue_on_error=True,
+@dataclass(frozen=True)
+class CollectOptions:
+    max_per_keyword: int = 30
+    max_total_rows: int = 200
+    fetch_detail: bool = True
+    within_hours: int = 24
+    search_timeout: int = 180
+    detail_timeout: int = 120
+    search_retries: int = 2
+    detail_retries: int = 1
+    retry_delay_seconds: float = 1.0
+    random_sleep_min_seconds: float = 0.8
+    random_sleep_max_seconds: float = 2.8
+    detail_sleep_seconds: float = 0.0
+    continue_on_error: bool = True
+    mcp_command: object = None
+    ready_ttl_seconds: int = 21600
+    detail_workers: int = 1
+    request_rpm: object = None
+    search_prefetch: int = 0
+    use_detail_cache: bool = True
+    detail_cache_ttl_seconds: int = 21600
+    detail_cache_max_age_days: int = 30
+    detail_cache_max_entries: int = 50000
+    breaker_threshold: int = 5
+    adaptive_timeout_factor: float = 3.0
+    record_file: object = None
+
+
+@dataclass(frozen=True)
+class RunOptions(CollectOptions):
+    dedup_with_existing_day: bool = True
+    write_workers: int = 0
+    lock_timeout_seconds: object = None
+    storage: str = "csv"
+    use_note_store: bool = True
+    dedup_days: int = 0
+    snapshot_retention_days: int = SNAPSHOT_RETENTION_DAYS
+    resume: bool = False
+    profile: bool = False
+    metrics_file: object = None
+    metrics_port: int = 0
+    shards: int = 1
+
+
+def _options(cls, options, overrides):
+    # keyword arguments named like the fields override the options object
+    options = options if options is not None else cls()
+    return replace(options, **overrides) if overrides else options
+
+
+# until detail calls have been timed, a serial request is assumed to take this long
+ASSUMED_CALL_SECONDS = 1.0
+
+
+def serial_request_rpm(
+    random_sleep_min_seconds, random_sleep_max_seconds, detail_sleep_seconds=0.0, call_seconds=ASSUMED_CALL_SECONDS
 ):
-    check_agent_reach_ready()
-
-    crawl_date = datetime.now().strftime("%Y-%m-%d")
-    crawl_ts = datetime.now().isoformat(timespec="seconds")
+    """Serial detail request rate: one call, then one pacing sleep, per interval."""
+    if detail_sleep_seconds > 0:
+        mean_sleep = float(detail_sleep_seconds)
+    else:
+        low = max(0.0, float(random_sleep_min_seconds))
+        high = max(0.0, float(random_sleep_max_seconds))
+        mean_sleep = (low + high) / 2.0
+    interval = mean_sleep + max(0.0, float(call_seconds))
+    if interval <= 0:
+        return 0.0
+    return 60.0 / interval
+
+
+def _serial_rpm(options, call_seconds=ASSUMED_CALL_SECONDS):
+    return serial_request_rpm(
+        options.random_sleep_min_seconds, options.random_sleep_max_seconds, options.detail_sleep_seconds, call_seconds
+    )
 
-    all_rows = []
-    raw_by_keyword = {}
-    errors = []
-    keyword_stats = []
 
-    for keyword in keywords:
-        if max_total_rows > 0 and len(all_rows) >= max_total_rows:
+def fetch_details_ordered(rows, fetch_one, executor=None, stop_on_error=False):
+    """fetch_one(row) -> (detail, error) for every row, in row order, optionally on an executor."""
+    outcomes = []
+    if executor is None:
+        for row in rows:
+            outcome = fetch_one(row)
+            outcomes.append(outcome)
+            if stop_on_error and outcome[1] is not None:
+                break
+        return outcomes
+
+    futures = [executor.submit(fetch_one, row) for row in rows]
+    for index, future in enumerate(futures):
+        outcome = future.result()
+        outcomes.append(outcome)
+        if stop_on_error and outcome[1] is not None:
+            for pending in futures[index + 1:]:
+                pending.cancel()
             break
-
+    return outcomes
+
+
+class SearchPrefetcher:
+    """Yield (keyword, payload, error) in keyword order, searching up to `depth` keywords ahead."""
+
+    _DONE = object()
+
+    def __init__(self, keywords, search_one, depth=0):
+        self.keywords = list(keywords)
+        self.search_one = search_one
+        self.depth = max(0, int(depth))
+        self._queue = queue.Queue(maxsize=self.depth) if self.depth > 0 else None
+        self._stop = threading.Event()
+        self._thread = None
+        self._depth_samples = []
+        self._search_idle = 0.0
+        self._detail_idle = 0.0
+
+    def __enter__(self):
+        if self._queue is not None:
+            self._thread = threading.Thread(target=self._produce, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __iter__(self):
+        if self._queue is None:
+            for keyword in self.keywords:
+                started = time.perf_counter()
+                payload, error = self.search_one(keyword)
+                self._detail_idle += time.perf_counter() - started
+                yield keyword, payload, error
+            return
+
+        while True:
+            self._depth_samples.append(self._queue.qsize())
+            started = time.perf_counter()
+            item = self._queue.get()
+            self._detail_idle += time.perf_counter() - started
+            if item is self._DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def close(self):
+        # no join timeout: a search still in flight must finish before the caller closes the
+        # session and checkpoint it uses; no new search starts once _stop is set
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        samples = self._depth_samples
+        return {
+            "search_prefetch": self.depth,
+            "queue_depth_max": max(samples) if samples else 0,
+            "queue_depth_avg": round(sum(samples) / len(samples), 2) if samples else 0.0,
+            "search_idle_seconds": round(self._search_idle, 3),
+            "detail_idle_seconds": round(self._detail_idle, 3),
+        }
+
+    def _produce(self):
         try:
-            payload = search_feeds(
-                keyword,
-                timeout=search_timeout,
-                retries=search_retries,
-                retry_delay_seconds=retry_delay_seconds,
-            )
-        except BridgeError as exc:
-            errors.append(
+            for keyword in self.keywords:
+                if self._stop.is_set():
+                    return
+                payload, error = self.search_one(keyword)
+                self._put((keyword, payload, error))
+        except Exception as exc:
+            self._put(exc)
+            return
+        self._put(self._DONE)
+
+    def _put(self, item):
+        started = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+        finally:
+            self._search_idle += time.perf_counter() - started
+
+
+class KeywordFold:
+    """Folds each keyword's search result and details into the crawl, in keyword order."""
+
+    def __init__(
+        self,
+        max_per_keyword=30,
+        max_total_rows=200,
+        fetch_detail=True,
+        within_hours=24,
+        continue_on_error=True,
+        known_keys=None,
+        min_publish_ts=None,
+    ):
+        self.max_per_keyword = max_per_keyword
+        self.max_total_rows = max_total_rows
+        self.fetch_detail = fetch_detail
+        self.within_hours = within_hours
+        self.continue_on_error = continue_on_error
+        self.crawl_date = datetime.now().strftime("%Y-%m-%d")
+        self.crawl_ts = datetime.now().isoformat(timespec="seconds")
+        self.snapshot_ts = int(datetime.now(timezone.utc).timestamp())
+        if min_publish_ts is None:
+            min_publish_ts = 0
+            if within_hours > 0:
+                min_publish_ts = int(datetime.now(timezone.utc).timestamp()) - int(within_hours * 3600)
+        self.min_publish_ts = min_publish_ts
+        self.rows = []
+        self.observed = {}
+        self.raw_payloads = {}
+        self.errors = []
+        self.keyword_stats = []
+        self.seen_keys = {str(x).strip() for x in known_keys or () if str(x).strip()}
+
+    @property
+    def full(self):
+        return self.max_total_rows > 0 and len(self.rows) >= self.max_total_rows
+
+    def add(self, keyword, payload, exc, fetch_details):
+        if exc is not None:
+            profiling.count("keywords", "failed")
+            profiling.count("errors", "search")
+            self.errors.append(
                 {
                     "stage": "search",
                     "keyword": keyword,
                     "error": str(exc),
                 }
             )
-            keyword_stats.append(
+            self.keyword_stats.append(
                 {
                     "keyword": keyword,
                     "search_ok": False,
                     "rows": 0,
                     "detail_errors": 0,
+                    "detail_calls_avoided": 0,
                 }
             )
-            if continue_on_error:
-                continue
-            raise
+            if self.continue_on_error:
+                return
+            raise exc
 
-        raw_by_keyword[keyword] = payload
+        self.raw_payloads[keyword] = payload
 
         rows = normalize_search_results(payload, keyword=keyword)
 
-        if max_per_keyword > 0:
-            rows = rows[:max_per_keyword]
+        if self.max_per_keyword > 0:
+            rows = rows[: self.max_per_keyword]
 
-        if max_total_rows > 0:
-            remain = max_total_rows - len(all_rows)
-            if remain <= 0:
-                break
-            rows = rows[:remain]
+        if self.max_total_rows > 0:
+            rows = rows[: self.max_total_rows - len(self.rows)]
+
+        rows, dropped = prefilter_rows(rows, self.seen_keys, min_publish_ts=self.min_publish_ts)
+        for row in dropped:
+            # re-crawled notes skip the detail fetch, but their search counts are still a snapshot
+            key = dedup_key(row)
+            if key in self.seen_keys:
+                self.observed.setdefault(key, row)
+        detail_calls_avoided = 0
+        if self.fetch_detail:
+            detail_calls_avoided = sum(1 for x in dropped if x.get("feed_id") and x.get("xsec_token"))
 
         detail_errors = 0
 
-        if fetch_detail:
+        if self.fetch_detail:
+            outcomes = fetch_details(rows)
             merged = []
-            for row in rows:
-                feed_id = row.get("feed_id", "")
-                xsec_token = row.get("xsec_token", "")
+            for row, (detail, exc) in zip(rows, outcomes):
                 detail_error = ""
-
-                if feed_id and xsec_token:
-                    try:
-                        detail = get_feed_detail(
-                            feed_id,
-                            xsec_token,
-                            timeout=detail_timeout,
-                            retries=detail_retries,
-                            retry_delay_seconds=retry_delay_seconds,
-                        )
-                    except BridgeError as exc:
-                        detail_error = str(exc)
-                        detail_errors += 1
-                        errors.append(
-                            {
-                                "stage": "detail",
-                                "keyword": keyword,
-                                "feed_id": str(feed_id),
-                                "note_id": str(row.get("note_id", "")),
-                                "error": detail_error,
-                            }
-                        )
-                        if continue_on_error:
-                            detail = {"_opened": False}
-                        else:
-                            raise
-                else:
+                if exc is not None:
+                    detail_error = str(exc)
+                    detail_errors += 1
+                    profiling.count("errors", "detail")
+                    self.errors.append(
+                        {
+                            "stage": "detail",
+                            "keyword": keyword,
+                            "feed_id": str(row.get("feed_id", "")),
+                            "note_id": str(row.get("note_id", "")),
+                            "error": detail_error,
+                        }
+                    )
+                    if not self.continue_on_error:
+                        raise exc
                     detail = {"_opened": False}
 
                 merged_row = merge_detail_into_row(row, detail)
                 merged_row["detail_error"] = detail_error
                 merged.append(merged_row)
 
-                if detail_sleep_seconds > 0:
-                    time.sleep(detail_sleep_seconds)
-                else:
-                    random_sleep(random_sleep_min_seconds, random_sleep_max_seconds)
-
             rows = merged
 
-        rows = filter_rows_recent_hours(rows, within_hours=within_hours)
-        rows = dedup_rows(rows)
+        rows = list(iter_dedup_rows(iter_recent_rows(rows, within_hours=self.within_hours)))
 
         for row in rows:
-            row["crawl_ts"] = crawl_ts
-            row["crawl_date"] = crawl_date
+            row["crawl_ts"] = self.crawl_ts
+            row["crawl_date"] = self.crawl_date
+            key = dedup_key(row)
+            self.seen_keys.add(key)
+            self.observed[key] = row
 
-        keyword_stats.append(
+        self.keyword_stats.append(
             {
                 "keyword": keyword,
                 "search_ok": True,
                 "rows": len(rows),
                 "detail_errors": detail_errors,
+                "detail_calls_avoided": detail_calls_avoided,
             }
         )
-        all_rows.extend(rows)
-
-    all_rows = dedup_rows(all_rows)
-    all_rows = sort_rows_by_publish_time_desc(all_rows)
-    if max_total_rows > 0:
-        all_rows = all_rows[:max_total_rows]
-
-    return {
-        "crawl_date": crawl_date,
-        "crawl_ts": crawl_ts,
-        "rows": all_rows,
-        "raw_payloads": raw_by_keyword,
-        "errors": errors,
-        "keyword_stats": keyword_stats,
+        self.rows.extend(rows)
+        profiling.count("keywords", "ok")
+        profiling.count("rows", n=len(rows))
+
+    def result(self):
+        return {
+            "crawl_date": self.crawl_date,
+            "crawl_ts": self.crawl_ts,
+            "rows": top_rows_by_publish_time(iter_dedup_rows(self.rows), self.max_total_rows),
+            "raw_payloads": self.raw_payloads,
+            "errors": self.errors,
+            "keyword_stats": self.keyword_stats,
+            "snapshot_ts": self.snapshot_ts,
+            "snapshots": list(self.observed.values()),
+        }
+
+
+class ShardFold:
+    """Worker side of collect_sharded: each keyword's payload and detail outcomes, for the merge."""
+
+    full = False
+
+    def __init__(self, max_per_keyword=30, fetch_detail=True, known_keys=None, min_publish_ts=0):
+        self.max_per_keyword = max_per_keyword
+        self.fetch_detail = fetch_detail
+        self.known_keys = {str(x).strip() for x in known_keys or () if str(x).strip()}
+        self.min_publish_ts = min_publish_ts
+        self.keywords = []
+        self._fetched = {}
+
+    def add(self, keyword, payload, exc, fetch_details):
+        details = {}
+        if exc is None and self.fetch_detail:
+            rows = normalize_search_results(payload, keyword=keyword)
+            if self.max_per_keyword > 0:
+                rows = rows[: self.max_per_keyword]
+            # cross-keyword dedup and the row cap need every earlier keyword, so only the merge
+            # applies them; a detail for every row not already known covers whatever it keeps
+            rows, _ = prefilter_rows(rows, self.known_keys, min_publish_ts=self.min_publish_ts)
+            pending = [row for row in rows if _detail_call(row) not in self._fetched]
+            for row, outcome in zip(pending, fetch_details(pending)):
+                key = dedup_key(row)
+                if key:
+                    details[key] = outcome
+                call = _detail_call(row)
+                if all(call) and outcome[1] is None:
+                    self._fetched[call] = outcome
+            for row in rows:
+                call = _detail_call(row)
+                if call in self._fetched:
+                    details.setdefault(dedup_key(row), self._fetched[call])
+        self.keywords.append((keyword, payload, exc, details))
+
+    def result(self):
+        return {"keywords": self.keywords, "errors": []}
+
+
+def collect_once(
+    keywords, options=None, data_root=None, known_keys=None, checkpoint=None, session=None, **overrides
+):
+    """One crawl over `keywords`; a `session` passed in replaces the default transport."""
+    options = _options(CollectOptions, options, overrides)
+    return _collect(keywords, options, data_root, known_keys, checkpoint, session, check_ready=session is None)
+
+
+@profiling.timed("collect_once")
+def _collect(keywords, options, data_root, known_keys, checkpoint, session, check_ready, limiter=None, fold=None):
+    search_prefetch = max(0, int(options.search_prefetch))
+    request_rpm = options.request_rpm
+    started = time.perf_counter()
+    ready_cached = None
+    if check_ready:
+        ready_cache_file = Path(data_root) / "cache" / "agent_reach_ready.json" if data_root else None
+        ready_cached = check_agent_reach_ready(cache_file=ready_cache_file, ttl_seconds=options.ready_ttl_seconds)
+    cold_start = {
+        "ready_check_cached": ready_cached,
+        "cold_start_seconds": round(time.perf_counter() - started, 3),
     }
 
+    detail_workers = max(1, int(options.detail_workers))
+    paced_search = search_prefetch > 0 or limiter is not None
+    # a derived budget follows the measured detail latency, so it stays at the serial rate
+    derived_rpm = request_rpm is None and (limiter is not None or detail_workers > 1 or search_prefetch > 0)
+    if limiter is None:
+        if request_rpm is None:
+            request_rpm = 0.0
+            if derived_rpm:
+                request_rpm = _serial_rpm(options)
+        limiter = TokenBucket(request_rpm)
+    search_breaker = CircuitBreaker("search_feeds", threshold=options.breaker_threshold)
+    detail_breaker = CircuitBreaker("get_feed_detail", threshold=options.breaker_threshold)
+    search_latency = LatencyTracker(factor=options.adaptive_timeout_factor)
+    detail_latency = LatencyTracker(factor=options.adaptive_timeout_factor)
+
+    def search_one(keyword):
+        if checkpoint is not None:
+            payload = checkpoint.search_payload(keyword)
+            if payload is not None:
+                return payload, None
+        if paced_search and not search_breaker.is_open:
+            with profiling.stage("rate_limit_wait"):
+                limiter.acquire()
+        try:
+            payload = search_feeds(
+                keyword,
+                timeout=options.search_timeout,
+                retries=options.search_retries,
+                retry_delay_seconds=options.retry_delay_seconds,
+                session=session,
+                breaker=search_breaker,
+                latency=search_latency,
+            )
+        except BridgeError as exc:
+            return None, exc
+        if checkpoint is not None:
+            checkpoint.record_search(keyword, payload)
+        return payload, None
+
+    def pace():
+        if options.detail_sleep_seconds > 0:
+            with profiling.stage("detail_sleep"):
+                time.sleep(options.detail_sleep_seconds)
+        else:
+            random_sleep(options.random_sleep_min_seconds, options.random_sleep_max_seconds)
+
+    def fetch_one_detail(row):
+        if detail_cache is not None:
+            cached = detail_cache.get(row)
+            if cached is not None:
+                return cached, None
+
+        feed_id = row.get("feed_id", "")
+        xsec_token = row.get("xsec_token", "")
+        if not (feed_id and xsec_token):
+            pace()
+            return {"_opened": False}, None
+
+        if checkpoint is not None:
+            journaled = checkpoint.detail(row)
+            if journaled is not None:
+                return journaled, None
+
+        if detail_breaker.is_open:
+            # fail fast: no token, no pacing sleep
+            try:
+                detail_breaker.before_call()
+            except BridgeError as exc:
+                return None, exc
+
+        with profiling.stage("rate_limit_wait"):
+            limiter.acquire()
+        try:
+            detail = get_feed_detail(
+                feed_id,
+                xsec_token,
+                timeout=options.detail_timeout,
+                retries=options.detail_retries,
+                retry_delay_seconds=options.retry_delay_seconds,
+                session=session,
+                breaker=detail_breaker,
+                latency=detail_latency,
+            )
+        except BridgeError as exc:
+            return None, exc
+        finally:
+            pace()
+
+        if derived_rpm:
+            call_seconds = detail_latency.mean()
+            if call_seconds is not None:
+                limiter.set_rate(_serial_rpm(options, call_seconds))
+        if checkpoint is not None:
+            checkpoint.record_detail(row, detail)
+        if detail_cache is not None:
+            detail_cache.put(row, detail)
+        return detail, None
+
+    owns_session = session is None and bool(options.mcp_command or options.record_file)
+    if owns_session:
+        if options.mcp_command:
+            session = open_session(options.mcp_command, size=detail_workers + (1 if paced_search else 0))
+        else:
+            session = McporterTransport()
+        if options.record_file:
+            session = RecordingTransport(session, options.record_file)
+    detail_executor = ThreadPoolExecutor(max_workers=detail_workers) if detail_workers > 1 else None
+    detail_cache = None
+    if options.fetch_detail and options.use_detail_cache and data_root:
+        detail_cache = DetailCache(
+            Path(data_root) / "cache" / "detail_cache.sqlite",
+            ttl_seconds=options.detail_cache_ttl_seconds,
+            max_age_seconds=options.detail_cache_max_age_days * 86400,
+            max_entries=options.detail_cache_max_entries,
+        )
+    if fold is None:
+        fold = KeywordFold(
+            max_per_keyword=options.max_per_keyword,
+            max_total_rows=options.max_total_rows,
+            fetch_detail=options.fetch_detail,
+            within_hours=options.within_hours,
+            continue_on_error=options.continue_on_error,
+            known_keys=known_keys,
+        )
+    fetch_details = functools.partial(
+        fetch_details_ordered,
+        fetch_one=fetch_one_detail,
+        executor=detail_executor,
+        stop_on_error=not options.continue_on_error,
+    )
+    try:
+        with SearchPrefetcher(keywords, search_one, depth=search_prefetch) as searches:
+            for keyword, payload, exc in searches:
+                fold.add(keyword, payload, exc, fetch_details)
+                if fold.full:
+                    break
+
+        result = fold.result()
+        breaker_events = search_breaker.events + detail_breaker.events
+        profiling.count("errors", "breaker", n=len(breaker_events))
+        result["errors"].extend(breaker_events)
+        bridge_health = {
+            "search": dict(search_breaker.stats(), **search_latency.stats(options.search_timeout)),
+            "detail": dict(detail_breaker.stats(), **detail_latency.stats(options.detail_timeout)),
+        }
+
+        detail_cache_stats = {}
+        if detail_cache is not None:
+            detail_cache.prune()
+            detail_cache_stats = dict(detail_cache.stats)
+
+        result.update(
+            cold_start=cold_start,
+            pipeline_stats=searches.stats(),
+            detail_cache=detail_cache_stats,
+            bridge_health=bridge_health,
+            checkpoint=dict(checkpoint.stats) if checkpoint is not None else {},
+        )
+        return result
+    finally:
+        if detail_cache is not None:
+            detail_cache.close()
+        if detail_executor is not None:
+            detail_executor.shutdown(wait=True, cancel_futures=True)
+        if owns_session:
+            session.close()
+
+
+@profiling.timed("collect_sharded")
+def collect_sharded(
+    keywords,
+    shards,
+    options=None,
+    data_root=None,
+    known_keys=None,
+    checkpoint_files=None,
+    resume=False,
+    session=None,
+    **overrides,
+):
+    """collect_once across `shards` worker processes, merged into the same result."""
+    options = _options(CollectOptions, options, overrides)
+    if options.record_file:
+        raise ValueError("record_file is not supported with shards")
+    shards = max(1, min(int(shards), len(keywords)))
+    started = time.perf_counter()
+    ready_cached = None
+    if session is None:
+        ready_cache_file = Path(data_root) / "cache" / "agent_reach_ready.json" if data_root else None
+        ready_cached = check_agent_reach_ready(cache_file=ready_cache_file, ttl_seconds=options.ready_ttl_seconds)
+    cold_start = {
+        "ready_check_cached": ready_cached,
+        "cold_start_seconds": round(time.perf_counter() - started, 3),
+    }
+
+    fold = KeywordFold(
+        max_per_keyword=options.max_per_keyword,
+        max_total_rows=options.max_total_rows,
+        fetch_detail=options.fetch_detail,
+        within_hours=options.within_hours,
+        continue_on_error=options.continue_on_error,
+        known_keys=known_keys,
+    )
+    # one budget for all workers: request_rpm, else the serial rate, which each worker retunes
+    # from its measured detail latency
+    budget_rpm = options.request_rpm if options.request_rpm is not None else _serial_rpm(options)
+    context = multiprocessing.get_context("spawn")
+    limiter = SharedTokenBucket(budget_rpm, context=context)
+    # the row cap is only known at the merge, so workers crawl every keyword
+    worker_options = replace(options, max_total_rows=0, continue_on_error=True)
+    with ProcessPoolExecutor(
+        max_workers=shards, mp_context=context, initializer=_init_shard_worker, initargs=(limiter,)
+    ) as pool:
+        futures = [
+            pool.submit(
+                _collect_shard,
+                keywords[index::shards],
+                worker_options,
+                data_root,
+                known_keys,
+                fold.min_publish_ts,
+                checkpoint_files[index] if checkpoint_files else None,
+                resume,
+                session,
+            )
+            for index in range(shards)
+        ]
+        results = [future.result() for future in futures]
+
+    timings = profiling.current()
+    for shard in results:
+        if timings is not None:
+            timings.merge(shard["timings"]["samples"], shard["timings"]["counters"])
+        for name, value in shard["session_stats"].items():
+            # each worker counted on its own copy of the session (e.g. ReplayTransport.stats)
+            session.stats[name] = session.stats.get(name, 0) + value
+
+    for index, keyword in enumerate(keywords):
+        if fold.full:
+            break
+        _, payload, exc, details = results[index % shards]["keywords"][index // shards]
+        fold.add(keyword, payload, exc, functools.partial(_shard_details, details))
+
+    result = fold.result()
+    detail_cache_stats = {}
+    replayed = {"replayed_searches": 0, "replayed_details": 0}
+    for shard in results:
+        result["errors"].extend(shard["errors"])
+        for name, value in shard["detail_cache"].items():
+            detail_cache_stats[name] = detail_cache_stats.get(name, 0) + value
+        for name in replayed:
+            replayed[name] += shard["checkpoint"].get(name, 0)
+    result.update(
+        cold_start=cold_start,
+        pipeline_stats={"shards": [shard["pipeline_stats"] for shard in results]},
+        detail_cache=detail_cache_stats,
+        bridge_health={"shards": [shard["bridge_health"] for shard in results]},
+        checkpoint=dict({"resumed": bool(resume)}, **replayed) if checkpoint_files else {},
+    )
+    return result
+
+
+_shard_limiter = None
+
+
+def _init_shard_worker(limiter):
+    global _shard_limiter
+    _shard_limiter = limiter
+
+
+def _collect_shard(keywords, options, data_root, known_keys, min_publish_ts, checkpoint_file, resume, session):
+    timings = profiling.StageTimings()
+    fold = ShardFold(options.max_per_keyword, options.fetch_detail, known_keys, min_publish_ts)
+    with profiling.recording(timings), ExitStack() as stack:
+        checkpoint = None
+        if checkpoint_file:
+            checkpoint = stack.enter_context(CheckpointJournal(checkpoint_file, resume=resume))
+        result = _collect(
+            keywords,
+            options,
+            data_root,
+            known_keys,
+            checkpoint,
+            session,
+            check_ready=False,
+            limiter=_shard_limiter,
+            fold=fold,
+        )
+    result["session_stats"] = dict(session.stats) if isinstance(getattr(session, "stats", None), dict) else {}
+    result["timings"] = {"samples": timings.samples(), "counters": timings.counters()}
+    return result
+
+
+def _detail_call(row):
+    return row.get("feed_id", ""), row.get("xsec_token", "")
+
+
+def _shard_details(details, rows):
+    return [details[key] if key else ({"_opened": False}, None) for key in map(dedup_key, rows)]
+
+
+STORAGE_BACKENDS = ("csv", "parquet", "both")
+STORE_LOCK_FILE = "save.lock"
+
+
+def save_outputs(
+    result,
+    data_root,
+    write_workers=0,
+    storage="csv",
+    note_store=None,
+    snapshot_retention_days=SNAPSHOT_RETENTION_DAYS,
+    lock_timeout=None,
+):
+    """Write one run's files; `storage` picks csv, parquet or both for the keyword partitions."""
+    started = time.perf_counter()
+    if storage not in STORAGE_BACKENDS:
+        raise ValueError("unknown storage backend: %s" % storage)
+    if storage != "csv":
+        columnar_store.require_pyarrow()
 
-def save_outputs(result, data_root):
     data_root = Path(data_root)
     crawl_date = result["crawl_date"]
     rows = result["rows"]
@@ -296,45 +895,120 @@ def save_outputs(result, data_root):
     report_dir = data_root / "reports" / crawl_date
     runlog_dir = data_root / "runlog" / crawl_date
 
-    ensure_dir(by_kw_dir)
-    ensure_dir(by_date_dir)
+    columnar_dir = data_root / "columnar"
+
+    write_csv_partitions = storage in ("csv", "both")
+    if write_csv_partitions:
+        ensure_dir(by_kw_dir)
+        ensure_dir(by_date_dir)
     ensure_dir(report_dir)
     ensure_dir(runlog_dir)
 
-    for keyword, payload in raw_payloads.items():
-        raw_file = raw_dir / (safe_name(keyword) + ".search.json")
-        raw_file.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-
-    for keyword in sorted({x.get("keyword", "") for x in rows if x.get("keyword", "")}):
-        kw_rows = [x for x in rows if x.get("keyword") == keyword]
-        write_jsonl(raw_dir / (safe_name(keyword) + ".jsonl"), kw_rows)
-        write_csv(by_kw_dir / safe_name(keyword) / (crawl_date + ".csv"), kw_rows)
-        write_csv(by_date_dir / (safe_name(keyword) + ".csv"), kw_rows)
-
-    summary = build_keyword_summary(rows)
-    write_csv(report_dir / "keyword_summary.csv", summary)
-    write_csv(report_dir / "all_rows.csv", rows)
+    # the run lock is per date; the note store, snapshots and keyword_daily.json are not
+    store_lock_file = data_root / "store" / STORE_LOCK_FILE
+    lock = ExitStack()
+    try:
+        lock.enter_context(file_lock(store_lock_file, timeout=lock_timeout))
+    except TimeoutError:
+        raise BridgeError("其他日期的任务正在写入历史数据（锁文件 %s），请稍后重试" % store_lock_file)
 
-    detail_error_rows = [x for x in rows if str(x.get("detail_error", "")).strip()]
-    write_csv(report_dir / "detail_error_rows.csv", detail_error_rows)
+    with lock, AtomicWriteBatch(sweep_stale=True) as batch:
+        for keyword, payload in raw_payloads.items():
+            raw_file = raw_dir / (safe_name(keyword) + ".search.json")
+            write_text(raw_file, json.dumps(payload, ensure_ascii=False, indent=2), batch=batch)
 
-    failed_keywords = sorted({x.get("keyword", "") for x in errors if x.get("stage") == "search" and x.get("keyword")})
-    (runlog_dir / "failed_keywords.txt").write_text("\n".join(failed_keywords), encoding="utf-8")
-
-    runlog = {
-        "crawl_date": crawl_date,
-        "crawl_ts": result["crawl_ts"],
-        "total_rows": len(rows),
-        "keywords": sorted({x.get("keyword", "") for x in rows if x.get("keyword", "")}),
-        "keyword_stats": keyword_stats,
-        "error_count": len(errors),
-        "failed_keyword_count": len(failed_keywords),
-        "detail_error_row_count": len(detail_error_rows),
-    }
-    (runlog_dir / "run_stats.json").write_text(json.dumps(runlog, ensure_ascii=False, indent=2), encoding="utf-8")
-    (runlog_dir / "errors.json").write_text(json.dumps(errors, ensure_ascii=False, indent=2), encoding="utf-8")
+        rows_by_keyword = {}
+        for row in rows:
+            keyword = row.get("keyword", "")
+            if keyword:
+                rows_by_keyword.setdefault(keyword, []).append(row)
+
+        partitions = []
+        for keyword in sorted(rows_by_keyword):
+            name = safe_name(keyword)
+            partitions.append(
+                {
+                    "rows": rows_by_keyword[keyword],
+                    "jsonl_paths": [raw_dir / (name + ".jsonl")],
+                    "csv_paths": (
+                        [by_kw_dir / name / (crawl_date + ".csv"), by_date_dir / (name + ".csv")]
+                        if write_csv_partitions
+                        else []
+                    ),
+                }
+            )
+            if storage != "csv":
+                columnar_store.write_notes(
+                    columnar_store.partition_path(columnar_dir, crawl_date, name),
+                    rows_by_keyword[keyword],
+                    crawl_date,
+                    batch=batch,
+                )
+
+        note_store_stats = {}
+        if note_store is not None:
+            keys = {dedup_key(x) for x in rows}
+            first_seen = note_store.first_seen(keys)
+            returning = sum(1 for key in keys if first_seen.get(key, crawl_date) < crawl_date)
+            note_store_stats = {"new_notes": len(keys) - returning, "returning_notes": returning}
+
+        metrics, top_notes = analyze_keywords(rows)
+        detail_error_rows = [x for x in rows if str(x.get("detail_error", "")).strip()]
+        partitions.append({"rows": summary_from_metrics(metrics), "csv_paths": [report_dir / "keyword_summary.csv"]})
+        partitions.append({"rows": metrics, "csv_paths": [report_dir / "keyword_metrics.csv"]})
+        partitions.append({"rows": top_notes, "csv_paths": [report_dir / "keyword_top_notes.csv"]})
+        partitions.append({"rows": rows, "csv_paths": [report_dir / "all_rows.csv"]})
+        partitions.append({"rows": detail_error_rows, "csv_paths": [report_dir / "detail_error_rows.csv"]})
+        write_partitions(partitions, workers=write_workers, batch=batch)
+        update_daily_aggregates(data_root, crawl_date, metrics, batch=batch)
+
+        if result.get("snapshots") is not None:
+            snapshot_log = SnapshotLog(data_root / "snapshots", retention_days=snapshot_retention_days)
+            snapshot_log.append(result["snapshot_ts"], result["snapshots"], batch=batch)
+            growth = note_growth(
+                {k: v for k, v in snapshot_log.notes.items() if v["ts"] == result["snapshot_ts"]}
+            )
+            write_partitions(
+                [
+                    {"rows": growth, "csv_paths": [report_dir / "note_growth.csv"]},
+                    {"rows": keyword_growth(growth), "csv_paths": [report_dir / "keyword_growth.csv"]},
+                ],
+                batch=batch,
+            )
 
-    return {
+        failed_keywords = sorted({x.get("keyword", "") for x in errors if x.get("stage") == "search" and x.get("keyword")})
+        write_text(runlog_dir / "failed_keywords.txt", "\n".join(failed_keywords), batch=batch)
+
+        timings = profiling.current()
+        if timings is not None:
+            # up to here: the run log cannot include its own write and the batch publish
+            timings.add("save_outputs", time.perf_counter() - started)
+
+        runlog = {
+            "crawl_date": crawl_date,
+            "crawl_ts": result["crawl_ts"],
+            "total_rows": len(rows),
+            "keywords": sorted(rows_by_keyword),
+            "keyword_stats": keyword_stats,
+            "error_count": len(errors),
+            "failed_keyword_count": len(failed_keywords),
+            "detail_error_row_count": len(detail_error_rows),
+            "cold_start": result.get("cold_start", {}),
+            "pipeline_stats": result.get("pipeline_stats", {}),
+            "detail_cache": result.get("detail_cache", {}),
+            "bridge_health": result.get("bridge_health", {}),
+            "checkpoint": result.get("checkpoint", {}),
+            "note_store": note_store_stats,
+            "stage_timings": timings.stats() if timings is not None else {},
+        }
+        write_text(runlog_dir / "run_stats.json", json.dumps(runlog, ensure_ascii=False, indent=2), batch=batch)
+        write_text(runlog_dir / "errors.json", json.dumps(errors, ensure_ascii=False, indent=2), batch=batch)
+
+        if note_store is not None:
+            # only once the files are published; save_day replaces the whole day, so a rerun repairs it
+            batch.after_commit(note_store.save_day, crawl_date, rows, result["crawl_ts"])
+
+    out = {
         "report_dir": str(report_dir),
         "runlog_file": str(runlog_dir / "run_stats.json"),
         "error_file": str(runlog_dir / "errors.json"),
@@ -345,6 +1019,9 @@ def save_outputs(result, data_root):
         "failed_keyword_count": len(failed_keywords),
         "detail_error_row_count": len(detail_error_rows),
     }
+    if storage != "csv":
+        out["columnar_dir"] = str(columnar_dir)
+    return out
 
 
 def safe_name(name):
@@ -357,56 +1034,101 @@ def safe_name(name):
     )
 
 
-def run_pipeline(
-    keywords_file,
-    data_root,
-    max_per_keyword=30,
-    max_total_rows=200,
-    fetch_detail=True,
-    within_hours=24,
-    dedup_with_existing_day=True,
-    search_timeout=180,
-    detail_timeout=120,
-    search_retries=2,
-    detail_retries=1,
-    retry_delay_seconds=1.0,
-    random_sleep_min_seconds=0.8,
-    random_sleep_max_seconds=2.8,
-    detail_sleep_seconds=0.0,
-    continue_on_error=True,
-):
+def run_pipeline(keywords_file, data_root, options=None, session=None, **overrides):
+    options = _options(RunOptions, options, overrides)
     keywords = read_keywords(keywords_file)
     if not keywords:
         raise BridgeError("关键词为空，请检查 keywords.txt")
+    if options.storage != "csv" and not columnar_store.available():
+        raise BridgeError("--storage %s 需要 pyarrow，请先执行: pip install pyarrow" % options.storage)
+
+    existing_date = datetime.now().strftime("%Y-%m-%d")
+    lock_file = Path(data_root) / "runlog" / existing_date / "run.lock"
+    lock = ExitStack()
+    try:
+        lock.enter_context(file_lock(lock_file, timeout=options.lock_timeout_seconds))
+    except TimeoutError:
+        raise BridgeError("同一天已有任务在运行（锁文件 %s），请稍后重试" % lock_file)
+
+    profile_file = Path(data_root) / "runlog" / existing_date / profiling.PROFILE_FILE if options.profile else None
+    with lock:
+        timings = lock.enter_context(profiling.recording(profiling.StageTimings()))
+        run_metrics = RunMetrics(timings)
+        if options.metrics_file:
+            # written on the way out, so a failed run is exported too
+            lock.callback(write_textfile, options.metrics_file, run_metrics)
+        if options.metrics_port:
+            try:
+                lock.enter_context(MetricsServer(run_metrics, options.metrics_port))
+            except OSError as exc:
+                raise BridgeError("指标端口 %s 无法监听: %s" % (options.metrics_port, exc))
+        lock.enter_context(profiling.profiled(profile_file))
+        note_store = None
+        if options.use_note_store:
+            note_store = lock.enter_context(NoteStore(Path(data_root) / "store" / "notes.sqlite"))
+        checkpoint = None
+        checkpoint_files = []
+        if options.shards > 1:
+            checkpoint_files = [
+                checkpoint_path(data_root, existing_date, shard=index) for index in range(options.shards)
+            ]
+        else:
+            checkpoint = lock.enter_context(
+                CheckpointJournal(checkpoint_path(data_root, existing_date), resume=options.resume)
+            )
 
-    result = collect_once(
-        keywords=keywords,
-        max_per_keyword=max_per_keyword,
-        max_total_rows=max_total_rows,
-        fetch_detail=fetch_detail,
-        within_hours=within_hours,
-        search_timeout=search_timeout,
-        detail_timeout=detail_timeout,
-        search_retries=search_retries,
-        detail_retries=detail_retries,
-        retry_delay_seconds=retry_delay_seconds,
-        random_sleep_min_seconds=random_sleep_min_seconds,
-        random_sleep_max_seconds=random_sleep_max_seconds,
-        detail_sleep_seconds=detail_sleep_seconds,
-        continue_on_error=continue_on_error,
-    )
-
-    if dedup_with_existing_day:
-        existing_rows = load_existing_report_rows(data_root, result["crawl_date"])
-        merged_rows = dedup_rows(existing_rows + result["rows"])
-        merged_rows = filter_rows_recent_hours(merged_rows, within_hours=within_hours)
-        merged_rows = sort_rows_by_publish_time_desc(merged_rows)
-        if max_total_rows > 0:
-            merged_rows = merged_rows[:max_total_rows]
-        result["rows"] = merged_rows
-
-    if not result["rows"] and not result["raw_payloads"] and result.get("errors"):
-        first_error = result["errors"][0].get("error", "unknown error")
-        raise BridgeError("抓取失败：%s" % first_error)
-
-    return save_outputs(result, data_root)
+        existing_rows = []
+        if options.dedup_with_existing_day:
+            existing_rows = load_existing_day_rows(data_root, existing_date, note_store)
+
+        known_keys = {dedup_key(x) for x in existing_rows}
+        if note_store is not None and options.dedup_days > 0:
+            start_date = datetime.strptime(existing_date, "%Y-%m-%d") - timedelta(days=options.dedup_days)
+            known_keys |= note_store.keys_seen_between(start_date.strftime("%Y-%m-%d"), existing_date)
+
+        if options.shards > 1:
+            result = collect_sharded(
+                keywords,
+                options.shards,
+                options,
+                data_root,
+                known_keys,
+                checkpoint_files=checkpoint_files,
+                resume=options.resume,
+                session=session,
+            )
+        else:
+            result = collect_once(keywords, options, data_root, known_keys, checkpoint, session)
+
+        if options.dedup_with_existing_day:
+            if result["crawl_date"] != existing_date:
+                existing_rows = load_existing_day_rows(data_root, result["crawl_date"], note_store)
+            merged_rows = iter_dedup_rows(itertools.chain(existing_rows, result["rows"]))
+            merged_rows = iter_recent_rows(merged_rows, within_hours=options.within_hours)
+            result["rows"] = top_rows_by_publish_time(merged_rows, options.max_total_rows)
+
+        if not result["rows"] and not result["raw_payloads"] and result.get("errors"):
+            first_error = result["errors"][0].get("error", "unknown error")
+            # Keep the failure (including breaker events) on disk even though nothing is saved.
+            runlog_dir = Path(data_root) / "runlog" / result["crawl_date"]
+            ensure_dir(runlog_dir)
+            write_text(runlog_dir / "errors.json", json.dumps(result["errors"], ensure_ascii=False, indent=2))
+            raise BridgeError("抓取失败：%s" % first_error)
+
+        out = save_outputs(
+            result,
+            data_root,
+            write_workers=options.write_workers,
+            storage=options.storage,
+            note_store=note_store,
+            snapshot_retention_days=options.snapshot_retention_days,
+            lock_timeout=options.lock_timeout_seconds,
+        )
+        if checkpoint is not None:
+            checkpoint.discard()
+        for path in checkpoint_files:
+            path.unlink(missing_ok=True)
+        run_metrics.finish(success=True, saved_rows=out["total_rows"])
+        if profile_file is not None:
+            out["profile_file"] = str(profile_file)
+        return out
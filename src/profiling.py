@@ -0,0 +1,160 @@
+"""Per-stage wall-time instrumentation for the crawl hot path.
+
+`timed(name)` wraps a function (plain or async) and `stage(name)` a block. While a StageTimings
+is recording (see `recording`), each call adds its duration to that stage; otherwise the wrappers
+only check one global. Stages nest, so e.g. call_mcporter includes its run_cmd and
+extract_json_payload time. `count(name, label)` bumps a run counter (retries, errors, ...) the
+same way. The recorder is process-wide on purpose: detail worker and prefetch threads report
+into the same run.
+"""
+import cProfile
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .io_utils import ensure_dir
+
+PROFILE_FILE = "profile.pstats"
+
+_active = None
+
+
+class StageTimings:
+    def __init__(self):
+        self._samples = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self._samples.setdefault(name, []).append(seconds)
+
+    def count(self, name, label="", n=1):
+        with self._lock:
+            key = (name, label)
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def merge(self, samples, counters):
+        """Add another recorder's samples() and counters(), e.g. from a worker process."""
+        with self._lock:
+            for name, values in samples.items():
+                self._samples.setdefault(name, []).extend(values)
+            for key, value in counters.items():
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def samples(self):
+        """{stage: sorted durations in seconds}"""
+        with self._lock:
+            return {name: sorted(values) for name, values in self._samples.items()}
+
+    def counters(self):
+        """{(name, label): value}"""
+        with self._lock:
+            return dict(self._counters)
+
+    def stats(self):
+        """{stage: calls, total_seconds, p50_ms, p95_ms, max_ms}, slowest total first."""
+        samples = self.samples()
+        out = {}
+        for name, values in sorted(samples.items(), key=lambda item: sum(item[1]), reverse=True):
+            out[name] = {
+                "calls": len(values),
+                "total_seconds": round(sum(values), 3),
+                "p50_ms": _ms(_nearest_rank(values, 0.5)),
+                "p95_ms": _ms(_nearest_rank(values, 0.95)),
+                "max_ms": _ms(values[-1]),
+            }
+        return out
+
+
+def current():
+    return _active
+
+
+@contextmanager
+def recording(timings):
+    global _active
+    previous, _active = _active, timings
+    try:
+        yield timings
+    finally:
+        _active = previous
+
+
+@contextmanager
+def stage(name):
+    timings = _active
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def count(name, label="", n=1):
+    timings = _active
+    if timings is not None:
+        timings.count(name, label, n)
+
+
+def timed(name):
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                timings = _active
+                if timings is None:
+                    return await fn(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    timings.add(name, time.perf_counter() - started)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            timings = _active
+            if timings is None:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timings.add(name, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def profiled(path):
+    """cProfile the calling thread into `path` (pstats format); a no-op when path is None."""
+    if path is None:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        ensure_dir(Path(path).parent)
+        profiler.dump_stats(str(path))
+
+
+def _nearest_rank(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _ms(seconds):
+    return round(seconds * 1000.0, 3)
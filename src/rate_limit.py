@@ -0,0 +1,93 @@
+import multiprocessing
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every caller that must respect one request budget.
+
+    rate_per_minute <= 0 disables limiting.
+    """
+
+    def __init__(self, rate_per_minute, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate_per_second = max(0.0, float(rate_per_minute)) / 60.0
+        self.capacity = max(1.0, float(capacity))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate_per_minute):
+        """Change the rate from now on; tokens accrued so far keep the old rate."""
+        with self._lock:
+            now = self._clock()
+            if self.rate_per_second > 0:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+            self._updated = now
+            self.rate_per_second = max(0.0, float(rate_per_minute)) / 60.0
+
+    def acquire(self):
+        """Block until one token is available; return the seconds spent waiting."""
+        if self.rate_per_second <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                if self.rate_per_second <= 0:
+                    return waited
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate_per_second
+            self._sleep(wait)
+            waited += wait
+
+
+class SharedTokenBucket(TokenBucket):
+    """A TokenBucket whose state (rate included) lives in shared memory, so processes started
+    from one multiprocessing context draw from a single budget. Hand it to the workers as they
+    start (Process args or a pool initializer); the clock must be system-wide, as time.monotonic is.
+    """
+
+    def __init__(self, rate_per_minute, capacity=1, clock=time.monotonic, sleep=time.sleep, context=None):
+        self._state = (context or multiprocessing.get_context()).Array("d", 3)
+        super().__init__(rate_per_minute, capacity=capacity, clock=clock, sleep=sleep)
+        self._lock = self._state.get_lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = self._state.get_lock()
+
+    @property
+    def rate_per_second(self):
+        return self._state[2]
+
+    @rate_per_second.setter
+    def rate_per_second(self, value):
+        self._state[2] = value
+
+    @property
+    def _tokens(self):
+        return self._state[0]
+
+    @_tokens.setter
+    def _tokens(self, value):
+        self._state[0] = value
+
+    @property
+    def _updated(self):
+        return self._state[1]
+
+    @_updated.setter
+    def _updated(self, value):
+        self._state[1] = value
@@ -0,0 +1,205 @@
+"""Append-only, delta-encoded engagement snapshots per note.
+
+engagement.delta holds one JSON array per observation:
+    [note_id, keyword, d_ts, d_likes, d_comments, d_collects, d_shares]
+where every d_* is the difference from the same note's previous line and keyword is "" when it
+has not changed. A note's chain starts with its keyword wrapped in a list, [keyword], and that
+line is relative to zero, i.e. absolute. latest.json keeps the decoded last two snapshots of
+each note plus the log size it reflects, so appending and per-hour growth never replay the
+whole log; if the log is longer than latest.json says (crash between the two writes), only the
+tail is replayed. Notes not observed for retention_days are dropped from latest.json; if one
+comes back, its chain starts again.
+"""
+import json
+import os
+from pathlib import Path
+
+from .analytics import COUNT_FIELDS
+from .io_utils import ensure_dir, remove_stale_temps, write_text
+
+LOG_FILE = "engagement.delta"
+LATEST_FILE = "latest.json"
+RETENTION_DAYS = 30
+
+
+class SnapshotLog:
+    def __init__(self, root, retention_days=RETENTION_DAYS):
+        self.root = Path(root)
+        self.retention_days = retention_days
+        self.log_path = self.root / LOG_FILE
+        self.latest_path = self.root / LATEST_FILE
+        ensure_dir(self.root)
+        self.notes, self.log_bytes = self._load_latest()
+
+    def append(self, ts, rows, batch=None):
+        """Record one observation per note (first row of each note_id wins) taken at ts.
+
+        With an AtomicWriteBatch the files are written only once the batch commits; `notes` is
+        updated right away either way.
+        """
+        ts = int(ts)
+        lines = []
+        seen = set()
+        for row in rows:
+            note_id = str(row.get("note_id") or "").strip()
+            if not note_id or note_id in seen:
+                continue
+            seen.add(note_id)
+            counts = [_count(row.get(field)) for field in COUNT_FIELDS]
+            keyword = str(row.get("keyword") or "")
+            previous = self.notes.get(note_id)
+            if previous is None:
+                base_ts, base_counts, keyword_field = 0, [0] * len(counts), [keyword]
+            else:
+                base_ts, base_counts = previous["ts"], previous["counts"]
+                keyword_field = "" if previous["keyword"] == keyword else keyword
+            lines.append(
+                json.dumps(
+                    [note_id, keyword_field, ts - base_ts]
+                    + [c - b for c, b in zip(counts, base_counts)],
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                )
+            )
+            self._observe(note_id, keyword, ts, counts)
+
+        if not lines:
+            return 0
+        if self.retention_days > 0:
+            cutoff = ts - int(self.retention_days * 86400)
+            self.notes = {note_id: note for note_id, note in self.notes.items() if note["ts"] >= cutoff}
+        if batch is None:
+            self._write(lines)
+        else:
+            batch.after_commit(self._write, lines)
+        return len(lines)
+
+    def _write(self, lines):
+        self._repair_tail()
+        with self.log_path.open("a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.log_bytes = self.log_path.stat().st_size
+        remove_stale_temps(self.latest_path)
+        self._save_latest()
+
+    def iter_snapshots(self):
+        """Decoded (note_id, keyword, ts, counts) in log order."""
+        return self._decode(self._read_lines(0), {})
+
+    def _observe(self, note_id, keyword, ts, counts):
+        previous = self.notes.get(note_id)
+        self.notes[note_id] = {
+            "keyword": keyword,
+            "ts": ts,
+            "counts": counts,
+            "prev_ts": previous["ts"] if previous else None,
+            "prev_counts": previous["counts"] if previous else None,
+        }
+
+    def _decode(self, lines, state):
+        for line in lines:
+            try:
+                note_id, keyword, d_ts, *deltas = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(keyword, list):
+                # start of a chain: absolute values
+                keyword = keyword[0] if keyword else ""
+                state.pop(note_id, None)
+            base_ts, base_counts, base_keyword = state.get(note_id, (0, [0] * len(deltas), ""))
+            ts = base_ts + d_ts
+            counts = [b + d for b, d in zip(base_counts, deltas)]
+            keyword = keyword or base_keyword
+            state[note_id] = (ts, counts, keyword)
+            yield note_id, keyword, ts, counts
+
+    def _read_lines(self, offset):
+        if not self.log_path.exists():
+            return []
+        with self.log_path.open("rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # A torn last line (crash mid-append) has no newline yet; it is ignored and repaired.
+        return [line.decode("utf-8") for line in data.split(b"\n")[:-1] if line.strip()]
+
+    def _load_latest(self):
+        try:
+            latest = json.loads(self.latest_path.read_text(encoding="utf-8"))
+            notes, log_bytes = latest["notes"], int(latest["log_bytes"])
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            notes, log_bytes = {}, 0
+
+        size = self.log_path.stat().st_size if self.log_path.exists() else 0
+        if size == log_bytes:
+            return notes, log_bytes
+        if size < log_bytes:
+            notes, log_bytes = {}, 0
+
+        self.notes = notes
+        state = {note_id: (note["ts"], note["counts"], note["keyword"]) for note_id, note in notes.items()}
+        for note_id, keyword, ts, counts in self._decode(self._read_lines(log_bytes), state):
+            self._observe(note_id, keyword, ts, counts)
+        return self.notes, size
+
+    def _repair_tail(self):
+        if not self.log_path.exists():
+            return
+        with self.log_path.open("rb+") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                f.truncate(end)
+
+    def _save_latest(self):
+        write_text(
+            self.latest_path,
+            json.dumps({"log_bytes": self.log_bytes, "notes": self.notes}, ensure_ascii=False, separators=(",", ":")),
+        )
+
+
+def note_growth(notes):
+    """Per-hour change of each count between a note's last two snapshots."""
+    out = []
+    for note_id, note in notes.items():
+        if note.get("prev_ts") is None or note["ts"] <= note["prev_ts"]:
+            continue
+        hours = (note["ts"] - note["prev_ts"]) / 3600.0
+        row = {"note_id": note_id, "keyword": note["keyword"], "hours": round(hours, 2)}
+        deltas = [c - p for c, p in zip(note["counts"], note["prev_counts"])]
+        for field, delta in zip(COUNT_FIELDS, deltas):
+            row[field + "_per_hour"] = round(delta / hours, 2)
+        row["engagement_per_hour"] = round(sum(deltas) / hours, 2)
+        out.append(row)
+    out.sort(key=lambda x: x["engagement_per_hour"], reverse=True)
+    return out
+
+
+def keyword_growth(growth_rows):
+    grouped = {}
+    for row in growth_rows:
+        grouped.setdefault(row["keyword"], []).append(row)
+
+    out = []
+    for keyword, items in grouped.items():
+        total = sum(x["engagement_per_hour"] for x in items)
+        out.append(
+            {
+                "keyword": keyword,
+                "tracked_notes": len(items),
+                "engagement_per_hour": round(total, 2),
+                "avg_engagement_per_hour": round(total / len(items), 2),
+            }
+        )
+    out.sort(key=lambda x: x["engagement_per_hour"], reverse=True)
+    return out
+
+
+def _count(value):
+    if type(value) is int:
+        return value
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
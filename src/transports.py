@@ -0,0 +1,233 @@
+"""Pluggable bridge transports.
+
+A transport is any object with call_tool(name, arguments, timeout=120) -> payload that raises
+BridgeError (or McpSessionError) on failure, plus close(); pass one to collect_once /
+run_pipeline as `session=`. Retries, circuit breakers and adaptive timeouts stay in
+agent_reach_bridge and wrap every transport the same way.
+
+- McporterTransport: one `mcporter call` subprocess per call (what the bridge does by default).
+- McpSessionPool (mcp_session): long-lived stdio MCP server processes (--mcp-command).
+- RecordingTransport: wraps another transport and appends every call/response pair to a JSONL file.
+- ReplayTransport: serves a recording with no network, with injectable latency, errors and
+  timeouts, for deterministic load tests of collect_once.
+"""
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from .agent_reach_bridge import BridgeError, CallTimeoutError, as_bridge_error, failure_kind, mcporter_once, tool_expr
+from .io_utils import ensure_dir
+from .profiling import timed
+
+ON_MISSING = ("error", "nearest")
+
+
+class McporterTransport:
+    def call_tool(self, name, arguments, timeout=120):
+        return asyncio.run(mcporter_once(tool_expr(name, arguments), timeout))
+
+    def close(self):
+        pass
+
+
+class RecordingTransport:
+    """Each line: {"tool", "arguments", "seconds", and "response" or "error"}; an error also
+    has its failure "error_kind", and a timeout the "timeout" it hit."""
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = Path(path)
+        ensure_dir(self.path.parent)
+        self._file = self.path.open("a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def call_tool(self, name, arguments, timeout=120):
+        entry = {"tool": name, "arguments": dict(arguments)}
+        started = time.monotonic()
+        try:
+            response = self.inner.call_tool(name, arguments, timeout=timeout)
+        except Exception as exc:
+            entry["seconds"] = round(time.monotonic() - started, 4)
+            error = as_bridge_error(exc)
+            entry["error"] = str(error)
+            entry["error_kind"] = failure_kind(error)
+            if isinstance(error, CallTimeoutError):
+                entry["timeout"] = error.timeout
+            self._write(entry)
+            raise
+        entry["seconds"] = round(time.monotonic() - started, 4)
+        entry["response"] = response
+        self._write(entry)
+        return response
+
+    def close(self):
+        try:
+            self.inner.close()
+        finally:
+            with self._lock:
+                self._file.close()
+
+    def _write(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+
+class ReplayTransport:
+    """Serve recorded responses by (tool, arguments); repeated calls cycle through the recordings
+    of that key in order, and recorded errors are raised again as BridgeError of the recorded
+    kind (CallTimeoutError for timeouts).
+
+    latency is a parse_latency() spec ("recorded" replays the recorded durations). On top of it,
+    each call fails with probability error_rate, or times out with probability timeout_rate (as
+    does any call whose latency exceeds its timeout): it waits the timeout, then raises like a
+    killed subprocess. time_scale multiplies every wait, e.g. 0.01 to replay 100x faster.
+    on_missing="nearest" answers unrecorded arguments with a recording of the same tool picked by
+    a hash of the arguments, so keyword lists far larger than the recording can be replayed.
+    """
+
+    def __init__(
+        self,
+        entries,
+        latency="recorded",
+        error_rate=0.0,
+        timeout_rate=0.0,
+        time_scale=1.0,
+        on_missing="error",
+        seed=0,
+        sleep=time.sleep,
+    ):
+        if on_missing not in ON_MISSING:
+            raise ValueError("on_missing must be one of %s" % ", ".join(ON_MISSING))
+        self.latency_spec = latency
+        self.latency = parse_latency(latency)
+        self.error_rate = float(error_rate)
+        self.timeout_rate = float(timeout_rate)
+        self.time_scale = float(time_scale)
+        self.on_missing = on_missing
+        self._sleep = sleep
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recordings = {}
+        self._keys_by_tool = {}
+        self._next = {}
+        self.stats = {"calls": 0, "missing": 0, "injected_errors": 0, "injected_timeouts": 0}
+        for entry in entries:
+            key = _call_key(entry["tool"], entry.get("arguments", {}))
+            self._recordings.setdefault(key, []).append(entry)
+        for tool, arguments_json in sorted(self._recordings):
+            self._keys_by_tool.setdefault(tool, []).append((tool, arguments_json))
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        entries = []
+        with Path(path).open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entries.append(json.loads(line))
+        return cls(entries, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __getstate__(self):
+        # pickled into --shards workers; each worker replays its own copy
+        state = dict(self.__dict__)
+        del state["_lock"], state["latency"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.latency = parse_latency(self.latency_spec)
+        self._lock = threading.Lock()
+
+    @timed("replay_call")
+    def call_tool(self, name, arguments, timeout=120):
+        with self._lock:
+            self.stats["calls"] += 1
+            entry = self._pick(name, arguments)
+            roll = self._rng.random()
+            delay = self.latency(self._rng, float(entry.get("seconds") or 0.0))
+            timed_out = roll < self.timeout_rate or delay > timeout
+            failed = not timed_out and roll < self.timeout_rate + self.error_rate
+            if timed_out:
+                self.stats["injected_timeouts"] += 1
+            elif failed:
+                self.stats["injected_errors"] += 1
+
+        if timed_out:
+            self._wait(timeout)
+            raise CallTimeoutError(timeout)
+        self._wait(delay)
+        if failed:
+            raise BridgeError("injected error: %s" % name)
+        if "error" in entry:
+            if entry.get("error_kind") == "timeout":
+                raise CallTimeoutError(entry.get("timeout", timeout))
+            raise BridgeError(entry["error"], kind=entry.get("error_kind"))
+        return entry.get("response")
+
+    def close(self):
+        pass
+
+    def _pick(self, name, arguments):
+        key = _call_key(name, arguments)
+        if key not in self._recordings:
+            self.stats["missing"] += 1
+            candidates = self._keys_by_tool.get(name)
+            if self.on_missing != "nearest" or not candidates:
+                raise BridgeError("回放记录中没有该调用: %s %s" % key)
+            key = candidates[zlib.crc32(key[1].encode("utf-8")) % len(candidates)]
+        recordings = self._recordings[key]
+        index = self._next.get(key, 0)
+        self._next[key] = index + 1
+        return recordings[index % len(recordings)]
+
+    def _wait(self, seconds):
+        seconds = seconds * self.time_scale
+        if seconds > 0:
+            self._sleep(seconds)
+
+
+def parse_latency(spec):
+    """A sampler (rng, recorded_seconds) -> seconds from a spec string:
+
+    recorded | fixed:S | uniform:LOW,HIGH | normal:MEAN,STD | lognormal:MEDIAN,SIGMA | exp:MEAN
+    """
+    kind, _, params = str(spec or "recorded").partition(":")
+    try:
+        values = [float(x) for x in params.split(",")] if params else []
+    except ValueError:
+        raise ValueError("invalid latency spec: %s" % spec)
+
+    samplers = {
+        ("recorded", 0): lambda rng, recorded: recorded,
+        ("fixed", 1): lambda rng, recorded: values[0],
+        ("uniform", 2): lambda rng, recorded: rng.uniform(values[0], values[1]),
+        ("normal", 2): lambda rng, recorded: max(0.0, rng.gauss(values[0], values[1])),
+        ("lognormal", 2): lambda rng, recorded: rng.lognormvariate(math.log(values[0]), values[1]),
+        ("exp", 1): lambda rng, recorded: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0,
+    }
+    sampler = samplers.get((kind, len(values)))
+    if sampler is None or any(v < 0 for v in values) or (kind == "lognormal" and values[0] <= 0):
+        raise ValueError("invalid latency spec: %s" % spec)
+    return sampler
+
+
+def _call_key(tool, arguments):
+    return tool, json.dumps(arguments, ensure_ascii=False, sort_keys=True)
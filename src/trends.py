@@ -0,0 +1,149 @@
+"""Per-keyword daily partial aggregates and the rolling trends computed from them.
+
+save_outputs keeps reports/keyword_daily.json up to date: for every crawl date, each keyword's
+post count and interaction sums. Trends over any window then need one entry per day instead
+of rereading every past all_rows.csv.
+"""
+import csv
+import json
+from datetime import date, timedelta
+from pathlib import Path
+
+from .analytics import COUNT_FIELDS, analyze_keywords
+from .io_utils import write_text
+
+DAILY_AGGREGATES_FILE = "keyword_daily.json"
+DEFAULT_WINDOWS = (7, 30)
+
+
+def daily_aggregates_path(data_root):
+    return Path(data_root) / "reports" / DAILY_AGGREGATES_FILE
+
+
+def day_partials(metrics):
+    """{keyword: partial sums} from analytics.analyze_keywords metrics."""
+    out = {}
+    for item in metrics:
+        partial = {"posts": item["posts"]}
+        for field in COUNT_FIELDS:
+            partial[field] = item["sum_" + field]
+        partial["engagement"] = item["engagement"]
+        out[item["keyword"]] = partial
+    return out
+
+
+def load_daily_aggregates(data_root):
+    path = daily_aggregates_path(data_root)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_daily_aggregates(data_root, aggregates, batch=None):
+    text = json.dumps(dict(sorted(aggregates.items())), ensure_ascii=False, indent=2)
+    write_text(daily_aggregates_path(data_root), text, batch=batch)
+
+
+def update_daily_aggregates(data_root, crawl_date, metrics, batch=None):
+    """Replace crawl_date's partials (a rerun rewrites that day's report too)."""
+    aggregates = load_daily_aggregates(data_root)
+    aggregates[crawl_date] = day_partials(metrics)
+    save_daily_aggregates(data_root, aggregates, batch=batch)
+    return aggregates
+
+
+def rebuild_daily_aggregates(data_root):
+    """Backfill from every reports/<date>/all_rows.csv (days saved before the aggregates existed)."""
+    aggregates = {}
+    for report_file in sorted(Path(data_root).glob("reports/*/all_rows.csv")):
+        with report_file.open("r", encoding="utf-8-sig", newline="") as f:
+            rows = [row for row in csv.DictReader(f) if "message" not in row]
+        metrics, _ = analyze_keywords(rows, top_n=0)
+        aggregates[report_file.parent.name] = day_partials(metrics)
+    save_daily_aggregates(data_root, aggregates)
+    return aggregates
+
+
+def keyword_series(aggregates, keyword, end_date=None, days=30, windows=DEFAULT_WINDOWS):
+    """One row per calendar day ending at end_date with day-over-day changes and rolling windows."""
+    dates = _calendar(aggregates, end_date, days + max(windows, default=1))
+    if not dates:
+        return []
+    daily = [aggregates.get(d, {}).get(keyword, {}) for d in dates]
+    posts = [int(x.get("posts", 0)) for x in daily]
+    engagement = [int(x.get("engagement", 0)) for x in daily]
+    posts_prefix = _prefix(posts)
+    engagement_prefix = _prefix(engagement)
+
+    rows = []
+    for i in range(max(0, len(dates) - days), len(dates)):
+        rows.append(_trend_row(dates, i, keyword, posts, engagement, posts_prefix, engagement_prefix, windows))
+    return rows
+
+
+def keyword_trends(aggregates, end_date=None, windows=DEFAULT_WINDOWS, keywords=None):
+    """One row per keyword for end_date (default: the latest aggregated day)."""
+    dates = _calendar(aggregates, end_date, max(windows, default=1) + 1)
+    if not dates:
+        return []
+    if keywords is None:
+        keywords = sorted({k for d in dates for k in aggregates.get(d, {})})
+    rows = []
+    for keyword in keywords:
+        rows.extend(keyword_series(aggregates, keyword, end_date=dates[-1], days=1, windows=windows))
+    rows.sort(key=lambda x: (x["posts"], x["engagement"]), reverse=True)
+    return rows
+
+
+def format_table(rows):
+    if not rows:
+        return "(no data)"
+    columns = list(rows[0])
+    cells = [[str(row.get(c, "")) for c in columns] for row in rows]
+    widths = [max(_display_width(c), *(_display_width(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    lines = ["  ".join(_pad(c, w) for c, w in zip(columns, widths)).rstrip()]
+    lines.extend("  ".join(_pad(v, w) for v, w in zip(r, widths)).rstrip() for r in cells)
+    return "\n".join(lines)
+
+
+def _trend_row(dates, i, keyword, posts, engagement, posts_prefix, engagement_prefix, windows):
+    row = {
+        "date": dates[i],
+        "keyword": keyword,
+        "posts": posts[i],
+        "engagement": engagement[i],
+        "posts_dod": posts[i] - posts[i - 1] if i > 0 else "",
+        "engagement_dod": engagement[i] - engagement[i - 1] if i > 0 else "",
+    }
+    for window in windows:
+        start = max(0, i + 1 - window)
+        window_posts = posts_prefix[i + 1] - posts_prefix[start]
+        window_engagement = engagement_prefix[i + 1] - engagement_prefix[start]
+        row["posts_%sd" % window] = window_posts
+        row["engagement_%sd" % window] = window_engagement
+        row["avg_engagement_%sd" % window] = round(window_engagement / window_posts, 2) if window_posts else 0.0
+    return row
+
+
+def _calendar(aggregates, end_date, days):
+    if not aggregates:
+        return []
+    end = date.fromisoformat(end_date or max(aggregates))
+    return [(end - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+
+
+def _prefix(values):
+    out = [0]
+    for value in values:
+        out.append(out[-1] + value)
+    return out
+
+
+def _display_width(text):
+    return sum(2 if ord(ch) > 0x2E7F else 1 for ch in text)
+
+
+def _pad(text, width):
+    return text + " " * (width - _display_width(text))
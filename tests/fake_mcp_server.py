@@ -0,0 +1,59 @@
+"""Minimal stdio MCP server used by the bridge tests."""
+import json
+import os
+import sys
+import time
+
+
+def reply(message_id, result=None, error=None):
+    message = {"jsonrpc": "2.0", "id": message_id}
+    if error is not None:
+        message["error"] = error
+    else:
+        message["result"] = result
+    sys.stdout.write(json.dumps(message, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def text_result(payload, is_error=False):
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+    return {"content": [{"type": "text", "text": text}], "isError": is_error}
+
+
+def main():
+    calls = 0
+    for line in sys.stdin:
+        message = json.loads(line)
+        method = message.get("method")
+        if "id" not in message:
+            continue
+        if method == "initialize":
+            reply(message["id"], {"protocolVersion": "2024-11-05", "capabilities": {}, "serverInfo": {"name": "fake"}})
+            continue
+        if method != "tools/call":
+            reply(message["id"], error={"code": -32601, "message": "method not found"})
+            continue
+
+        calls += 1
+        name = message["params"]["name"]
+        arguments = message["params"].get("arguments", {})
+        if name == "search_feeds":
+            feeds = [{"id": "feed_%s" % i, "note_id": "note_%s" % i, "xsec_token": "tok"} for i in range(2)]
+            reply(message["id"], text_result({"keyword": arguments.get("keyword"), "feeds": feeds}))
+        elif name == "get_feed_detail":
+            reply(message["id"], text_result("[log] ok\n" + json.dumps({"note": {"noteId": arguments.get("feed_id")}})))
+        elif name == "whoami":
+            reply(message["id"], text_result({"pid": os.getpid(), "calls": calls}))
+        elif name == "sleep":
+            time.sleep(float(arguments.get("seconds", 1)))
+            reply(message["id"], text_result({"slept": True}))
+        elif name == "fail":
+            reply(message["id"], text_result("未登录", is_error=True))
+        elif name == "exit":
+            return
+        else:
+            reply(message["id"], error={"code": -32602, "message": "unknown tool %s" % name})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src import agent_reach_bridge
+from src.agent_reach_bridge import BridgeError, CircuitBreaker, CircuitOpenError, LatencyTracker, check_agent_reach_ready
+
+
+class ReadyCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_file = Path(self.tmp.name) / "cache" / "agent_reach_ready.json"
+        patcher = mock.patch.object(agent_reach_bridge, "_resolve_executable", return_value="/bin/agent-reach")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_doctor_skipped_while_cache_is_fresh(self):
+        with mock.patch.object(agent_reach_bridge, "run_cmd", return_value="ok") as run_cmd:
+            self.assertFalse(check_agent_reach_ready(self.cache_file, ttl_seconds=60))
+            self.assertTrue(check_agent_reach_ready(self.cache_file, ttl_seconds=60))
+        self.assertEqual(run_cmd.call_count, 1)
+
+    def test_expired_cache_runs_doctor_again(self):
+        self.cache_file.parent.mkdir(parents=True)
+        self.cache_file.write_text(
+            json.dumps({"checked_at": time.time() - 120, "agent_reach_bin": "/bin/agent-reach"}),
+            encoding="utf-8",
+        )
+        with mock.patch.object(agent_reach_bridge, "run_cmd", return_value="ok") as run_cmd:
+            self.assertFalse(check_agent_reach_ready(self.cache_file, ttl_seconds=60))
+        self.assertEqual(run_cmd.call_count, 1)
+
+    def test_failed_doctor_clears_cache(self):
+        with mock.patch.object(agent_reach_bridge, "run_cmd", return_value="ok"):
+            check_agent_reach_ready(self.cache_file, ttl_seconds=60)
+        self.cache_file.write_text("{}", encoding="utf-8")
+        with mock.patch.object(agent_reach_bridge, "run_cmd", side_effect=BridgeError("boom")):
+            with self.assertRaises(BridgeError):
+                check_agent_reach_ready(self.cache_file, ttl_seconds=60)
+        self.assertFalse(self.cache_file.exists())
+
+
+class ResolveExecutableTests(unittest.TestCase):
+    def test_resolved_path_is_memoized(self):
+        agent_reach_bridge._EXECUTABLE_CACHE.clear()
+        self.addCleanup(agent_reach_bridge._EXECUTABLE_CACHE.clear)
+        with mock.patch.object(agent_reach_bridge, "_find_executable", return_value=__file__) as find:
+            self.assertEqual(agent_reach_bridge._resolve_executable("mcporter"), __file__)
+            self.assertEqual(agent_reach_bridge._resolve_executable("mcporter"), __file__)
+        self.assertEqual(find.call_count, 1)
+
+
+class AsyncBridgeTests(unittest.TestCase):
+    def test_timeout_kills_child(self):
+        started = time.monotonic()
+        with self.assertRaises(BridgeError):
+            agent_reach_bridge.run_cmd([sys.executable, "-c", "import time; time.sleep(30)"], timeout=0.3)
+        self.assertLess(time.monotonic() - started, 10)
+
+    def test_cancellation_kills_child(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pid_file = Path(tmp) / "pid"
+            script = "import os, time; open(%r, 'w').write(str(os.getpid())); time.sleep(30)" % str(pid_file)
+
+            async def scenario():
+                task = asyncio.ensure_future(agent_reach_bridge.run_cmd_async([sys.executable, "-c", script], timeout=60))
+                while not pid_file.exists() or not pid_file.read_text():
+                    await asyncio.sleep(0.02)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+
+            asyncio.run(scenario())
+            with self.assertRaises(ProcessLookupError):
+                os.kill(int(pid_file.read_text()), 0)
+
+    def test_retry_backoff_is_awaited_with_jitter(self):
+        calls = []
+        sleeps = []
+
+        async def attempt():
+            calls.append(1)
+            if len(calls) < 3:
+                raise BridgeError("flaky")
+            return {"ok": True}
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+
+        with mock.patch.object(agent_reach_bridge.asyncio, "sleep", fake_sleep):
+            result = asyncio.run(agent_reach_bridge._call_with_retries(attempt, "MCP", 2, 1.0))
+        self.assertEqual(result, {"ok": True})
+        self.assertEqual(len(sleeps), 2)
+        self.assertTrue(0.75 <= sleeps[0] <= 1.25 and 1.5 <= sleeps[1] <= 2.5)
+
+    def test_sync_wrapper_uses_session(self):
+        session = mock.Mock()
+        session.call_tool.return_value = {"feeds": []}
+        self.assertEqual(agent_reach_bridge.search_feeds("k", session=session), {"feeds": []})
+        session.call_tool.assert_called_once_with("search_feeds", {"keyword": "k"}, timeout=180)
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def test_trips_after_consecutive_failures_and_fails_fast(self):
+        breaker = CircuitBreaker("get_feed_detail", threshold=2)
+        session = mock.Mock()
+        session.call_tool.side_effect = agent_reach_bridge.McpSessionError("not logged in")
+
+        for _ in range(2):
+            with self.assertRaises(BridgeError):
+                agent_reach_bridge.get_feed_detail("f", "t", retries=0, session=session, breaker=breaker)
+        with self.assertRaises(CircuitOpenError):
+            agent_reach_bridge.get_feed_detail("f", "t", retries=0, session=session, breaker=breaker)
+
+        self.assertEqual(session.call_tool.call_count, 2)
+        self.assertEqual(breaker.stats(), {"state": "open", "consecutive_failures": 2, "rejected_calls": 1})
+        self.assertEqual([(e["stage"], e["state"]) for e in breaker.events], [("breaker", "open")])
+        self.assertIn("not logged in", breaker.events[0]["error"])
+
+    def test_success_resets_count_and_cooldown_half_opens(self):
+        now = [0.0]
+        breaker = CircuitBreaker("search_feeds", threshold=2, cooldown_seconds=60, clock=lambda: now[0])
+        breaker.record_failure(BridgeError("x"))
+        breaker.record_success()
+        breaker.record_failure(BridgeError("x"))
+        self.assertEqual(breaker.state, "closed")
+        breaker.record_failure(BridgeError("x"))
+        self.assertTrue(breaker.is_open)
+
+        now[0] = 61
+        breaker.before_call()
+        breaker.record_success()
+        self.assertEqual([e["state"] for e in breaker.events], ["open", "half_open", "closed"])
+
+    def test_per_note_errors_do_not_trip(self):
+        breaker = CircuitBreaker("get_feed_detail", threshold=2)
+        session = mock.Mock()
+        session.call_tool.side_effect = agent_reach_bridge.McpToolError("笔记不存在或已删除")
+        for _ in range(5):
+            with self.assertRaises(BridgeError) as caught:
+                agent_reach_bridge.get_feed_detail("f", "t", retries=0, session=session, breaker=breaker)
+            self.assertEqual(caught.exception.kind, "item")
+        self.assertEqual(breaker.stats(), {"state": "closed", "consecutive_failures": 0, "rejected_calls": 0})
+
+        session.call_tool.side_effect = agent_reach_bridge.McpToolError("not logged in")
+        with self.assertRaises(BridgeError):
+            agent_reach_bridge.get_feed_detail("f", "t", retries=0, session=session, breaker=breaker)
+        self.assertEqual(breaker.failures, 1)
+
+    def test_streak_counts_one_failure_kind(self):
+        breaker = CircuitBreaker("search_feeds", threshold=2)
+        breaker.record_failure(agent_reach_bridge.CallTimeoutError(30))
+        breaker.record_failure(BridgeError("MCP 会话已断开"))
+        self.assertEqual((breaker.state, breaker.failure_kind, breaker.failures), ("closed", "transport", 1))
+        breaker.record_failure(BridgeError("note not found"))
+        breaker.record_failure(BridgeError("MCP 会话已断开"))
+        self.assertEqual(breaker.state, "closed")
+        breaker.record_failure(BridgeError("MCP 会话已断开", kind="transport"))
+        self.assertEqual(breaker.state, "open")
+        self.assertEqual(breaker.events[0]["failure_kind"], "transport")
+
+    def test_half_open_admits_a_single_trial(self):
+        now = [0.0]
+        breaker = CircuitBreaker("get_feed_detail", threshold=1, cooldown_seconds=60, clock=lambda: now[0])
+        breaker.record_failure(BridgeError("x"))
+        now[0] = 61
+        self.assertFalse(breaker.is_open)
+        breaker.before_call()
+        self.assertTrue(breaker.is_open)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_failure(BridgeError("still down"))
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        now[0] = 122
+        breaker.before_call()
+        breaker.release()
+        breaker.before_call()
+        breaker.record_success()
+        breaker.before_call()
+        self.assertEqual(breaker.stats()["rejected_calls"], 2)
+        self.assertEqual([e["state"] for e in breaker.events], ["open", "half_open", "open", "half_open", "closed"])
+
+    def test_zero_threshold_never_trips(self):
+        breaker = CircuitBreaker("search_feeds", threshold=0)
+        for _ in range(10):
+            breaker.record_failure(BridgeError("x"))
+        breaker.before_call()
+        self.assertEqual(breaker.events, [])
+
+
+class LatencyTrackerTests(unittest.TestCase):
+    def test_timeout_follows_p95_within_bounds(self):
+        latency = LatencyTracker(factor=3.0, min_samples=5, min_timeout=15.0)
+        self.assertEqual(latency.timeout(180), 180)
+        for seconds in (2, 3, 4, 5, 10):
+            latency.observe(seconds)
+        self.assertEqual(latency.timeout(180), 30.0)
+        self.assertEqual(latency.timeout(20), 20)
+        for _ in range(20):
+            latency.observe(1)
+        self.assertEqual(latency.timeout(180), 15.0)
+
+    def test_timeouts_push_the_adaptive_timeout_back_up(self):
+        latency = LatencyTracker(factor=3.0, min_samples=5, min_timeout=15.0)
+        for _ in range(20):
+            latency.observe(1)
+        timeout = latency.timeout(180)
+        self.assertEqual(timeout, 15.0)
+        session = mock.Mock()
+        session.call_tool.side_effect = agent_reach_bridge.McpSessionTimeout(timeout)
+        for _ in range(2):
+            with self.assertRaises(BridgeError):
+                agent_reach_bridge.get_feed_detail("f", "t", retries=0, session=session, latency=latency)
+        self.assertEqual(latency.timeout(180), 45.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
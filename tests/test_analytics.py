@@ -1,6 +1,6 @@
 import unittest
 
-from src.analytics import build_keyword_summary
+from src.analytics import analyze_keywords, build_keyword_summary, np
 
 
 class AnalyticsTests(unittest.TestCase):
@@ -20,6 +20,31 @@ class AnalyticsTests(unittest.TestCase):
         self.assertEqual(summary[0]["avg_comments"], 3.0)
         self.assertEqual(summary[0]["engagement"], 40)
 
+    def test_analyze_keywords_metrics_and_top_notes(self):
+        rows = [{"keyword": "a", "note_id": "n%s" % i, "likes": i, "comments": "1", "collects": 0, "shares": 0} for i in range(1, 11)]
+        rows.append({"keyword": "b", "note_id": "x", "likes": 5, "comments": 0, "collects": 0, "shares": 0})
+
+        metrics, top = analyze_keywords(rows, top_n=2, engine="python")
+
+        a = metrics[0]
+        self.assertEqual(a["keyword"], "a")
+        self.assertEqual(a["sum_likes"], 55)
+        self.assertEqual(a["sum_comments"], 10)
+        self.assertEqual(a["median_engagement"], 6.5)
+        self.assertEqual(a["p90_engagement"], 10.1)
+        self.assertEqual(a["median_likes"], 5.5)
+        self.assertEqual(a["engagement_share"], round(65 / 70, 4))
+        self.assertEqual([(x["keyword"], x["rank"], x["note_id"]) for x in top], [("a", 1, "n10"), ("a", 2, "n9"), ("b", 1, "x")])
+
+    @unittest.skipIf(np is None, "numpy not installed")
+    def test_numpy_engine_matches_python_engine(self):
+        rows = [
+            {"keyword": ("k%s" % (i % 7)) if i % 11 else "", "note_id": str(i), "likes": (i * 37) % 101, "comments": i % 5,
+             "collects": str(i % 3), "shares": 1 if i % 4 == 0 else None}
+            for i in range(500)
+        ]
+        self.assertEqual(analyze_keywords(rows, top_n=3, engine="numpy"), analyze_keywords(rows, top_n=3, engine="python"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,88 @@
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+from src import pipeline
+from src.checkpoint import CheckpointJournal
+
+
+def _search(keyword, **kwargs):
+    now = int(datetime.now(timezone.utc).timestamp())
+    return {
+        "feeds": [
+            {"id": "f-%s-%s" % (keyword, i), "note_id": "%s-%s" % (keyword, i), "xsec_token": "t", "time": str(now)}
+            for i in range(2)
+        ]
+    }
+
+
+def _detail(feed_id, xsec_token, **kwargs):
+    return {"note": {"desc": "body " + feed_id}}
+
+
+class CheckpointJournalTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "runlog" / "2026-03-01" / "checkpoint.jsonl"
+
+    def test_resume_replays_entries_and_repairs_torn_line(self):
+        with CheckpointJournal(self.path) as journal:
+            journal.record_search("k", {"feeds": []})
+            journal.record_detail({"note_id": "n1"}, {"note": {"desc": "x"}})
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write('{"type":"detail","key":"n2"')
+
+        with CheckpointJournal(self.path, resume=True) as journal:
+            self.assertEqual(journal.search_payload("k"), {"feeds": []})
+            self.assertEqual(journal.detail({"note_id": "n1"}), {"note": {"desc": "x"}})
+            self.assertIsNone(journal.detail({"note_id": "n2"}))
+            journal.record_detail({"note_id": "n3"}, {})
+            self.assertEqual(journal.stats, {"resumed": True, "replayed_searches": 1, "replayed_details": 1})
+
+        self.assertEqual(len(self.path.read_text(encoding="utf-8").splitlines()), 3)
+        CheckpointJournal(self.path).discard()
+        self.assertFalse(self.path.exists())
+
+    def test_collect_once_resumes_only_pending_calls(self):
+        keywords = ["a", "b", "c"]
+        calls = []
+
+        def failing_search(keyword, **kwargs):
+            calls.append(keyword)
+            if keyword == "b":
+                raise pipeline.BridgeError("boom")
+            return _search(keyword)
+
+        def collect(search, journal):
+            with mock.patch.object(pipeline, "check_agent_reach_ready", return_value=False), mock.patch.object(
+                pipeline, "search_feeds", search
+            ), mock.patch.object(pipeline, "get_feed_detail", mock.Mock(side_effect=_detail)) as detail:
+                result = pipeline.collect_once(
+                    keywords,
+                    random_sleep_min_seconds=0,
+                    random_sleep_max_seconds=0,
+                    continue_on_error=False,
+                    checkpoint=journal,
+                )
+            return result, detail.call_count
+
+        with CheckpointJournal(self.path) as journal:
+            with self.assertRaises(pipeline.BridgeError):
+                collect(failing_search, journal)
+        self.assertEqual(calls, ["a", "b"])
+
+        calls.clear()
+        with CheckpointJournal(self.path, resume=True) as journal:
+            result, detail_calls = collect(lambda keyword, **kw: calls.append(keyword) or _search(keyword), journal)
+
+        self.assertEqual(calls, ["b", "c"])
+        self.assertEqual(detail_calls, 4)
+        self.assertEqual(len(result["rows"]), 6)
+        self.assertEqual(result["checkpoint"], {"resumed": True, "replayed_searches": 1, "replayed_details": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src import columnar_store
+from src.pipeline import save_outputs
+
+
+def _row(keyword, note_id, publish_ts, likes):
+    return {
+        "keyword": keyword,
+        "crawl_ts": "2026-03-01T09:00:00",
+        "feed_id": note_id,
+        "note_id": note_id,
+        "xsec_token": "t",
+        "title": "标题" + note_id,
+        "author": "a",
+        "publish_time": "",
+        "publish_ts": publish_ts,
+        "likes": likes,
+        "comments": "3",
+        "collects": 0,
+        "shares": 0,
+        "desc": "",
+        "detail_content": "",
+        "detail_tags": "",
+        "detail_opened": "True",
+        "note_url": "https://www.xiaohongshu.com/explore/" + note_id,
+    }
+
+
+def _result(crawl_date, rows):
+    return {
+        "crawl_date": crawl_date,
+        "crawl_ts": crawl_date + "T09:00:00",
+        "rows": rows,
+        "raw_payloads": {},
+        "errors": [],
+        "keyword_stats": [],
+    }
+
+
+class ColumnarStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+
+    @unittest.skipIf(columnar_store.available(), "pyarrow is installed")
+    def test_parquet_storage_requires_pyarrow(self):
+        with self.assertRaises(RuntimeError):
+            save_outputs(_result("2026-03-01", []), self.root, storage="parquet")
+
+    @unittest.skipUnless(columnar_store.available(), "pyarrow not installed")
+    def test_round_trip_with_pushdown_filters(self):
+        save_outputs(
+            _result("2026-03-01", [_row("咖啡", "n1", 100, 5), _row("咖啡", "n2", 300, "7"), _row("茶", "n3", 200, 1)]),
+            self.root,
+            storage="parquet",
+        )
+        save_outputs(_result("2026-03-02", [_row("咖啡", "n4", 400, 9)]), self.root, storage="both")
+
+        self.assertFalse((self.root / "by_date" / "2026-03-01").exists())
+        self.assertTrue((self.root / "by_date" / "2026-03-02" / "咖啡.csv").exists())
+        self.assertTrue((self.root / "reports" / "2026-03-01" / "all_rows.csv").exists())
+
+        rows = columnar_store.read_notes(self.root / "columnar", keywords=["咖啡"], min_publish_ts=200)
+        self.assertEqual(sorted(r["note_id"] for r in rows), ["n2", "n4"])
+        self.assertEqual({r["likes"] for r in rows}, {7, 9})
+        self.assertTrue(all(r["comments"] == 3 and r["detail_opened"] is True for r in rows))
+
+        table = columnar_store.read_notes_table(self.root / "columnar", dates=["2026-03-01"], columns=["note_id"])
+        self.assertEqual(sorted(table.column("note_id").to_pylist()), ["n1", "n2", "n3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.detail_cache import DetailCache
+from src.extractors import merge_detail_into_row
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class DetailCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.clock = FakeClock()
+        self.cache = DetailCache(
+            Path(self.tmp.name) / "detail_cache.sqlite",
+            ttl_seconds=3600,
+            max_age_seconds=86400,
+            max_entries=2,
+            clock=self.clock,
+        )
+        self.addCleanup(self.cache.close)
+        self.detail = {"note": {"desc": "正文", "interactInfo": {"likedCount": 5}}}
+
+    def test_fresh_entry_is_served_as_is(self):
+        row = {"note_id": "n1", "likes": 9}
+        self.assertIsNone(self.cache.get(row))
+        self.cache.put(row, self.detail)
+
+        self.clock.now += 60
+        self.assertEqual(self.cache.get(row), self.detail)
+        self.assertEqual(self.cache.stats["hits"], 1)
+        self.assertEqual(self.cache.stats["misses"], 1)
+
+    def test_stale_entry_keeps_content_but_uses_search_counts(self):
+        row = {"note_id": "n1", "likes": 9, "detail_content": ""}
+        self.cache.put(row, self.detail)
+
+        self.clock.now += 7200
+        merged = merge_detail_into_row(row, self.cache.get(row))
+        self.assertEqual(merged["detail_content"], "正文")
+        self.assertEqual(merged["likes"], 9)
+        self.assertEqual(self.cache.stats["stale_hits"], 1)
+
+        self.clock.now += 60
+        newer = dict(row, likes=12)
+        merged = merge_detail_into_row(newer, self.cache.get(newer))
+        self.assertEqual(merged["detail_content"], "正文")
+        self.assertEqual(merged["likes"], 12)
+        self.assertEqual(self.cache.stats["hits"], 1)
+
+    def test_expired_and_overflow_entries_are_evicted(self):
+        self.cache.put({"note_id": "old"}, self.detail)
+        self.clock.now += 90000
+        self.assertIsNone(self.cache.get({"note_id": "old"}))
+
+        for note_id in ("a", "b", "c"):
+            self.clock.now += 1
+            self.cache.put({"note_id": note_id}, self.detail)
+        self.assertEqual(self.cache.prune(), 2)
+        self.assertIsNone(self.cache.get({"note_id": "a"}))
+        self.assertIsNotNone(self.cache.get({"note_id": "c"}))
+
+    def test_failed_detail_is_not_stored(self):
+        self.cache.put({"note_id": "n1"}, {"_opened": False})
+        self.assertIsNone(self.cache.get({"note_id": "n1"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
+from unittest import mock
 
+from src import extractors
 from src.extractors import extract_json_payload, normalize_search_results
 
 
@@ -10,6 +12,18 @@ class ExtractorTests(unittest.TestCase):
         self.assertTrue(data["ok"])
         self.assertEqual(data["data"], [1, 2, 3])
 
+    def test_extract_json_payload_skips_bracketed_log_prefixes(self):
+        raw = "[mcporter] calling {xiaohongshu}\n[info] step [1/2]\n  [{\"id\": 1}, {\"id\": 2}]\n[done]\n"
+        for backend in (extractors.orjson, None):
+            with mock.patch.object(extractors, "orjson", backend):
+                self.assertEqual(extract_json_payload(raw), [{"id": 1}, {"id": 2}])
+
+    def test_extract_json_payload_inline_fallback(self):
+        raw = "result: {\"ok\": 1} trailing"
+        self.assertEqual(extract_json_payload(raw), {"ok": 1})
+        with self.assertRaises(ValueError):
+            extract_json_payload("[info] nothing here {")
+
     def test_normalize_search_results_from_nested_payload(self):
         payload = {
             "result": {
@@ -48,6 +62,50 @@ class ExtractorTests(unittest.TestCase):
         self.assertEqual(row["collects"], 2)
         self.assertEqual(row["shares"], 1)
 
+    def test_normalize_search_results_note_card_aliases(self):
+        payload = {
+            "items": [
+                {
+                    "id": "feed_b",
+                    "xsecToken": "token_b",
+                    "noteCard": {
+                        "displayTitle": "  ",
+                        "name": "门店点餐",
+                        "author": {"nickName": "Bob"},
+                        "interactInfo": {"likedCount": "1.2w", "commentCount": "  "},
+                        "comments": "3千",
+                        "publishTime": 1718457641000,
+                        "url": "https://example.com/b",
+                    },
+                },
+                {"id": "feed_b", "noteCard": {"title": "重复"}},
+                {"noteCard": {"noteId": "note_c"}},
+            ]
+        }
+
+        rows = normalize_search_results(payload, keyword="k")
+        self.assertEqual([r["note_id"] for r in rows], ["feed_b", "note_c"])
+
+        row = rows[0]
+        self.assertEqual(row["feed_id"], "feed_b")
+        self.assertEqual(row["xsec_token"], "token_b")
+        self.assertEqual(row["title"], "门店点餐")
+        self.assertEqual(row["author"], "Bob")
+        self.assertEqual(row["likes"], 12000)
+        self.assertEqual(row["comments"], 3000)
+        self.assertEqual(row["publish_time"], "1718457641000")
+        self.assertEqual(row["publish_ts"], 1718457641)
+        self.assertEqual(row["note_url"], "https://example.com/b")
+        self.assertEqual(rows[1]["feed_id"], "note_c")
+        self.assertEqual(rows[1]["note_url"], "https://www.xiaohongshu.com/explore/note_c")
+        self.assertEqual(rows[0]["crawl_ts"], rows[1]["crawl_ts"])
+
+    def test_falsy_first_id_is_not_a_feed_candidate(self):
+        self.assertEqual(normalize_search_results({"items": [{"id": 0, "name": "x"}]}, keyword="k"), [])
+
+        rows = normalize_search_results({"id": [], "noteCard": {"noteId": "n1"}}, keyword="k")
+        self.assertEqual([(r["feed_id"], r["note_id"]) for r in rows], [("n1", "n1")])
+
 
 if __name__ == "__main__":
     unittest.main()
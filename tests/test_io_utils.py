@@ -0,0 +1,129 @@
+import csv
+import io
+import os
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.io_utils import (
+    AtomicWriteBatch,
+    csv_fieldnames,
+    file_lock,
+    remove_stale_temps,
+    write_csv,
+    write_partitions,
+    write_text,
+)
+
+
+class IoUtilsTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+
+    def test_csv_fieldnames_keeps_first_appearance_order(self):
+        rows = [{"a": 1, "b": 2}, {"b": 3, "c": 4}, {"d": 5, "a": 6}]
+        self.assertEqual(csv_fieldnames(rows), ["a", "b", "c", "d"])
+
+    def test_write_csv_matches_dict_writer(self):
+        rows = [{"a": "x,y", "b": 'q"1'}, {"b": "多行\n文本", "c": 3}]
+        path = self.root / "out.csv"
+        write_csv(path, rows)
+
+        expected = io.StringIO(newline="")
+        writer = csv.DictWriter(expected, fieldnames=["a", "b", "c"])
+        writer.writeheader()
+        writer.writerows(rows)
+        self.assertEqual(path.read_bytes(), b"\xef\xbb\xbf" + expected.getvalue().encode("utf-8"))
+
+    def test_write_partitions_same_bytes_serial_and_threaded(self):
+        parts = [
+            {
+                "rows": [{"keyword": "k%s" % i, "n": j} for j in range(50)],
+                "csv_paths": [self.root / mode / ("k%s.csv" % i)],
+                "jsonl_paths": [self.root / mode / ("k%s.jsonl" % i)],
+            }
+            for mode in ("serial", "threaded")
+            for i in range(6)
+        ]
+        write_partitions(parts[:6], workers=0)
+        write_partitions(parts[6:], workers=4)
+
+        for i in range(6):
+            for suffix in (".csv", ".jsonl"):
+                name = "k%s%s" % (i, suffix)
+                self.assertEqual(
+                    (self.root / "serial" / name).read_bytes(),
+                    (self.root / "threaded" / name).read_bytes(),
+                )
+
+    def test_write_partitions_shared_path_last_wins(self):
+        path = self.root / "same.csv"
+        write_partitions(
+            [{"rows": [{"v": 1}], "csv_paths": [path]}, {"rows": [{"v": 2}], "csv_paths": [path]}],
+            workers=4,
+        )
+        self.assertIn("2", path.read_text(encoding="utf-8-sig"))
+
+    def test_write_csv_without_rows(self):
+        path = self.root / "empty.csv"
+        write_csv(path, [])
+        self.assertEqual(path.read_bytes(), b"\xef\xbb\xbfmessage\r\nno data\r\n")
+
+    def test_batch_abort_keeps_previous_files(self):
+        path = self.root / "report.csv"
+        write_csv(path, [{"v": "old"}])
+        with self.assertRaises(RuntimeError):
+            with AtomicWriteBatch() as batch:
+                write_csv(path, [{"v": "new"}], batch=batch)
+                write_text(self.root / "other.txt", "x", batch=batch)
+                raise RuntimeError("boom")
+        self.assertIn("old", path.read_text(encoding="utf-8-sig"))
+        self.assertFalse((self.root / "other.txt").exists())
+        self.assertEqual(sorted(p.name for p in self.root.iterdir()), ["report.csv"])
+
+    def test_batch_commit_publishes_all_files(self):
+        with AtomicWriteBatch() as batch:
+            write_text(self.root / "a" / "x.txt", "1", batch=batch)
+            write_text(self.root / "b" / "y.txt", "2", batch=batch)
+            self.assertFalse((self.root / "a" / "x.txt").exists())
+        self.assertEqual((self.root / "a" / "x.txt").read_text(encoding="utf-8"), "1")
+        self.assertEqual((self.root / "b" / "y.txt").read_text(encoding="utf-8"), "2")
+        self.assertEqual([p.name for p in (self.root / "a").iterdir()], ["x.txt"])
+
+    def test_replacing_keeps_the_target_mode(self):
+        path = self.root / "report.csv"
+        write_text(path, "1")
+        os.chmod(path, 0o640)
+        write_text(path, "2")
+        self.assertEqual(stat.S_IMODE(path.stat().st_mode), 0o640)
+
+    def test_sweeping_batch_removes_orphaned_temps_of_its_targets(self):
+        path = self.root / "a" / "x.txt"
+        write_text(path, "old")
+        orphan = self.root / "a" / ".x.txt.abcd1234.tmp"
+        other = self.root / "a" / ".y.txt.abcd1234.tmp"
+        orphan.write_text("torn", encoding="utf-8")
+        other.write_text("torn", encoding="utf-8")
+
+        with AtomicWriteBatch(sweep_stale=True) as batch:
+            write_text(path, "new", batch=batch)
+            self.assertFalse(orphan.exists())
+            self.assertEqual(remove_stale_temps(path, keep=batch.pending_temps()), 0)
+        self.assertEqual(sorted(p.name for p in (self.root / "a").iterdir()), [".y.txt.abcd1234.tmp", "x.txt"])
+        self.assertEqual(remove_stale_temps(self.root / "a" / "y.txt"), 1)
+
+    def test_file_lock_times_out_while_held(self):
+        lock_path = self.root / "run.lock"
+        with file_lock(lock_path):
+            with self.assertRaises(TimeoutError):
+                with file_lock(lock_path, timeout=0.1, poll_seconds=0.02):
+                    pass
+        with file_lock(lock_path, timeout=0.1):
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import sys
+import unittest
+from pathlib import Path
+
+from src.agent_reach_bridge import BridgeError, call_tool, get_feed_detail, open_session, search_feeds
+
+FAKE_SERVER = [sys.executable, str(Path(__file__).resolve().parent / "fake_mcp_server.py")]
+
+
+class McpSessionTests(unittest.TestCase):
+    def test_session_reuses_one_process(self):
+        with open_session(FAKE_SERVER) as session:
+            first = call_tool("whoami", {}, retries=0, session=session)
+            payload = search_feeds("餐饮POS", retries=0, session=session)
+            detail = get_feed_detail("feed_1", "tok", retries=0, session=session)
+            second = call_tool("whoami", {}, retries=0, session=session)
+
+        self.assertEqual(payload["keyword"], "餐饮POS")
+        self.assertEqual(len(payload["feeds"]), 2)
+        self.assertEqual(detail["note"]["noteId"], "feed_1")
+        self.assertEqual(first["pid"], second["pid"])
+        self.assertEqual(second["calls"], 4)
+
+    def test_tool_error_is_retried_then_raised(self):
+        with open_session(FAKE_SERVER) as session:
+            with self.assertRaises(BridgeError) as ctx:
+                call_tool("fail", {}, retries=1, retry_delay_seconds=0, session=session)
+        self.assertIn("已重试 2 次", str(ctx.exception))
+        self.assertIn("未登录", str(ctx.exception))
+
+    def test_timeout_restarts_session(self):
+        with open_session(FAKE_SERVER) as session:
+            before = call_tool("whoami", {}, retries=0, session=session)
+            with self.assertRaises(BridgeError) as ctx:
+                call_tool("sleep", {"seconds": 5}, timeout=0.3, retries=0, session=session)
+            after = call_tool("whoami", {}, retries=0, session=session)
+
+        self.assertIn("timeout", str(ctx.exception))
+        self.assertNotEqual(before["pid"], after["pid"])
+
+    def test_dead_server_is_restarted(self):
+        with open_session(FAKE_SERVER) as session:
+            before = call_tool("whoami", {}, retries=0, session=session)
+            with self.assertRaises(BridgeError):
+                call_tool("exit", {}, timeout=5, retries=0, session=session)
+            after = call_tool("whoami", {}, retries=0, session=session)
+
+        self.assertNotEqual(before["pid"], after["pid"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import tempfile
+import unittest
+import urllib.request
+from pathlib import Path
+from unittest import mock
+
+from src import pipeline, profiling
+from src.metrics import MetricsServer, RunMetrics, write_textfile
+
+
+def _metrics():
+    timings = profiling.StageTimings()
+    for seconds in (0.002, 0.2, 0.2, 400.0):
+        timings.add("call_mcporter", seconds)
+    timings.count("errors", "detail", 2)
+    timings.count("bridge_retries", "mcporter")
+    clock = iter([100.0, 112.5]).__next__
+    return RunMetrics(timings, clock=clock)
+
+
+class MetricsTests(unittest.TestCase):
+    def test_render_openmetrics_and_prometheus(self):
+        run_metrics = _metrics()
+        run_metrics.finish(success=True, saved_rows=7)
+
+        text = run_metrics.render()
+        self.assertIn("# TYPE xhs_errors counter", text)
+        self.assertIn('xhs_errors_total{stage="detail"} 2', text)
+        self.assertIn('xhs_errors_total{stage="search"} 0', text)
+        self.assertIn('xhs_bridge_retries_total{kind="mcporter"} 1', text)
+        self.assertIn('xhs_stage_duration_seconds_bucket{stage="call_mcporter",le="0.005"} 1', text)
+        self.assertIn('xhs_stage_duration_seconds_bucket{stage="call_mcporter",le="0.25"} 3', text)
+        self.assertIn('xhs_stage_duration_seconds_bucket{stage="call_mcporter",le="300.0"} 3', text)
+        self.assertIn('xhs_stage_duration_seconds_bucket{stage="call_mcporter",le="+Inf"} 4', text)
+        self.assertIn('xhs_stage_duration_seconds_count{stage="call_mcporter"} 4', text)
+        self.assertIn("xhs_run_duration_seconds 12.5", text)
+        self.assertIn("xhs_run_success 1", text)
+        self.assertIn("xhs_report_rows 7", text)
+        self.assertTrue(text.endswith("# EOF\n"))
+
+        prometheus = run_metrics.render(openmetrics=False)
+        self.assertIn("# TYPE xhs_errors_total counter", prometheus)
+        self.assertNotIn("# EOF", prometheus)
+
+    def test_textfile_marks_unfinished_run_failed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "xhs.prom"
+            write_textfile(path, _metrics())
+            text = path.read_text(encoding="utf-8")
+        self.assertIn("xhs_run_success 0", text)
+        self.assertIn("xhs_run_in_progress 0", text)
+
+    def test_server_serves_live_metrics(self):
+        run_metrics = RunMetrics(profiling.StageTimings())
+        with MetricsServer(run_metrics, port=0) as server:
+            url = "http://127.0.0.1:%s/metrics" % server.port
+            request = urllib.request.Request(url, headers={"Accept": "application/openmetrics-text"})
+            with urllib.request.urlopen(request, timeout=5) as response:
+                self.assertIn("openmetrics-text", response.headers["Content-Type"])
+                self.assertIn("xhs_run_in_progress 1", response.read().decode("utf-8"))
+
+    def test_failed_run_still_writes_textfile(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "kw.txt").write_text("k\n", encoding="utf-8")
+            with mock.patch.object(pipeline, "check_agent_reach_ready", return_value=False), mock.patch.object(
+                pipeline, "search_feeds", side_effect=pipeline.BridgeError("未登录")
+            ):
+                with self.assertRaises(pipeline.BridgeError):
+                    pipeline.run_pipeline(root / "kw.txt", root / "data", metrics_file=root / "xhs.prom")
+            text = (root / "xhs.prom").read_text(encoding="utf-8")
+        self.assertIn("xhs_run_success 0", text)
+        self.assertIn('xhs_errors_total{stage="search"} 1', text)
+        self.assertIn('xhs_keywords_searched_total{result="failed"} 1', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.agent_reach_bridge import BridgeError
+from src.io_utils import file_lock
+from src.note_store import NoteStore
+from src.pipeline import load_existing_day_rows, save_outputs
+
+
+def _row(note_id, keyword="k", publish_ts=100):
+    return {"keyword": keyword, "note_id": note_id, "publish_ts": publish_ts, "likes": 1}
+
+
+def _result(rows):
+    return {
+        "crawl_date": "2026-03-02",
+        "crawl_ts": "2026-03-02T09:00:00",
+        "rows": rows,
+        "raw_payloads": {},
+        "errors": [],
+    }
+
+
+class NoteStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.store = NoteStore(self.root / "store" / "notes.sqlite")
+        self.addCleanup(self.store.close)
+
+    def test_save_day_replaces_rows_and_keeps_order(self):
+        self.store.save_day("2026-03-01", [_row("b"), _row("a"), _row("b")])
+        self.store.save_day("2026-03-01", [_row("c"), _row("a")])
+        self.assertTrue(self.store.has_day("2026-03-01"))
+        self.assertFalse(self.store.has_day("2026-03-02"))
+        self.assertEqual([r["note_id"] for r in self.store.rows_for_date("2026-03-01")], ["c", "a"])
+
+    def test_history_queries(self):
+        self.store.save_day("2026-03-01", [_row("a", publish_ts=100), _row("b", "other", 200)])
+        self.store.save_day("2026-03-02", [_row("a", publish_ts=100), _row("c", publish_ts=300)])
+        self.store.save_day("2026-03-03", [_row("d", publish_ts=400)])
+
+        self.assertEqual(self.store.keys_seen_between("2026-03-01", "2026-03-03"), {"a", "b", "c"})
+        self.assertEqual(self.store.first_seen(["a", "c", "zz"]), {"a": "2026-03-01", "c": "2026-03-02"})
+        rows = self.store.rows_published_between(min_publish_ts=100, max_publish_ts=300, keywords=["k"])
+        self.assertEqual([r["note_id"] for r in rows], ["a", "c", "a"])
+
+    def test_wal_mode_and_indexes(self):
+        conn = sqlite3.connect(str(self.store.path))
+        self.addCleanup(conn.close)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT row FROM notes WHERE publish_ts >= 5").fetchall()
+        self.assertIn("idx_notes_publish_ts", str(plan))
+
+    def test_save_outputs_upserts_and_counts_first_seen(self):
+        result = _result([_row("a"), _row("new")])
+        self.store.save_day("2026-03-01", [_row("a")])
+        save_outputs(result, self.root / "data", note_store=self.store)
+
+        rows = load_existing_day_rows(self.root / "data", "2026-03-02", self.store)
+        self.assertEqual([r["note_id"] for r in rows], ["a", "new"])
+        stats = (self.root / "data" / "runlog" / "2026-03-02" / "run_stats.json").read_text(encoding="utf-8")
+        self.assertIn('"new_notes": 1', stats)
+        self.assertIn('"returning_notes": 1', stats)
+
+    def test_failed_publish_leaves_the_store_unchanged(self):
+        self.store.save_day("2026-03-02", [_row("old")])
+        with mock.patch("src.io_utils.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                save_outputs(_result([_row("a")]), self.root / "data", note_store=self.store)
+        self.assertEqual([r["note_id"] for r in self.store.rows_for_date("2026-03-02")], ["old"])
+        self.assertEqual(self.store.first_seen(["a"]), {})
+
+    def test_save_outputs_waits_for_the_store_lock(self):
+        with file_lock(self.root / "data" / "store" / "save.lock"):
+            with self.assertRaises(BridgeError):
+                save_outputs(_result([_row("a")]), self.root / "data", note_store=self.store, lock_timeout=0.1)
+        self.assertFalse(self.store.has_day("2026-03-02"))
+        save_outputs(_result([_row("a")]), self.root / "data", note_store=self.store, lock_timeout=0.1)
+        self.assertTrue(self.store.has_day("2026-03-02"))
+
+
+if __name__ == "__main__":
+    unittest.main()
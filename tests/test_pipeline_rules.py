@@ -1,7 +1,26 @@
+import random
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
-from src.pipeline import dedup_rows, filter_rows_recent_hours, parse_publish_time_to_epoch_seconds
+from src.extractors import row_publish_ts
+from src.pipeline import (
+    CollectOptions,
+    SearchPrefetcher,
+    collect_once,
+    collect_sharded,
+    dedup_rows,
+    fetch_details_ordered,
+    filter_rows_recent_hours,
+    parse_publish_time_to_epoch_seconds,
+    prefilter_rows,
+    serial_request_rpm,
+    sort_rows_by_publish_time_desc,
+    top_rows_by_publish_time,
+)
+from src.transports import ReplayTransport
 
 
 class PipelineRulesTests(unittest.TestCase):
@@ -14,6 +33,16 @@ class PipelineRulesTests(unittest.TestCase):
         sec2 = parse_publish_time_to_epoch_seconds(iso_ts)
         self.assertTrue(sec2 > 0)
 
+    def test_row_publish_ts_is_typed_once(self):
+        row = {"publish_time": "2026-02-27T10:00:00+08:00"}
+        ts = row_publish_ts(row)
+        self.assertEqual(ts, parse_publish_time_to_epoch_seconds("2026-02-27T10:00:00+08:00"))
+        self.assertIs(row["publish_ts"], ts)
+
+        csv_row = {"publish_time": "1718457641000", "publish_ts": "1718457641"}
+        self.assertEqual(row_publish_ts(csv_row), 1718457641)
+        self.assertEqual(csv_row["publish_ts"], 1718457641)
+
     def test_filter_rows_recent_hours(self):
         now = datetime.now(timezone.utc)
         within = int((now - timedelta(hours=2)).timestamp())
@@ -39,6 +68,158 @@ class PipelineRulesTests(unittest.TestCase):
         self.assertEqual(len(out), 2)
         self.assertEqual({r["note_id"] for r in out}, {"x", "y"})
 
+    def test_top_rows_matches_full_sort(self):
+        rng = random.Random(7)
+        rows = [{"note_id": str(i), "publish_time": str(rng.choice([0, 1718457641, 1718457642, 1718460000]))} for i in range(200)]
+
+        expected = sort_rows_by_publish_time_desc(rows)[:25]
+        self.assertEqual(top_rows_by_publish_time(iter(rows), 25), expected)
+        self.assertEqual(top_rows_by_publish_time(iter(rows), 0), sort_rows_by_publish_time_desc(rows))
+
+    def test_prefilter_rows_drops_seen_and_old_rows(self):
+        now = int(datetime.now(timezone.utc).timestamp())
+        rows = [
+            {"note_id": "seen", "publish_time": str(now)},
+            {"note_id": "old", "publish_time": str(now - 48 * 3600)},
+            {"note_id": "fresh", "publish_time": str(now - 3600)},
+            {"note_id": "fresh", "publish_time": str(now - 3600)},
+            {"note_id": "no_time", "publish_time": ""},
+        ]
+
+        kept, dropped = prefilter_rows(rows, {"seen"}, min_publish_ts=now - 24 * 3600)
+        self.assertEqual([r["note_id"] for r in kept], ["fresh", "no_time"])
+        self.assertEqual([r["note_id"] for r in dropped], ["seen", "old", "fresh"])
+
+    def test_fetch_details_ordered_keeps_row_order(self):
+        rows = [{"note_id": str(i)} for i in range(20)]
+
+        def fetch_one(row):
+            time.sleep(random.uniform(0, 0.01))
+            if row["note_id"] == "7":
+                return None, RuntimeError("boom")
+            return {"id": row["note_id"]}, None
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            outcomes = fetch_details_ordered(rows, fetch_one, executor=executor)
+
+        self.assertEqual([o[0]["id"] for o in outcomes if o[0]], [str(i) for i in range(20) if i != 7])
+        self.assertIsNotNone(outcomes[7][1])
+
+    def test_fetch_details_ordered_stops_at_first_error(self):
+        rows = [{"note_id": str(i)} for i in range(5)]
+
+        def fetch_one(row):
+            return (None, RuntimeError("boom")) if row["note_id"] == "2" else ({}, None)
+
+        outcomes = fetch_details_ordered(rows, fetch_one, stop_on_error=True)
+        self.assertEqual(len(outcomes), 3)
+
+    def test_serial_request_rpm(self):
+        self.assertAlmostEqual(serial_request_rpm(0.8, 2.8), 60 / 2.8)
+        self.assertAlmostEqual(serial_request_rpm(0.8, 2.8, detail_sleep_seconds=3, call_seconds=2), 12.0)
+        # unpaced calls are still bounded by their own latency
+        self.assertAlmostEqual(serial_request_rpm(0, 0, call_seconds=0.5), 120.0)
+        self.assertEqual(serial_request_rpm(0, 0, call_seconds=0), 0.0)
+
+    def test_unknown_collect_option_is_rejected(self):
+        with self.assertRaises(TypeError):
+            collect_once(["k"], CollectOptions(), max_rows=3)
+
+    def test_search_prefetcher_keeps_keyword_order(self):
+        def search_one(keyword):
+            time.sleep(random.uniform(0, 0.005))
+            if keyword == "k3":
+                return None, RuntimeError("search failed")
+            return {"keyword": keyword}, None
+
+        keywords = ["k%s" % i for i in range(8)]
+        with SearchPrefetcher(keywords, search_one, depth=2) as searches:
+            items = list(searches)
+            stats = searches.stats()
+
+        self.assertEqual([item[0] for item in items], keywords)
+        self.assertIsNotNone(items[3][2])
+        self.assertLessEqual(stats["queue_depth_max"], 2)
+
+    def test_search_prefetcher_stops_early(self):
+        searched = []
+
+        def search_one(keyword):
+            searched.append(keyword)
+            return {}, None
+
+        keywords = ["k%s" % i for i in range(50)]
+        with SearchPrefetcher(keywords, search_one, depth=2) as searches:
+            for keyword, _, _ in searches:
+                if keyword == "k1":
+                    break
+
+        self.assertLess(len(searched), 10)
+
+    def test_search_prefetcher_close_waits_for_search_in_flight(self):
+        started = threading.Event()
+        finished = []
+
+        def search_one(keyword):
+            if keyword == "k1":
+                started.set()
+                time.sleep(1.2)
+                finished.append(keyword)
+            return {}, None
+
+        with SearchPrefetcher(["k0", "k1", "k2"], search_one, depth=1) as searches:
+            next(iter(searches))
+            started.wait(timeout=5)
+        self.assertEqual(finished, ["k1"])
+
+    def test_sharded_collection_matches_single_process(self):
+        now = int(datetime.now(timezone.utc).timestamp())
+        rng = random.Random(3)
+        entries = [{"tool": "search_feeds", "arguments": {"keyword": "k2"}, "error": "未登录"}]
+        for i in range(8):
+            if i != 2:
+                feeds = [
+                    {"id": "f%s" % n, "note_id": "n%s" % n, "xsec_token": "t", "time": str((now - n * 600) * 1000)}
+                    for n in rng.sample(range(30), 8)
+                ]
+                entries.append({"tool": "search_feeds", "arguments": {"keyword": "k%s" % i}, "response": {"feeds": feeds}})
+        for n in range(30):
+            entry = {"tool": "get_feed_detail", "arguments": {"feed_id": "f%s" % n, "xsec_token": "t"}}
+            if n % 7 == 0:
+                entry["error"] = "bad f%s" % n
+            else:
+                entry["response"] = {"note": {"desc": "d%s" % n}}
+            entries.append(entry)
+
+        kwargs = dict(
+            max_per_keyword=6,
+            max_total_rows=12,
+            request_rpm=0,
+            retry_delay_seconds=0,
+            random_sleep_min_seconds=0,
+            random_sleep_max_seconds=0,
+            breaker_threshold=0,
+        )
+        keywords = ["k%s" % i for i in range(8)]
+        known_keys = {"n1", "n2"}
+        single = collect_once(
+            keywords, known_keys=known_keys, session=ReplayTransport(entries, latency="fixed:0"), **kwargs
+        )
+        replay = ReplayTransport(entries, latency="fixed:0")
+        sharded = collect_sharded(keywords, 3, CollectOptions(**kwargs), known_keys=known_keys, session=replay)
+
+        for name in ("raw_payloads", "errors", "keyword_stats"):
+            self.assertEqual(sharded[name], single[name])
+        for name in ("rows", "snapshots"):
+            self.assertEqual(
+                [dict(x, crawl_ts="") for x in sharded[name]], [dict(x, crawl_ts="") for x in single[name]]
+            )
+        # the cap cuts k4 short and stops before k5
+        self.assertEqual(len(sharded["rows"]), 12)
+        self.assertEqual([x["keyword"] for x in sharded["keyword_stats"]], keywords[:5])
+        self.assertEqual(len(sharded["pipeline_stats"]["shards"]), 3)
+        self.assertGreater(replay.stats["calls"], 0)
+
 
 if __name__ == "__main__":
     unittest.main()
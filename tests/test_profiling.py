@@ -0,0 +1,66 @@
+import asyncio
+import pstats
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from src import profiling
+from src.agent_reach_bridge import run_cmd
+
+
+@profiling.timed("double")
+def _double(x):
+    return 2 * x
+
+
+@profiling.timed("async_double")
+async def _async_double(x):
+    return 2 * x
+
+
+class ProfilingTests(unittest.TestCase):
+    def test_timed_records_only_while_recording(self):
+        self.assertEqual(_double(2), 4)
+        self.assertIsNone(profiling.current())
+
+        timings = profiling.StageTimings()
+        with profiling.recording(timings):
+            for x in range(10):
+                _double(x)
+            self.assertEqual(asyncio.run(_async_double(3)), 6)
+            with profiling.stage("block"):
+                pass
+        _double(1)
+
+        stats = timings.stats()
+        self.assertEqual({name: item["calls"] for name, item in stats.items()}, {"double": 10, "async_double": 1, "block": 1})
+        self.assertEqual(set(stats["double"]), {"calls", "total_seconds", "p50_ms", "p95_ms", "max_ms"})
+        self.assertLessEqual(stats["double"]["p50_ms"], stats["double"]["max_ms"])
+
+    def test_stats_percentiles(self):
+        timings = profiling.StageTimings()
+        for ms in range(1, 101):
+            timings.add("s", ms / 1000.0)
+        stats = timings.stats()["s"]
+        self.assertEqual((stats["p50_ms"], stats["p95_ms"], stats["max_ms"]), (51.0, 96.0, 100.0))
+        self.assertEqual(stats["total_seconds"], 5.05)
+
+    def test_bridge_subprocess_is_timed(self):
+        timings = profiling.StageTimings()
+        with profiling.recording(timings):
+            run_cmd([sys.executable, "-c", "print('ok')"], timeout=30)
+        self.assertEqual(timings.stats()["run_cmd"]["calls"], 1)
+
+    def test_profiled_writes_pstats(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "runlog" / "profile.pstats"
+            with profiling.profiled(path):
+                _double(1)
+            self.assertGreater(pstats.Stats(str(path)).total_calls, 0)
+            with profiling.profiled(None) as profiler:
+                self.assertIsNone(profiler)
+
+
+if __name__ == "__main__":
+    unittest.main()
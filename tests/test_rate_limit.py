@@ -0,0 +1,83 @@
+import multiprocessing
+import time
+import unittest
+
+from src.rate_limit import SharedTokenBucket, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+_bucket = None
+
+
+def _set_bucket(bucket):
+    global _bucket
+    _bucket = bucket
+
+
+def _acquire_times(n):
+    times = []
+    for _ in range(n):
+        _bucket.acquire()
+        times.append(time.monotonic())
+    return times
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_rate_is_capped(self):
+        clock = FakeClock()
+        bucket = TokenBucket(30, clock=clock, sleep=clock.sleep)
+
+        for _ in range(5):
+            bucket.acquire()
+
+        self.assertAlmostEqual(clock.now, 8.0)
+
+    def test_idle_time_refills_only_up_to_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, capacity=2, clock=clock, sleep=clock.sleep)
+        clock.now = 100.0
+
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertAlmostEqual(bucket.acquire(), 1.0)
+
+    def test_set_rate_applies_from_now(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        clock.now = 0.5
+        bucket.set_rate(30)
+
+        self.assertAlmostEqual(bucket.acquire(), 1.0)
+
+    def test_zero_rate_is_unlimited(self):
+        clock = FakeClock()
+        bucket = TokenBucket(0, clock=clock, sleep=clock.sleep)
+        for _ in range(100):
+            bucket.acquire()
+        self.assertEqual(clock.now, 0.0)
+
+    def test_shared_bucket_spans_processes(self):
+        context = multiprocessing.get_context("spawn")
+        bucket = SharedTokenBucket(1200, context=context)
+        with context.Pool(3, initializer=_set_bucket, initargs=(bucket,)) as pool:
+            results = pool.map(_acquire_times, [4] * 3)
+
+        times = sorted(t for result in results for t in result)
+        self.assertEqual(len(times), 12)
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        self.assertGreater(min(gaps), 0.04)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.io_utils import AtomicWriteBatch
+from src.snapshots import SnapshotLog, keyword_growth, note_growth
+
+
+def _row(note_id, likes, comments=0, keyword="k"):
+    return {"note_id": note_id, "keyword": keyword, "likes": likes, "comments": comments, "collects": "2", "shares": None}
+
+
+class SnapshotLogTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+
+    def test_delta_encoding_round_trip(self):
+        log = SnapshotLog(self.root)
+        log.append(1000, [_row("a", 10), _row("b", 5, keyword="other"), _row("a", 99)])
+        log.append(4600, [_row("a", 16, 2)])
+
+        lines = [json.loads(x) for x in (self.root / "engagement.delta").read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(lines[-1], ["a", "", 3600, 6, 2, 0, 0])
+        self.assertEqual(
+            list(SnapshotLog(self.root).iter_snapshots()),
+            [("a", "k", 1000, [10, 0, 2, 0]), ("b", "other", 1000, [5, 0, 2, 0]), ("a", "k", 4600, [16, 2, 2, 0])],
+        )
+
+    def test_growth_per_hour(self):
+        log = SnapshotLog(self.root)
+        log.append(0, [_row("a", 10), _row("b", 0), _row("c", 1)])
+        log.append(7200, [_row("a", 30, 4), _row("b", 3)])
+
+        growth = note_growth(log.notes)
+        self.assertEqual([(x["note_id"], x["likes_per_hour"], x["engagement_per_hour"]) for x in growth], [("a", 10.0, 12.0), ("b", 1.5, 1.5)])
+        self.assertEqual(keyword_growth(growth), [{"keyword": "k", "tracked_notes": 2, "engagement_per_hour": 13.5, "avg_engagement_per_hour": 6.75}])
+
+    def test_recovers_from_stale_latest_and_torn_line(self):
+        log = SnapshotLog(self.root)
+        log.append(0, [_row("a", 1)])
+        stale = (self.root / "latest.json").read_text(encoding="utf-8")
+        log.append(3600, [_row("a", 5)])
+        (self.root / "latest.json").write_text(stale, encoding="utf-8")
+        with (self.root / "engagement.delta").open("a", encoding="utf-8") as f:
+            f.write('["a","",36')
+
+        log = SnapshotLog(self.root)
+        self.assertEqual((log.notes["a"]["ts"], log.notes["a"]["counts"][0], log.notes["a"]["prev_counts"][0]), (3600, 5, 1))
+        log.append(7200, [_row("a", 9)])
+        self.assertEqual([x[2:] for x in SnapshotLog(self.root).iter_snapshots()], [(0, [1, 0, 2, 0]), (3600, [5, 0, 2, 0]), (7200, [9, 0, 2, 0])])
+
+    def test_prunes_unseen_notes_and_restarts_their_chain(self):
+        log = SnapshotLog(self.root, retention_days=1)
+        log.append(0, [_row("a", 10), _row("b", 3)])
+        log.append(2 * 86400, [_row("b", 4)])
+        self.assertEqual(sorted(json.loads((self.root / "latest.json").read_text(encoding="utf-8"))["notes"]), ["b"])
+
+        log = SnapshotLog(self.root, retention_days=1)
+        log.append(3 * 86400, [_row("a", 15)])
+        lines = [json.loads(x) for x in (self.root / "engagement.delta").read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(lines[-1], ["a", ["k"], 3 * 86400, 15, 0, 2, 0])
+        self.assertEqual(
+            [x for x in SnapshotLog(self.root).iter_snapshots() if x[0] == "a"],
+            [("a", "k", 0, [10, 0, 2, 0]), ("a", "k", 3 * 86400, [15, 0, 2, 0])],
+        )
+
+    def test_batched_append_waits_for_commit(self):
+        log = SnapshotLog(self.root)
+        batch = AtomicWriteBatch()
+        log.append(0, [_row("a", 1)], batch=batch)
+        self.assertFalse((self.root / "engagement.delta").exists())
+        batch.abort()
+        self.assertFalse((self.root / "engagement.delta").exists())
+
+        log = SnapshotLog(self.root)
+        batch = AtomicWriteBatch()
+        log.append(0, [_row("a", 1)], batch=batch)
+        batch.commit()
+        self.assertEqual(list(SnapshotLog(self.root).iter_snapshots()), [("a", "k", 0, [1, 0, 2, 0])])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from src import pipeline
+from src.agent_reach_bridge import BridgeError, CallTimeoutError, open_session, search_feeds
+from src.mcp_session import McpSessionTimeout, McpToolError
+from src.transports import RecordingTransport, ReplayTransport, parse_latency
+
+FAKE_SERVER = [sys.executable, str(Path(__file__).resolve().parent / "fake_mcp_server.py")]
+
+
+def _entries():
+    return [
+        {"tool": "search_feeds", "arguments": {"keyword": "a"}, "seconds": 0.5, "response": {"feeds": [1]}},
+        {"tool": "search_feeds", "arguments": {"keyword": "a"}, "seconds": 0.5, "response": {"feeds": [2]}},
+        {"tool": "search_feeds", "arguments": {"keyword": "b"}, "seconds": 0.1, "error": "未登录"},
+    ]
+
+
+class TransportTests(unittest.TestCase):
+    def test_record_then_replay(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "calls.jsonl"
+            with RecordingTransport(open_session(FAKE_SERVER), path) as recorder:
+                live = search_feeds("k", retries=0, session=recorder)
+                with self.assertRaises(BridgeError):
+                    search_feeds("k", retries=0, session=_Failing(recorder))
+            lines = [json.loads(x) for x in path.read_text(encoding="utf-8").splitlines()]
+
+            replay = ReplayTransport.load(path, latency="fixed:0")
+            self.assertEqual(search_feeds("k", retries=0, session=replay), live)
+
+        self.assertEqual([x["tool"] for x in lines], ["search_feeds", "fail"])
+        self.assertIn("未登录", lines[1]["error"])
+
+    def test_recorded_error_kinds_replay_as_recorded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "calls.jsonl"
+            with RecordingTransport(_Raising([McpSessionTimeout(7), McpToolError("note not found")]), path) as recorder:
+                for _ in range(2):
+                    with self.assertRaises(Exception):
+                        recorder.call_tool("get_feed_detail", {"feed_id": "f"})
+            replay = ReplayTransport.load(path, latency="fixed:0")
+
+        with self.assertRaises(CallTimeoutError) as timed_out:
+            replay.call_tool("get_feed_detail", {"feed_id": "f"}, timeout=30)
+        self.assertEqual(timed_out.exception.timeout, 7)
+        with self.assertRaises(BridgeError) as failed:
+            replay.call_tool("get_feed_detail", {"feed_id": "f"})
+        self.assertEqual((failed.exception.kind, str(failed.exception)), ("item", "note not found"))
+
+    def test_replay_cycles_and_raises_recorded_errors(self):
+        sleeps = []
+        replay = ReplayTransport(_entries(), sleep=sleeps.append, time_scale=0.1)
+        self.assertEqual(replay.call_tool("search_feeds", {"keyword": "a"}), {"feeds": [1]})
+        self.assertEqual(replay.call_tool("search_feeds", {"keyword": "a"}), {"feeds": [2]})
+        self.assertEqual(replay.call_tool("search_feeds", {"keyword": "a"}), {"feeds": [1]})
+        with self.assertRaisesRegex(BridgeError, "未登录"):
+            replay.call_tool("search_feeds", {"keyword": "b"})
+        self.assertEqual([round(x, 3) for x in sleeps], [0.05, 0.05, 0.05, 0.01])
+
+    def test_injected_timeouts_errors_and_missing_calls(self):
+        sleeps = []
+        slow = ReplayTransport(_entries(), latency="fixed:5", sleep=sleeps.append)
+        with self.assertRaisesRegex(BridgeError, "timeout after 2s"):
+            slow.call_tool("search_feeds", {"keyword": "a"}, timeout=2)
+        self.assertEqual(sleeps, [2])
+
+        failing = ReplayTransport(_entries(), latency="fixed:0", error_rate=1.0)
+        with self.assertRaisesRegex(BridgeError, "injected error"):
+            failing.call_tool("search_feeds", {"keyword": "a"})
+        self.assertEqual(failing.stats["injected_errors"], 1)
+
+        with self.assertRaises(BridgeError):
+            ReplayTransport(_entries()).call_tool("search_feeds", {"keyword": "zz"})
+        nearest = ReplayTransport(_entries()[:2], latency="fixed:0", on_missing="nearest")
+        self.assertIn(nearest.call_tool("search_feeds", {"keyword": "zz"}), ({"feeds": [1]}, {"feeds": [2]}))
+        self.assertEqual(nearest.stats["missing"], 1)
+
+    def test_parse_latency(self):
+        self.assertEqual(parse_latency("fixed:0.2")(None, 9.0), 0.2)
+        self.assertEqual(parse_latency("recorded")(None, 9.0), 9.0)
+        for spec in ("uniform:1", "bogus:1", "fixed:-1", "normal:a,b", "lognormal:0,1"):
+            with self.assertRaises(ValueError):
+                parse_latency(spec)
+
+    def test_collect_once_replay_is_deterministic(self):
+        feeds = [{"id": "f%s" % i, "note_id": "n%s" % i, "xsec_token": "t"} for i in range(20)]
+        entries = [{"tool": "search_feeds", "arguments": {"keyword": "seed"}, "response": {"feeds": feeds}}]
+        entries += [
+            {"tool": "get_feed_detail", "arguments": {"feed_id": "f%s" % i, "xsec_token": "t"}, "response": {"note": {"desc": str(i)}}}
+            for i in range(20)
+        ]
+
+        def run():
+            replay = ReplayTransport(entries, latency="fixed:0", error_rate=0.2, on_missing="nearest", seed=7)
+            result = pipeline.collect_once(
+                ["k%s" % i for i in range(5)],
+                max_per_keyword=0,
+                max_total_rows=0,
+                within_hours=0,
+                retry_delay_seconds=0,
+                random_sleep_min_seconds=0,
+                random_sleep_max_seconds=0,
+                breaker_threshold=0,
+                session=replay,
+            )
+            return result, replay.stats
+
+        first, stats = run()
+        second, _ = run()
+        self.assertEqual(first["rows"], [dict(r, crawl_ts=first["crawl_ts"]) for r in second["rows"]])
+        self.assertEqual(first["errors"], second["errors"])
+        self.assertGreater(stats["injected_errors"], 0)
+        self.assertGreaterEqual(stats["missing"], 5)
+
+
+class _Failing:
+    """Routes every call to the fake server's `fail` tool."""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def call_tool(self, name, arguments, timeout=120):
+        return self.inner.call_tool("fail", {}, timeout=timeout)
+
+
+class _Raising:
+    def __init__(self, errors):
+        self.errors = list(errors)
+
+    def call_tool(self, name, arguments, timeout=120):
+        raise self.errors.pop(0)
+
+    def close(self):
+        pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import contextlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.analytics import analyze_keywords
+from src.main import parse_trends_args
+from src.trends import keyword_series, keyword_trends, load_daily_aggregates, rebuild_daily_aggregates, update_daily_aggregates
+
+
+def _rows(keyword, likes):
+    return [{"keyword": keyword, "likes": x, "comments": 0, "collects": 0, "shares": 0} for x in likes]
+
+
+class TrendsTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+
+    def _save_day(self, crawl_date, rows):
+        metrics, _ = analyze_keywords(rows, top_n=0)
+        update_daily_aggregates(self.root, crawl_date, metrics)
+
+    def test_update_replaces_day_and_keeps_others(self):
+        self._save_day("2026-03-01", _rows("a", [1, 2]))
+        self._save_day("2026-03-02", _rows("a", [5]))
+        self._save_day("2026-03-02", _rows("a", [7]) + _rows("b", [1]))
+
+        aggregates = load_daily_aggregates(self.root)
+        self.assertEqual(aggregates["2026-03-01"]["a"]["posts"], 2)
+        self.assertEqual(aggregates["2026-03-02"]["a"]["likes"], 7)
+        self.assertEqual(aggregates["2026-03-02"]["b"]["engagement"], 1)
+
+    def test_rolling_windows_and_day_over_day(self):
+        self._save_day("2026-03-01", _rows("a", [10, 10]))
+        self._save_day("2026-03-03", _rows("a", [4]))
+        aggregates = load_daily_aggregates(self.root)
+
+        [row] = keyword_trends(aggregates, windows=(2, 7))
+        self.assertEqual(row["date"], "2026-03-03")
+        self.assertEqual((row["posts"], row["posts_dod"], row["engagement_dod"]), (1, 1, 4))
+        self.assertEqual((row["posts_2d"], row["engagement_2d"]), (1, 4))
+        self.assertEqual((row["posts_7d"], row["engagement_7d"], row["avg_engagement_7d"]), (3, 24, 8.0))
+
+        series = keyword_series(aggregates, "a", days=3, windows=(7,))
+        self.assertEqual([x["date"] for x in series], ["2026-03-01", "2026-03-02", "2026-03-03"])
+        self.assertEqual([x["posts_7d"] for x in series], [2, 2, 3])
+
+    def test_rebuild_matches_incremental(self):
+        report = self.root / "reports" / "2026-03-01" / "all_rows.csv"
+        report.parent.mkdir(parents=True)
+        report.write_text("keyword,likes,comments,collects,shares\na,3,1,0,0\na,5,0,0,2\nb,1,0,0,0\n", encoding="utf-8-sig")
+        rebuilt = rebuild_daily_aggregates(self.root)
+        self._save_day("2026-03-01", _rows("a", [3, 5]) + _rows("b", [1]))
+        self.assertEqual(rebuilt["2026-03-01"]["b"], load_daily_aggregates(self.root)["2026-03-01"]["b"])
+        self.assertEqual(rebuilt["2026-03-01"]["a"]["engagement"], 11)
+
+    def test_malformed_date_is_a_usage_error(self):
+        self.assertEqual(parse_trends_args(["--date", "2026-03-02"]).date, "2026-03-02")
+        with contextlib.redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit) as exit_:
+            parse_trends_args(["--date", "2026-3-2x"])
+        self.assertEqual(exit_.exception.code, 2)
+        self.assertIn("--date", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()